@@ -0,0 +1,227 @@
+from nettopo import NetworkTopology
+from netconfig import NetworkConfig
+from flowstats import StatsCollector, np
+import networkx.classes.function as nxfunc
+import threading
+import time
+
+# Port speed when the switch does not report `current-speed`
+DEFAULT_CAPACITY_BPS = 1e9
+
+
+class AdaptiveWeights(object):
+    """
+    Set link weights `w` of the topology from measured utilization, and move installed paths to cheaper ones:
+    - Utilization of a link is its busiest direction, each direction is the larger of the sender's transmitted
+    and the receiver's received byte rate, over the port speed [`current-speed`, or `default_capacity_bps`].
+    - Weight is `min_weight` at idle up to `max_weight` at full utilization.
+    - hysteresis: A link weight changes only when its utilization moved more than this [0-1] since its last change.
+    - min_interval: Seconds between two steps that change weights, so paths do not flap.
+    - reroute_threshold: An installed path is moved only if its cost is more than (1 + threshold) times the best path's cost.
+    Only installed paths through changed links, or all of them if some link got cheaper, are checked.
+    Weights change and new paths are found holding `topology.lock`, shared with the shell, `TopologySubscriber`
+    and `PathDaemon`. Paths are installed after releasing it, so controller round-trips do not block them.
+    """
+
+    def __init__(
+        self,
+        topology: NetworkTopology,
+        config: NetworkConfig,
+        collector: StatsCollector,
+        *,
+        min_weight: int = 1,
+        max_weight: int = 100,
+        hysteresis: float = 0.1,
+        min_interval: float = 30.0,
+        reroute_threshold: float = 0.2,
+        window: int = 1,
+        default_capacity_bps: float = DEFAULT_CAPACITY_BPS,
+    ) -> None:
+        self.topology = topology
+        self.config = config
+        self.collector = collector
+        self.min_weight = min_weight
+        self.max_weight = max_weight
+        self.hysteresis = hysteresis
+        self.min_interval = min_interval
+        self.reroute_threshold = reroute_threshold
+        self.window = window
+        self.default_capacity_bps = default_capacity_bps
+        # (u, v) sorted names -> utilization at the last weight change
+        self.applied = {}
+        self.last_change = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._worker = None
+
+    def _port_capacities(self) -> dict[str, float]:
+        ret = {}
+        for node in self.topology.nodes.values():
+            if node.type != "switch":
+                continue
+            for conn in node.data.get("node-connector", []):
+                speed = conn.get("flow-node-inventory:current-speed", None)  # kbps
+                ret[conn["id"]] = speed * 1000 if speed else self.default_capacity_bps
+        return ret
+
+    def link_utilization(self) -> dict[tuple, float]:
+        """
+        Utilization [0-1] of each switch-to-switch link measured by the collector. Key: (u, v) sorted switch names.
+        """
+        port_ids, rates = self.collector.port_rates(self.window)
+        with self.topology.lock:
+            return self._link_utilization(port_ids, rates)
+
+    def _link_utilization(self, port_ids: list, rates) -> dict[tuple, float]:
+        rates = np.nan_to_num(rates, nan=0.0) * 8  # [.., rx_bytes, tx_bytes] -> bps
+        row = {port_id: ind for ind, port_id in enumerate(port_ids)}
+        capacities = self._port_capacities()
+
+        def direction(sender, receiver) -> float:
+            tx = rates[row[sender.id], 3] if sender.id in row else 0.0
+            rx = rates[row[receiver.id], 2] if receiver.id in row else 0.0
+            return max(tx, rx) / capacities.get(sender.id, self.default_capacity_bps)
+
+        ret = {}
+        for node in self.topology.nodes.values():
+            if node.type != "switch":
+                continue
+            for peer_id, ports in node.peer_ports.items():
+                peer = self.topology.nodes.get(peer_id, None)
+                if peer is None or peer.type != "switch" or node.name > peer.name:
+                    continue
+                utilization = 0.0
+                for port in ports:  # busiest of parallel links
+                    utilization = max(
+                        utilization,
+                        direction(port, port.peer),
+                        direction(port.peer, port),
+                    )
+                ret[(node.name, peer.name)] = float(min(utilization, 1.0))
+        return ret
+
+    def _weight(self, utilization: float) -> int:
+        return self.min_weight + round(
+            (self.max_weight - self.min_weight) * utilization
+        )
+
+    def update_weights(self) -> dict[tuple, tuple]:
+        """
+        Apply weights of links whose utilization moved more than `hysteresis`. Return {(u, v): (old, new)} of changed weights.
+        """
+        changed = {}
+        graph = self.topology.graph
+        for (u, v), utilization in self.link_utilization().items():
+            if not graph.has_edge(u, v):
+                continue
+            last = self.applied.get((u, v), 0.0)
+            if abs(utilization - last) <= self.hysteresis:
+                continue
+            old, new = graph.edges[u, v]["w"], self._weight(utilization)
+            self.applied[(u, v)] = utilization
+            if old != new:
+                self.topology.set_weight(u, v, new)
+                changed[(u, v)] = (old, new)
+        return changed
+
+    def reroute(self, changed: dict[tuple, tuple]) -> list[tuple]:
+        """
+        Move installed paths affected by `changed` weights to their new shortest path [make-before-break].
+        New paths are found holding `topology.lock`, then installed without it. A path that fails to move
+        is reported and skipped, the others still move.
+        Return moved (source, destination) pairs.
+        """
+        with self.topology.lock:
+            targets = self._reroute_targets(changed)
+        moved = []
+        for (src, dest), nodes, info in targets:
+            try:
+                self.config.set_path(
+                    *nodes, table=info["table"], priority=info["priority"], update=True
+                )
+                moved.append((src, dest))
+            except Exception as ex:
+                print(f":: adaptive: {src} -> {dest}: {ex}")
+        return moved
+
+    def _reroute_targets(self, changed: dict[tuple, tuple]) -> list[tuple]:
+        """
+        Installed paths to move: list of ((source, destination), new path nodes, installed path info).
+        """
+        if not changed:
+            return []
+        check_all = any(new < old for old, new in changed.values())
+        changed_links = {frozenset(link) for link in changed}
+        targets = []
+        for (src, dest), info in list(self.config.installed_paths.items()):
+            names = [
+                self.topology.nodes[i].name
+                for i in info["switches"]
+                if i in self.topology.nodes
+            ]
+            path = [src, *names, dest]
+            links = {frozenset(link) for link in zip(path, path[1:])}
+            if not check_all and not links & changed_links:
+                continue
+            length, best = self.topology.find_shortest_path(src, dest)
+            if best is None or best == path:
+                continue
+            cost = (
+                nxfunc.path_weight(self.topology.graph, path, "w")
+                if self.topology.is_valid_path(*path)
+                else float("inf")
+            )
+            if cost <= length * (1 + self.reroute_threshold):
+                continue
+            targets.append(
+                ((src, dest), self.topology.get_node_from_names(*best), info)
+            )
+        return targets
+
+    def step(self) -> tuple[dict, list]:
+        """
+        One adaptation: update weights, then move affected paths. Nothing changes within `min_interval` of the last change.
+        Weights change holding `topology.lock`, paths are installed after releasing it.
+        Return (changed weights, moved paths).
+        """
+        now = time.monotonic()
+        if self.last_change is not None and now - self.last_change < self.min_interval:
+            return {}, []
+        with self.topology.lock:
+            changed = self.update_weights()
+            if not changed:
+                return {}, []
+            self.last_change = now
+        moved = self.reroute(changed)
+        print(f":: adaptive: {len(changed)} weights changed, {len(moved)} paths moved")
+        return changed, moved
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def start(self, interval: float = None):
+        """
+        Step every `interval` seconds [Default: the collector's interval] in background.
+        """
+        if self.running:
+            return
+        self._stop.clear()
+        interval = self.collector.interval if interval is None else interval
+        self._worker = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                self.step()
+                self.last_error = None
+            except Exception as ex:
+                self.last_error = ex
+                print(f":: adaptive: {ex}")
@@ -1,10 +1,21 @@
 from nettopo import NetworkTopology
 from netconfig import NetworkConfig
-from connector import Connector
+from connector import Connector, AsyncConnector
 from node import Host, Switch, Port, parse_port_list
 from flow import Table, Flow
 from command import CommandParser
+from snapshot import Snapshotter
+from flowstats import StatsCollector
+from adaptive import AdaptiveWeights
+from classifier import NetworkClassifier
+from verifier import Verifier
+from subscribe import TopologySubscriber
 import json
+import sys
+import time
+
+# Commands not run holding `topology.lock`: they wait for input or stop background threads which take the lock
+_UNLOCKED_COMMANDS = ["shell", "subscribe", "adaptive"]
 
 
 def parse_dict(type: str, data: dict):
@@ -31,10 +42,37 @@ class App(object):
         server_port=8181,
         auth: tuple = None,
         content_type="application/json",
+        concurrency: int = 10,
+        snapshot_mode: str = "demand",
+        snapshot_path: str = "snapshot.json.gz",
+        offline_snapshot: str | tuple[str, str] = None,
+        script: str = None,
     ) -> None:
-        self.connector = Connector(server_ip, server_port, auth, content_type)
-        self.topology = NetworkTopology(self.connector)
-        self.config = NetworkConfig(self.connector)
+        """
+        - concurrency: Maximum number of requests sent at the same time when programming many switches. Set to 1 for sequential requests.
+        - snapshot_mode: When raw topology is saved to `snapshot_path`. VALUES: 'off', 'demand' [Default, by `snapshot save`], 'background' [after each refresh]
+        - snapshot_path: Snapshot file, format by extension: `.gz` [gzip JSON], `.pkl` [binary], other [JSON].
+        - offline_snapshot: Start from this snapshot instead of downloading topology. Ex: ("topology.json", "nodes.json")
+        - script: Run commands from this file ['-' for stdin] instead of the interactive shell. Summary in `script_summary`.
+        """
+        self.connector = Connector(
+            server_ip, server_port, auth, content_type, pool_size=max(concurrency, 1)
+        )
+        self.topology = NetworkTopology(
+            self.connector,
+            Snapshotter(snapshot_mode, snapshot_path),
+            offline_snapshot=offline_snapshot,
+        )
+        self.config = NetworkConfig(
+            self.connector,
+            AsyncConnector(self.connector, concurrency) if concurrency > 1 else None,
+        )
+        self.collector = None  # created by `collect start`
+        self.adaptive = None  # created by `adaptive start`
+        self.subscriber = None  # created by `subscribe start`
+        self.classifier = NetworkClassifier(self.topology)
+        self.script = script
+        self.script_summary = None
         self._start()
 
     def _create_app_command_parser(self):
@@ -67,7 +105,7 @@ class App(object):
                 },
                 "": {
                     "name": "type",
-                    "description": "Object want to prints. VALUES: hosts, switches, tables, ports, flows, object, liveobject.",
+                    "description": "Object want to prints. VALUES: hosts, switches, tables, ports, flows, object, liveobject, connections.",
                 },
             },
             "Print network details",
@@ -115,6 +153,11 @@ class App(object):
                     "default": None,
                     "description": "The length limit for the path. [Default: None]",
                 },
+                "ordered": {
+                    "dtype": int,
+                    "default": 0,
+                    "description": "1 if the path must go through `throughs` in the given order. [Default: 0]",
+                },
                 "": {
                     "name": "type",
                     "default": "",
@@ -130,9 +173,55 @@ class App(object):
                     "default": 5,
                     "description": "Priority for this path. [Default: 5]. [Only used with `set`]",
                 },
+                "update": {
+                    "dtype": int,
+                    "default": 0,
+                    "description": "1 if want to replace the path set before between the same hosts without dropping packets: install the new path at higher priority first, then remove the old one. [Default: 0]. [Only used with `set`]",
+                },
+                "ecmp": {
+                    "dtype": int,
+                    "default": 0,
+                    "description": "1 if want to use all equal-cost shortest paths between the hosts, by select groups on switches with many next hops. [Default: 0]. [Not used with `throughs`, `blocks`, `cutoff`]",
+                },
             },
             "Print shortest path between two nodes with some criterions.",
         )
+        command_parser.register(
+            "routes",
+            self.set_routes,
+            {
+                "": {
+                    "name": "type",
+                    "default": "",
+                    "description": "Set this value to `set` to install all routes to controller, each switch's table in one request, or `sync` to write only the flows that differ from config datastore. [Default: None, print only]. VALUES: set, sync",
+                },
+                "table": {
+                    "dtype": int,
+                    "default": 0,
+                    "description": "Table to update these routes. [Default: 0]. [Only used with `set`]",
+                },
+                "priority": {
+                    "dtype": int,
+                    "default": 5,
+                    "description": "Priority for these routes. [Default: 5]. [Only used with `set`]",
+                },
+                "replace": {
+                    "dtype": int,
+                    "default": 0,
+                    "description": "1 if want to replace [`set`] or delete [`sync`] other flows in the tables. [Default: 0]",
+                },
+                "engine": {
+                    "default": "networkx",
+                    "description": "Shortest paths engine. VALUES: 'networkx' [Default], 'scipy'",
+                },
+                "aggregate": {
+                    "dtype": int,
+                    "default": 0,
+                    "description": "1 if want one flow per destination host on each switch [match destination MAC only], instead of one per pair of hosts. [Default: 0]. [Only used with `set`]",
+                },
+            },
+            "Print shortest paths between all pairs of hosts, or install all of them in bulk.",
+        )
         command_parser.register(
             "shell",
             self.start_shell,
@@ -144,6 +233,18 @@ class App(object):
             },
             "Open shell for updating paths or updating links weights",
         )
+        command_parser.register(
+            "weight",
+            self.set_weight,
+            {
+                "": {
+                    "name": "link",
+                    "dtype": "list",
+                    "description": "Two node names and the weight. Ex: weight s01 s02 10",
+                }
+            },
+            "Set one link's weight, in the offline topology.",
+        )
         command_parser.register(
             "flow",
             self.set_flow,
@@ -227,8 +328,325 @@ class App(object):
         command_parser.register(
             "refresh", self.topology.refresh, {}, "Updating topology from Server."
         )
+        command_parser.register(
+            "snapshot",
+            self.snapshot,
+            {
+                "": {
+                    "name": "type",
+                    "description": "Action on snapshot. VALUES: 'save' [save last refreshed topology], 'load' [replace topology by saved one]",
+                },
+                "path": {
+                    "default": None,
+                    "description": "Snapshot file. [Default: the app's snapshot path]",
+                },
+            },
+            "Save or load raw topology snapshot.",
+        )
+        command_parser.register(
+            "stats",
+            self.stats,
+            {
+                "": {
+                    "name": "type",
+                    "default": "",
+                    "description": "Output of request metrics. VALUES: '' [Default, table by method and endpoint], 'prometheus' [text format], 'reset'",
+                },
+                "path": {
+                    "default": None,
+                    "description": "File to write the Prometheus text to. [Default: None, print]. [Only used with `prometheus`]",
+                },
+                "log": {
+                    "dtype": int,
+                    "default": None,
+                    "description": "1/0 to turn printing each request on/off. [Default: None, unchanged]",
+                },
+            },
+            "Request count, errors, bytes and latency by method and endpoint.",
+        )
+        command_parser.register(
+            "collect",
+            self.collect,
+            {
+                "": {
+                    "name": "type",
+                    "description": "Action on the statistics collector. VALUES: 'start' [poll in background], 'stop', 'poll' [one sample now]",
+                },
+                "interval": {
+                    "dtype": float,
+                    "default": None,
+                    "description": "Seconds between polls. [Default: 5]. [Used in `start`]",
+                },
+            },
+            "Collect flow and port counters from the operational datastore.",
+        )
+        command_parser.register(
+            "top",
+            self.top,
+            {
+                "": {
+                    "name": "type",
+                    "default": "flows",
+                    "description": "What to rank by byte rate. VALUES: 'flows' [Default, talkers], 'links' [ports with their peers]",
+                },
+                "n": {
+                    "dtype": int,
+                    "default": 10,
+                    "description": "Number of rows. [Default: 10]",
+                },
+                "window": {
+                    "dtype": int,
+                    "default": 1,
+                    "description": "Rates over the last `window` polls. [Default: 1]",
+                },
+            },
+            "Show top-N flows or links by rate. Requires `collect start` or `collect poll` twice.",
+        )
+        command_parser.register(
+            "adaptive",
+            self.set_adaptive,
+            {
+                "": {
+                    "name": "type",
+                    "description": "VALUES: 'start' [adapt weights and paths in background], 'stop', 'step' [once now], 'show' [link utilization]",
+                },
+                "max_weight": {
+                    "dtype": int,
+                    "default": 100,
+                    "description": "Weight of a fully used link, idle links have weight 1. [Default: 100]",
+                },
+                "hysteresis": {
+                    "dtype": float,
+                    "default": 0.1,
+                    "description": "Utilization change [0-1] needed to change a link weight. [Default: 0.1]",
+                },
+                "min_interval": {
+                    "dtype": float,
+                    "default": 30,
+                    "description": "Minimum seconds between two re-routes. [Default: 30]",
+                },
+                "threshold": {
+                    "dtype": float,
+                    "default": 0.2,
+                    "description": "Move a path only if it costs more than (1 + threshold) times the best path. [Default: 0.2]",
+                },
+            },
+            "Link weights from measured utilization, installed paths follow. Starts the statistics collector.",
+        )
+        command_parser.register(
+            "subscribe",
+            self.subscribe,
+            {
+                "": {
+                    "name": "type",
+                    "default": "status",
+                    "description": "VALUES: 'start' [apply controller notifications in background], 'stop', 'status' [Default]",
+                },
+            },
+            "Topology updates pushed by the controller instead of `refresh`. Paths and routes over failed links are moved at once.",
+        )
+        command_parser.register(
+            "trace",
+            self.trace,
+            {
+                "": {
+                    "name": "src",
+                    "description": "Source host name, or 'all' [every pair of hosts, summary only]",
+                },
+                "dest": {
+                    "default": None,
+                    "description": "Destination host name. [Not used with `all`]",
+                },
+                "proto": {
+                    "dtype": int,
+                    "default": None,
+                    "description": "IP protocol of the packet. Ex: 6 [TCP], 17 [UDP]. [Default: None, not set]",
+                },
+                "dport": {
+                    "dtype": int,
+                    "default": None,
+                    "description": "Destination TCP/UDP port of the packet. [Default: None, not set]",
+                },
+            },
+            "Predict the path of a packet from flow tables of the last refresh, without sending it.",
+        )
+        command_parser.register(
+            "verify",
+            self.verify,
+            {
+                "proto": {
+                    "dtype": int,
+                    "default": None,
+                    "description": "IP protocol of the verified packets. Ex: 6 [TCP], 17 [UDP]. [Default: None, not set]",
+                },
+                "dport": {
+                    "dtype": int,
+                    "default": None,
+                    "description": "Destination TCP/UDP port of the verified packets. [Default: None, not set]",
+                },
+                "limit": {
+                    "dtype": int,
+                    "default": 20,
+                    "description": "Maximum number of each problem printed. [Default: 20]",
+                },
+            },
+            "Check reachability of all host pairs, forwarding loops and black holes, from flow tables of the last refresh.",
+        )
         return command_parser
 
+    def verify(self, proto: int = None, dport: int = None, limit: int = 20):
+        fields = {k: v for k, v in [("ip_proto", proto), ("l4_dst", dport)] if v}
+        report = Verifier(self.topology, **fields).verify()
+        report.print_report(limit)
+        if report.ok:
+            print(":: all pairs reachable")
+
+    def trace(self, src: str, dest: str = None, proto: int = None, dport: int = None):
+        fields = {"ip_proto": proto, "l4_dst": dport}
+        if src == "all":
+            hosts = sorted(
+                n.name for n in self.topology.nodes.values() if n.type == "host"
+            )
+            pairs = [(s, d) for s in hosts for d in hosts if s != d]
+            counts = {}
+            for (s, d), results in self.classifier.trace_batch(pairs, **fields).items():
+                ok = any(r.status == "delivered" and r.host == d for r in results)
+                status = "delivered" if ok else results[0].status
+                counts[status] = counts.get(status, 0) + 1
+                if not ok:
+                    print(f":: {s} -> {d}: {', '.join(r.status for r in results)}")
+            print(f":: {len(pairs)} pairs: {counts}")
+            return
+        if dest is None:
+            raise Exception("DESTINATION NOT FOUND: use `trace <src> dest=<host>`")
+        for ind, result in enumerate(
+            self.classifier.trace_between(src, dest, **fields)
+        ):
+            print(f":: {src} -> {dest} [branch {ind}]")
+            print(result)
+
+    def set_adaptive(self, type: str, **kwargs):
+        if self.adaptive is None or type == "start":
+            if self.collector is None:
+                self.collector = StatsCollector(self.connector)
+            if self.adaptive is not None:
+                self.adaptive.stop()
+            self.adaptive = AdaptiveWeights(
+                self.topology,
+                self.config,
+                self.collector,
+                max_weight=kwargs["max_weight"],
+                hysteresis=kwargs["hysteresis"],
+                min_interval=kwargs["min_interval"],
+                reroute_threshold=kwargs["threshold"],
+            )
+        if type == "start":
+            self.collector.start()
+            self.adaptive.start()
+            print(f":: adaptive weights every {self.collector.interval}s")
+        elif type == "stop":
+            self.adaptive.stop()
+        elif type == "step":
+            changed, moved = self.adaptive.step()
+            for (u, v), (old, new) in changed.items():
+                print(f":: {u} - {v}: {old} -> {new}")
+            for src, dest in moved:
+                print(f":: moved {src} -> {dest}")
+        elif type == "show":
+            with self.topology.lock:
+                for (u, v), util in sorted(self.adaptive.link_utilization().items()):
+                    print(
+                        f":: {u} - {v}: {util:.1%} [w = {self.topology.graph.edges[u, v]['w']}]"
+                    )
+
+    def subscribe(self, type: str = "status"):
+        if self.subscriber is None:
+            self.subscriber = TopologySubscriber(self.topology, self.config)
+        if type == "start":
+            if not self.topology.nodes:
+                self.topology.refresh()  # notifications are changes to a known topology
+            self.subscriber.start()
+            print(f":: subscribed to {', '.join(self.subscriber.paths)}")
+        elif type == "stop":
+            self.subscriber.stop()
+        counters = ", ".join(f"{k}: {v}" for k, v in self.subscriber.counters.items())
+        print(f":: {'running' if self.subscriber.running else 'stopped'}, {counters}")
+        if self.subscriber.last_error is not None:
+            print(f":: last error: {self.subscriber.last_error}")
+
+    def collect(self, type: str, interval: float = None):
+        if self.collector is None:
+            self.collector = StatsCollector(self.connector)
+        if type == "start":
+            self.collector.start(interval)
+            print(f":: collecting every {self.collector.interval}s")
+        elif type == "stop":
+            self.collector.stop()
+            print(f":: stopped after {self.collector.polls} polls")
+        elif type == "poll":
+            self.collector.poll()
+            print(f":: {self.collector.polls} polls")
+
+    def top(self, type: str = "flows", n: int = 10, window: int = 1):
+        if self.collector is None or self.collector.polls < 2:
+            raise Exception("NOT ENOUGH SAMPLES: use `collect start` or `collect poll`")
+        if self.collector.last_error is not None:
+            print(f":: last poll failed: {self.collector.last_error}")
+        if type.startswith("li") or type.startswith("po"):
+            print(
+                f"   {'Port':<16} | {'Name':<10} | {'Peer':>10} | {'pps':>10} | {'bps':>12}"
+            )
+            for port_id, pps, bps in self.collector.top_ports(n, window):
+                node = self.topology.nodes.get(port_id.rsplit(":", 1)[0], None)
+                port = None if node is None else node.ports.get(port_id, None)
+                name = "unk" if port is None else port.name
+                peer = (
+                    "None"
+                    if port is None or port.peer is None
+                    else port.peer.owner.name
+                )
+                print(
+                    f"   {port_id:<16} | {name:<10} | {peer:>10} | {pps:>10.1f} | {bps:>12.1f}"
+                )
+        else:
+            print(
+                f"   {'Switch':<10} | {'Table':>5} | {'Flow':<24} | {'pps':>10} | {'bps':>12}"
+            )
+            for (node_id, table_id, flow_id), pps, bps in self.collector.top_flows(
+                n, window
+            ):
+                node = self.topology.nodes.get(node_id, None)
+                name = node_id if node is None else node.name
+                print(
+                    f"   {name:<10} | {table_id:>5} | {flow_id:<24} | {pps:>10.1f} | {bps:>12.1f}"
+                )
+
+    def stats(self, type: str = "", path: str = None, log: int = None):
+        if log is not None:
+            self.connector.verbose = bool(log)
+            print(f":: printing requests {'on' if log else 'off'}")
+        metrics = self.connector.metrics
+        if type.startswith("pro"):
+            text = metrics.to_prometheus()
+            if path is None:
+                print(text, end="")
+            else:
+                with open(path, "w") as file:
+                    file.write(text)
+                print(f":: saved metrics to {path}")
+        elif type.startswith("re"):
+            metrics.reset()
+        elif log is None:
+            metrics.print_stats()
+
+    def snapshot(self, type: str, path: str = None):
+        if type == "save":
+            print(f":: saved snapshot to {self.topology.save_snapshot(path)}")
+        elif type == "load":
+            self.topology.load_snapshot(
+                self.topology.snapshotter.path if path is None else path
+            )
+
     def set_flow(self, type: str = "drop", **kwargs):
         if type == "drop":
             try:
@@ -251,18 +669,45 @@ class App(object):
                 print(f":: fail to set flow on {node_id}: {ex}")
         pass
 
-    def _set_path(self, nodes: list[str], table: int | str = 0, priority: int = 5):
+    def _set_path(
+        self,
+        nodes: list[str],
+        table: int | str = 0,
+        priority: int = 5,
+        update: bool = False,
+    ):
         if not self.topology.is_valid_path(*nodes):
             raise Exception("INVALID PATH")
         else:
             nodes = self.topology.get_node_from_names(*nodes)
             # print(nodes)
             try:
-                self.config.set_path(*nodes, table=table, priority=priority)
+                self.config.set_path(
+                    *nodes, table=table, priority=priority, update=update
+                )
                 # print(":: Set path successfully")
             except Exception as ex:
                 raise
 
+    def _set_ecmp_path(self, src: str, dest: str, table: int = 0, priority: int = 5):
+        def to_nodes(next_hops: dict) -> dict:
+            return {
+                self.topology.get_node_from_names(node)[
+                    0
+                ]: self.topology.get_node_from_names(*hops)
+                for node, hops in next_hops.items()
+            }
+
+        src_node, dest_node = self.topology.get_node_from_names(src, dest)
+        self.config.set_ecmp_path(
+            src_node,
+            dest_node,
+            to_nodes(self.topology.get_ecmp_next_hops(src, dest)),
+            to_nodes(self.topology.get_ecmp_next_hops(dest, src)),
+            table,
+            priority,
+        )
+
     def extract_shortest_path(
         self,
         type: str = "",
@@ -279,10 +724,80 @@ class App(object):
             kwargs["throughs"],
             kwargs["blocks"],
             kwargs["cutoff"],
+            ordered=bool(kwargs["ordered"]),
         )
         print(f":: [{length}]", *path if path is not None else "None")
-        if "set" in type and path is not None:
-            self._set_path(path, kwargs["table"], kwargs["priority"])
+        if "set" in type and path is None:
+            raise Exception("PATH NOT FOUND")
+        if kwargs["ecmp"]:
+            src, dest = kwargs["source"], kwargs["destination"]
+            forward = self.topology.get_ecmp_next_hops(src, dest)
+            for node, hops in sorted(forward.items()):
+                if len(hops) > 1:
+                    print(f":: {node} -> {', '.join(sorted(hops))}")
+            if "set" in type:
+                self._set_ecmp_path(src, dest, kwargs["table"], kwargs["priority"])
+            return
+        if "set" in type:
+            self._set_path(
+                path, kwargs["table"], kwargs["priority"], bool(kwargs["update"])
+            )
+
+    def set_routes(
+        self,
+        type: str = "",
+        table: int = 0,
+        priority: int = 5,
+        replace: int = 0,
+        engine: str = "networkx",
+        aggregate: int = 0,
+    ):
+        if aggregate and "set" in type:
+            trees = {
+                self.topology.get_node_from_names(dest)[0]: {
+                    node: hop
+                    for node, hop in zip(
+                        self.topology.get_node_from_names(*next_hops.keys()),
+                        self.topology.get_node_from_names(*next_hops.values()),
+                    )
+                }
+                for dest, next_hops in self.topology.get_destination_trees().items()
+            }
+            failures = self.config.set_destination_routes(
+                trees, table=table, priority=priority, replace=bool(replace)
+            )
+            print(f":: set routes to {len(trees)} hosts, {len(failures)} failures")
+            self._raise_for_route_failures(failures, "SET ROUTES FAIL")
+            return
+        paths = self.topology.get_hosts_shortest_path(engine)
+        if "set" not in type and "sync" not in type:
+            for (src, dest), path in sorted(paths.items()):
+                print(f":: {src} -> {dest}:", *path)
+            return
+        paths = {k: self.topology.get_node_from_names(*p) for k, p in paths.items()}
+        if "sync" in type:
+            summary = self.config.reconcile_paths(
+                paths, table, priority, prune=bool(replace)
+            )
+            self._raise_for_route_failures(summary["failures"], "SYNC ROUTES FAIL")
+            return
+        failures = self.config.set_paths(
+            paths, table=table, priority=priority, replace=bool(replace)
+        )
+        print(f":: set {len(paths)} routes, {len(failures)} failures")
+        self._raise_for_route_failures(failures, "SET ROUTES FAIL")
+
+    @staticmethod
+    def _raise_for_route_failures(failures: dict, message: str):
+        """
+        Raise if some routes failed, so the shell and `run_script` report them.
+        - failures: {switch id or path: error message}
+        """
+        if failures:
+            raise Exception(
+                f"{message}: {len(failures)} FAILURES\n"
+                + "\n".join(f"{at}: {error}" for at, error in failures.items())
+            )
 
     def _set_weights(self, edge_weights: list[tuple]) -> int:
         count = 0
@@ -294,6 +809,129 @@ class App(object):
                 print(f":: set weight fail for link {ew}: {e}")
         return count
 
+    def set_weight(self, link: list[str]):
+        if len(link) != 3:
+            raise Exception("INVALID LINK: use `weight <node> <node> <weight>`")
+        self.topology.set_weight(link[0], link[1], int(link[2]))
+
+    def _is_batched(self, command: str, kwargs: dict) -> bool:
+        if command == "weight":
+            return True
+        return (
+            command == "path"
+            and "set" in kwargs["type"]
+            and not kwargs["ecmp"]
+            and not kwargs["update"]
+        )
+
+    def _run_batch(self, batch: list[tuple]) -> list[tuple]:
+        """
+        Run consecutive `weight` and `path ... set` commands together: all weights first, then all paths are computed
+        on the new weights, then their flows are pushed by `set_paths`, one request per switch table.
+        - batch: list of (line number, command, kwargs)
+        Return failures as (line number, message).
+        """
+        failures = []
+        weights = sum(command == "weight" for _, command, _ in batch)
+        print(f":: batch: {weights} weights, {len(batch) - weights} paths")
+        paths = {}  # (table, priority) -> {(src, dest): (line number, nodes)}
+        for number, command, kwargs in batch:
+            if command != "weight":
+                continue
+            try:
+                self.set_weight(kwargs["link"])
+            except Exception as ex:
+                failures.append((number, str(ex)))
+        for number, command, kwargs in batch:
+            if command != "path":
+                continue
+            try:
+                length, path = self.topology.find_shortest_path(
+                    kwargs["source"],
+                    kwargs["destination"],
+                    kwargs["throughs"],
+                    kwargs["blocks"],
+                    kwargs["cutoff"],
+                    ordered=bool(kwargs["ordered"]),
+                )
+                if path is None:
+                    raise Exception("PATH NOT FOUND")
+                group = paths.setdefault((kwargs["table"], kwargs["priority"]), {})
+                group[(path[0], path[-1])] = (
+                    number,
+                    self.topology.get_node_from_names(*path),
+                )
+            except Exception as ex:
+                failures.append((number, str(ex)))
+        for (table, priority), group in paths.items():
+            errors = self.config.set_paths(
+                {key: nodes for key, (_, nodes) in group.items()}, table, priority
+            )
+            for key, (number, nodes) in group.items():
+                for at in [f"{key}"] + [node.id for node in nodes]:
+                    if at in errors:
+                        failures.append((number, f"{at}: {errors[at]}"))
+                        break
+        return failures
+
+    def run_script(self, lines: list[str]) -> dict:
+        """
+        Run commands non-interactively, one per line, as typed in the shell. Empty lines and lines starting with '#' are skipped,
+        `exit` stops. Consecutive `weight` and `path ... set` lines [without `ecmp`, `update`] are run as one batch.
+        Return summary: {"commands", "batches", "failures": [(line number, message)], "seconds"}.
+        """
+        start = time.perf_counter()
+        summary = {"commands": 0, "batches": 0, "failures": []}
+        batch = []
+
+        def flush():
+            if batch:
+                summary["batches"] += 1
+                with self.topology.lock:
+                    summary["failures"].extend(self._run_batch(batch))
+                batch.clear()
+
+        for number, line in enumerate(lines, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if line.startswith("exit"):
+                break
+            summary["commands"] += 1
+            try:
+                command, kwargs = self.comparser.parse(line)
+            except Exception as ex:
+                summary["failures"].append((number, str(ex)))
+                continue
+            if self._is_batched(command, kwargs):
+                batch.append((number, command, kwargs))
+                continue
+            flush()
+            if command == "shell":
+                summary["failures"].append(
+                    (number, "INTERACTIVE COMMAND: use `weight` and `path` lines")
+                )
+                continue
+            mess = self._run_command(line)
+            if mess:
+                summary["failures"].append((number, mess))
+        flush()
+        summary["seconds"] = time.perf_counter() - start
+        return summary
+
+    def _run_script_file(self, path: str) -> dict:
+        if path == "-":
+            summary = self.run_script(sys.stdin.readlines())
+        else:
+            with open(path, "r") as file:
+                summary = self.run_script(file.readlines())
+        for number, mess in summary["failures"]:
+            print(f":: line {number}: {mess}")
+        print(
+            f":: script: {summary['commands']} commands, {summary['batches']} batches, {len(summary['failures'])} failures in {summary['seconds']:.2f}s"
+        )
+        return summary
+
     def _start_shell_for_update_path(self):
         print("|| ======== Shell for updating Paths ========")
         print("|| Enter the path, each node separate by space ' '. One path per line.")
@@ -305,6 +943,9 @@ class App(object):
         print(
             "|| Type 'table <table index>' for set table for following paths, default: 0"
         )
+        print(
+            "|| Type 'update <1/0>' for replacing paths set before without dropping packets, default: 0"
+        )
         print(
             "|| Type 'sh <command>' for run outer level commands. Ex: sh print switches"
         )
@@ -312,13 +953,14 @@ class App(object):
         print("|| Type 'end' or 'exit' for exiting.")
         priority = 5
         table = 0
+        update = False
         while True:
             enter = input("|| >> ")
             comm = enter.lower()
             if comm in ["exit", "end"]:
                 break
             elif comm.startswith("sh"):
-                self.comparser.run(comm[3:])
+                self._run_command(comm[3:])
             elif comm.startswith("priority"):
                 try:
                     priority = int(enter[9:])
@@ -330,9 +972,18 @@ class App(object):
                     table = int(enter[6:])
                 except:
                     print("|| :: set table fail")
+            elif comm.startswith("update"):
+                update = enter[7:].strip() == "1"
+                print("|| :: update =", update)
             else:
                 try:
-                    self._set_path(enter.split(" "), table=table, priority=priority)
+                    with self.topology.lock:
+                        self._set_path(
+                            enter.split(" "),
+                            table=table,
+                            priority=priority,
+                            update=update,
+                        )
                 except Exception as ex:
                     print(f"|| :: update path fail: {ex}")
 
@@ -364,7 +1015,7 @@ class App(object):
                 updates.clear()
                 break
             elif comm.startswith("sh"):
-                self.comparser.run(comm[3:])
+                self._run_command(comm[3:])
             elif comm.startswith("file "):
                 filepath = enter[5:]
                 with open(filepath, "r") as file:
@@ -497,6 +1148,8 @@ class App(object):
                 print(f":: invalid node name {kwargs['node']}")
             else:
                 self.topology.print_object(node_id, kwargs["table"], kwargs["flow"])
+        elif type.startswith("co"):
+            self.connector.print_connection_stats()
         elif type.startswith("li"):
             if node_id is None:
                 print(f":: invalid node name {kwargs['node']}")
@@ -519,14 +1172,27 @@ class App(object):
         elif type == "weight":
             self._start_shell_for_update_weights()
 
+    def _run_command(self, line: str):
+        """
+        Run one shell command holding `topology.lock`, so background updates [subscribe, adaptive, daemon] wait for it.
+        Commands in `_UNLOCKED_COMMANDS` wait for user input or for background threads, they lock where needed.
+        """
+        if line.strip().split(" ")[0] in _UNLOCKED_COMMANDS:
+            return self.comparser.run(line)
+        with self.topology.lock:
+            return self.comparser.run(line)
+
     def _start(self):
-        print("================== SDN Application ==================")
         self.comparser = self._create_app_command_parser()
+        if self.script is not None:
+            self.script_summary = self._run_script_file(self.script)
+            return
+        print("================== SDN Application ==================")
         while True:
             inp = input(">> ")
             if inp.startswith("exit"):
                 break
-            mess = self.comparser.run(inp)
+            mess = self._run_command(inp)
             if mess:
                 print(f":: {mess}")
 
@@ -575,4 +1241,25 @@ class App(object):
 
 
 if __name__ == "__main__":
-    app = App()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="SDN Application")
+    parser.add_argument("--server", default="192.168.1.6")
+    parser.add_argument("--port", type=int, default=8181)
+    parser.add_argument("--user", default=None)
+    parser.add_argument("--password", default=None)
+    parser.add_argument(
+        "--script",
+        default=None,
+        help="Run commands from this file ['-' for stdin] and exit, status 1 if any failed",
+    )
+    args = parser.parse_args()
+
+    app = App(
+        args.server,
+        args.port,
+        None if args.user is None else (args.user, args.password),
+        script=args.script,
+    )
+    if app.script_summary is not None:
+        sys.exit(1 if app.script_summary["failures"] else 0)
@@ -0,0 +1,321 @@
+import argparse
+import contextlib
+import subprocess
+import platform
+import tempfile
+import random
+import time
+import json
+import io
+import os
+import networkx as nx
+from pathfind import PathCache
+from sparsepath import SparsePathEngine, np
+from nettopo import NetworkTopology
+from netconfig import NetworkConfig
+from connector import AsyncConnector
+from flow import FlowBuilder, create_basic_flow
+from mockodl import MockOpenDaylight
+from snapshot import save_snapshot
+import topogen
+
+
+def generate_graph(
+    switch_count: int, host_count: int, degree: int = 4, seed: int = 0
+) -> nx.Graph:
+    """
+    Random connected mesh of `switch_count` switches [s0001...], each host [h0001...] attached to a random switch.
+    Link weights are random in [1, 10].
+    """
+    rand = random.Random(seed)
+    mesh = nx.connected_watts_strogatz_graph(switch_count, degree, 0.2, seed=seed)
+    graph = nx.relabel_nodes(mesh, {i: f"s{i + 1:04}" for i in mesh.nodes})
+    for u, v in graph.edges:
+        graph.edges[u, v]["w"] = rand.randint(1, 10)
+    switches = list(graph.nodes)
+    for i in range(host_count):
+        graph.add_edge(f"h{i + 1:04}", rand.choice(switches), w=1)
+    return graph
+
+
+def bench_host_paths(sizes: list[int], host_count: int, seed: int = 0) -> list[dict]:
+    """
+    Compare host-to-host shortest paths by `PathCache` [networkx] and `SparsePathEngine` [scipy] on generated graphs.
+    """
+    results = []
+    for size in sizes:
+        graph = generate_graph(size, host_count, seed=seed)
+        hosts = [n for n in graph.nodes if n.startswith("h")]
+
+        start = time.perf_counter()
+        nx_paths = PathCache(graph, weight="w").get_paths(hosts)
+        nx_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        sp_paths = SparsePathEngine(graph, weight="w").get_paths(hosts)
+        sp_time = time.perf_counter() - start
+
+        same = nx_paths.keys() == sp_paths.keys() and all(
+            nx.path_weight(graph, nx_paths[k], "w")
+            == nx.path_weight(graph, sp_paths[k], "w")
+            for k in nx_paths
+        )
+        results.append(
+            {
+                "switches": size,
+                "hosts": len(hosts),
+                "pairs": len(nx_paths),
+                "networkx_s": nx_time,
+                "scipy_s": sp_time,
+                "same_lengths": same,
+            }
+        )
+    return results
+
+
+########################### Suite ###########################
+
+
+def percentile(values: list[float], q: float) -> float:
+    """
+    `q`-th percentile [0-100] of `values`, linear interpolation between closest ranks.
+    """
+    values = sorted(values)
+    pos = (len(values) - 1) * q / 100
+    low = int(pos)
+    high = min(low + 1, len(values) - 1)
+    return values[low] + (values[high] - values[low]) * (pos - low)
+
+
+def summarize(times: list[float]) -> dict:
+    return {
+        "runs": len(times),
+        "mean_s": sum(times) / len(times),
+        "min_s": min(times),
+        "p50_s": percentile(times, 50),
+        "p90_s": percentile(times, 90),
+        "p99_s": percentile(times, 99),
+        "max_s": max(times),
+    }
+
+
+def measure(func, repeat: int, warmup: int = 1, setup=None) -> list[float]:
+    """
+    Run `func` `warmup` times, then time `repeat` runs. `setup` [untimed] runs before each run.
+    Output printed by `func` is discarded.
+    """
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for ind in range(warmup + repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            if ind >= warmup:
+                times.append(time.perf_counter() - start)
+    return times
+
+
+def _load_topology(odl_data: tuple[dict, list], folder: str) -> NetworkTopology:
+    path = os.path.join(folder, "bench.pkl")
+    save_snapshot(path, *odl_data)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return NetworkTopology(None, offline_snapshot=path)
+
+
+def bench_extract_nodes(odl_data: tuple[dict, list], repeat: int) -> list[dict]:
+    topology, switches = odl_data
+    times = measure(lambda: NetworkTopology._extract_nodes(topology, switches), repeat)
+    return [{"case": "extract_nodes", **summarize(times)}]
+
+
+def bench_find_shortest_path(
+    topology: NetworkTopology, repeat: int, rand: random.Random
+) -> list[dict]:
+    hosts = sorted(n for n in topology.graph.nodes if n.startswith("h"))
+    switches = sorted(n for n in topology.graph.nodes if n.startswith("s"))
+    pairs = [tuple(rand.sample(hosts, 2)) for _ in range(repeat)]
+    constraints = [
+        (rand.sample(switches, 2), rand.sample(switches, 1)) for _ in range(repeat)
+    ]
+    results = []
+
+    runs = iter(pairs)
+    times = measure(
+        lambda: topology.find_shortest_path(*next(runs)),
+        repeat,
+        warmup=0,
+        setup=topology.path_cache.clear,
+    )
+    results.append({"case": "find_shortest_path", **summarize(times)})
+
+    runs = iter(zip(pairs, constraints))
+
+    def constrained():
+        (src, dest), (throughs, blocks) = next(runs)
+        topology.find_shortest_path(src, dest, throughs, blocks)
+
+    times = measure(constrained, repeat, warmup=0)
+    results.append({"case": "find_shortest_path_constrained", **summarize(times)})
+    return results
+
+
+def bench_hosts_shortest_path(topology: NetworkTopology, repeat: int) -> list[dict]:
+    def reset():
+        topology.path_cache.clear()
+        topology.sparse_engine = None
+
+    results = []
+    for engine in ["networkx"] + (["scipy"] if np is not None else []):
+        times = measure(
+            lambda: topology.get_hosts_shortest_path(engine), repeat, setup=reset
+        )
+        results.append({"case": f"hosts_shortest_path_{engine}", **summarize(times)})
+    return results
+
+
+def bench_flow_building(repeat: int, count: int = 1000) -> list[dict]:
+    def basic():
+        for ind in range(count):
+            create_basic_flow(f"f{ind}", "00:00:00:00:00:01", "00:00:00:00:00:02", 1)
+
+    def builder():
+        for ind in range(count):
+            FlowBuilder().set_generic_info(f"f{ind}", None, 5, 0, 0).build()
+
+    results = []
+    for case, func in [("create_basic_flow", basic), ("flow_builder", builder)]:
+        summary = summarize(measure(func, repeat))
+        summary["flows_per_s"] = count / summary["p50_s"]
+        results.append({"case": case, "flows": count, **summary})
+    return results
+
+
+def bench_set_path(
+    odl_data: tuple[dict, list],
+    topology: NetworkTopology,
+    repeat: int,
+    rand: random.Random,
+    latency: float = 0.0,
+) -> list[dict]:
+    mock = MockOpenDaylight(*odl_data, latency=latency).start()
+    connector = mock.create_connector(
+        auth=("admin", "admin"), content_type="application/json", verbose=False
+    )
+    config = NetworkConfig(connector, AsyncConnector(connector))
+    hosts = sorted(n for n in topology.graph.nodes if n.startswith("h"))
+    paths = []
+    for _ in range(repeat + 1):
+        _, path = topology.find_shortest_path(*rand.sample(hosts, 2))
+        paths.append(topology.get_node_from_names(*path))
+    try:
+        runs = iter(paths)
+        times = measure(lambda: config.set_path(*next(runs)), repeat)
+        hops = sum(len(p) - 2 for p in paths[1:]) / repeat
+    finally:
+        connector.close()
+        mock.stop()
+    return [
+        {"case": "set_path", "latency_s": latency, "switches": hops, **summarize(times)}
+    ]
+
+
+def _git_version() -> str:
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_suite(
+    topo: str = "fattree:8",
+    repeat: int = 20,
+    seed: int = 0,
+    latency: float = 0.0,
+    cases: list[str] = None,
+) -> dict:
+    """
+    Run benchmark cases on a topology generated by `topogen` [Ex: "fattree:8", "torus:20,20", "waxman:500"].
+    - cases: Some of "extract", "paths", "hosts", "flows", "set_path" [Default: all].
+    Return a JSON-able dict: environment and, for each case, timing percentiles in seconds.
+    """
+    kind, _, params = topo.partition(":")
+    generated = topogen.generators[kind](*[int(p) for p in params.split(",") if p])
+    odl_data = generated.to_odl()
+    cases = cases or ["extract", "paths", "hosts", "flows", "set_path"]
+    rand = random.Random(seed)
+
+    results = []
+    with tempfile.TemporaryDirectory() as folder:
+        topology = _load_topology(odl_data, folder)
+    if "extract" in cases:
+        results += bench_extract_nodes(odl_data, repeat)
+    if "paths" in cases:
+        results += bench_find_shortest_path(topology, repeat, rand)
+    if "hosts" in cases:
+        results += bench_hosts_shortest_path(topology, max(repeat // 4, 1))
+    if "flows" in cases:
+        results += bench_flow_building(repeat)
+    if "set_path" in cases:
+        results += bench_set_path(odl_data, topology, repeat, rand, latency)
+    return {
+        "version": _git_version(),
+        "python": platform.python_version(),
+        "networkx": nx.__version__,
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "topology": repr(generated),
+        "repeat": repeat,
+        "seed": seed,
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks")
+    parser.add_argument(
+        "command",
+        nargs="?",
+        default="suite",
+        choices=["suite", "engines"],
+        help="suite [Default]: benchmark suite as JSON. engines: networkx vs scipy host paths",
+    )
+    parser.add_argument("--topo", default="fattree:8", help="Ex: torus:20,20")
+    parser.add_argument("--cases", default=None, help="Ex: extract,paths")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--out", default=None, help="JSON file [Default: stdout]")
+    parser.add_argument("--sizes", default="500,1000,2000,5000")
+    parser.add_argument("--hosts", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "suite":
+        report = run_suite(
+            args.topo,
+            args.repeat,
+            args.seed,
+            args.latency,
+            args.cases.split(",") if args.cases else None,
+        )
+        if args.out is None:
+            print(json.dumps(report, indent=2))
+        else:
+            with open(args.out, "w") as file:
+                json.dump(report, file, indent=2)
+            print(f":: {len(report['results'])} results -> {args.out}")
+        exit(0)
+
+    print(
+        f"{'switches':>8} | {'hosts':>5} | {'pairs':>7} | {'networkx (s)':>12} | {'scipy (s)':>9} | same"
+    )
+    for r in bench_host_paths(
+        [int(s) for s in args.sizes.split(",")], args.hosts, args.seed
+    ):
+        print(
+            f"{r['switches']:>8} | {r['hosts']:>5} | {r['pairs']:>7} | {r['networkx_s']:>12.3f} | {r['scipy_s']:>9.3f} | {r['same_lengths']}"
+        )
@@ -0,0 +1,445 @@
+from nettopo import NetworkTopology
+from node import Switch
+from flow import Flow
+import ipaddress
+import zlib
+
+# Packet fields, as read from flow matches [see match.py]:
+# in_port [port number as string], eth_src, eth_dst [MAC as int], eth_type, ip_proto,
+# ipv4_src, ipv4_dst, ipv6_src, ipv6_dst [address as int], l4_src, l4_dst, icmp_type, icmp_code
+PACKET_FIELDS = (
+    "in_port",
+    "eth_src",
+    "eth_dst",
+    "eth_type",
+    "ip_proto",
+    "ipv4_src",
+    "ipv4_dst",
+    "ipv6_src",
+    "ipv6_dst",
+    "l4_src",
+    "l4_dst",
+    "icmp_type",
+    "icmp_code",
+)
+_ADDRESS_BITS = {"eth_src": 48, "eth_dst": 48, "ipv4_src": 32, "ipv4_dst": 32}
+_ADDRESS_BITS.update({"ipv6_src": 128, "ipv6_dst": 128})
+_L4_PROTOCOLS = {"tcp": 6, "udp": 17, "sctp": 132}
+
+ETH_TYPE_IPV4 = 0x0800
+ETH_TYPE_IPV6 = 0x86DD
+
+
+def mac_to_int(mac: str) -> int:
+    return int(mac.replace(":", ""), 16)
+
+
+def _port_number(port: int | str) -> str:
+    # "openflow:1:2" and 2 are port 2
+    return str(port).rsplit(":", 1)[-1]
+
+
+def _select_hash(packet: "Packet") -> int:
+    # headers without in_port, so a flow keeps its bucket on every switch. CRC low bits mix poorly, use the high ones
+    key = tuple(packet.fields.get(name, None) for name in PACKET_FIELDS[1:])
+    return (zlib.crc32(repr(key).encode()) * 0x9E3779B1 & 0xFFFFFFFF) >> 16
+
+
+class Packet(object):
+    """
+    Header fields of a packet, normalized for classification. Fields not set are absent from the packet.
+    Ex: Packet(eth_src="00:00:00:00:00:01", eth_dst="00:00:00:00:00:02", eth_type=0x0800, ip_proto=6, l4_dst=80)
+    """
+
+    def __init__(self, **fields) -> None:
+        self.fields = {}
+        for name, value in fields.items():
+            if name not in PACKET_FIELDS:
+                raise Exception(f"Packet field {name} not found. Used {PACKET_FIELDS}")
+            if value is None:
+                continue
+            if name == "in_port":
+                value = _port_number(value)
+            elif name in ["eth_src", "eth_dst"] and isinstance(value, str):
+                value = mac_to_int(value)
+            elif name in _ADDRESS_BITS and isinstance(value, str):
+                value = int(ipaddress.ip_address(value))
+            self.fields[name] = value
+
+    def with_fields(self, **fields) -> "Packet":
+        ret = Packet()
+        ret.fields = dict(self.fields)
+        ret.fields.update(Packet(**fields).fields)
+        return ret
+
+    def key(self) -> tuple:
+        return tuple(self.fields.get(name, None) for name in PACKET_FIELDS)
+
+    def __repr__(self) -> str:
+        return f"Packet({', '.join(f'{k}={v}' for k, v in self.fields.items())})"
+
+
+class Rule(object):
+    """
+    One flow compiled for lookup: `exact` fields {name: value} and `masked` fields {name: (value, mask)}.
+    Actions: `outputs` [port numbers or reserved ports: CONTROLLER, FLOOD, ALL, INPORT, LOCAL], `groups`, `goto` table.
+    """
+
+    def __init__(self, flow: Flow, table_id) -> None:
+        self.flow_id = flow.id
+        self.table_id = table_id
+        self.priority = flow.data.get("priority", 0)
+        self.exact = {}
+        self.masked = {}
+        self._compile_match(flow.data.get("match", {}))
+        self.outputs, self.groups, self.goto = [], [], None
+        self._compile_instructions(flow.data.get("instructions", {}))
+        self.signature = tuple(sorted(self.exact)) + tuple(
+            sorted((name, mask) for name, (_, mask) in self.masked.items())
+        )
+
+    def _set_masked(self, name: str, value: int, mask: int):
+        full = (1 << _ADDRESS_BITS[name]) - 1
+        if mask == full:
+            self.exact[name] = value
+        elif mask:
+            self.masked[name] = (value & mask, mask)
+
+    def _compile_address(self, name: str, entry: dict):
+        value = mac_to_int(entry["address"])
+        mask = mac_to_int(entry["mask"]) if entry.get("mask") else (1 << 48) - 1
+        self._set_masked(name, value, mask)
+
+    def _compile_prefix(self, name: str, prefix: str):
+        network = ipaddress.ip_network(prefix, strict=False)
+        self._set_masked(name, int(network.network_address), int(network.netmask))
+
+    def _compile_match(self, match: dict):
+        for key in ["in-port", "in-phy-port"]:
+            if key in match:
+                self.exact["in_port"] = _port_number(match[key])
+        ether = match.get("ethernet-match", {})
+        if "ethernet-source" in ether:
+            self._compile_address("eth_src", ether["ethernet-source"])
+        if "ethernet-destination" in ether:
+            self._compile_address("eth_dst", ether["ethernet-destination"])
+        if "ethernet-type" in ether:
+            self.exact["eth_type"] = int(ether["ethernet-type"]["type"])
+        if "ip-protocol" in match.get("ip-match", {}):
+            self.exact["ip_proto"] = int(match["ip-match"]["ip-protocol"])
+        for version in ["ipv4", "ipv6"]:
+            for side in ["source", "destination"]:
+                if f"{version}-{side}" in match:
+                    self._compile_prefix(
+                        f"{version}_{side[:3] if side == 'source' else 'dst'}",
+                        match[f"{version}-{side}"],
+                    )
+        for protocol, number in _L4_PROTOCOLS.items():
+            for side, name in [("source", "l4_src"), ("destination", "l4_dst")]:
+                if f"{protocol}-{side}-port" in match:
+                    self.exact[name] = int(match[f"{protocol}-{side}-port"])
+                    self.exact.setdefault("ip_proto", number)
+        for version in ["icmpv4", "icmpv6"]:
+            icmp = match.get(f"{version}-match", {})
+            if f"{version}-type" in icmp:
+                self.exact["icmp_type"] = int(icmp[f"{version}-type"])
+            if f"{version}-code" in icmp:
+                self.exact["icmp_code"] = int(icmp[f"{version}-code"])
+
+    def _compile_instructions(self, instructions: dict):
+        for ins in instructions.get("instruction", []):
+            if "go-to-table" in ins:
+                self.goto = ins["go-to-table"]["table_id"]
+            for kind in ["apply-actions", "write-actions"]:
+                for action in sorted(
+                    ins.get(kind, {}).get("action", []), key=lambda a: a.get("order", 0)
+                ):
+                    if "output-action" in action:
+                        port = action["output-action"]["output-node-connector"]
+                        self.outputs.append(_port_number(port))
+                    elif "group-action" in action:
+                        self.groups.append(action["group-action"]["group-id"])
+                    elif "drop-action" in action:
+                        self.outputs, self.groups = [], []
+
+    @property
+    def drops(self) -> bool:
+        return not self.outputs and not self.groups and self.goto is None
+
+    def matches_masked(self, packet: Packet) -> bool:
+        for name, (value, mask) in self.masked.items():
+            field = packet.fields.get(name, None)
+            if field is None or field & mask != value:
+                return False
+        return True
+
+    def __repr__(self) -> str:
+        return f"[{self.priority:>5}] {self.flow_id}"
+
+
+class TableIndex(object):
+    """
+    Tuple space search over one table: rules are grouped by the fields [and masks] they match on,
+    each group is a hash map from those fields' values to rules, highest priority first.
+    A lookup costs one hash probe per group [usually a handful], not one check per rule.
+    Groups are probed from the highest priority they hold, and skipped once a better rule is found.
+    """
+
+    def __init__(self, rules: list[Rule]) -> None:
+        spaces = {}  # signature -> {values: [rules]}
+        for rule in rules:
+            values = tuple(rule.exact[name] for name in sorted(rule.exact)) + tuple(
+                value for _, (value, _) in sorted(rule.masked.items())
+            )
+            spaces.setdefault(rule.signature, {}).setdefault(values, []).append(rule)
+        self.spaces = []  # (max priority, exact names, masked (name, mask), map)
+        for signature, buckets in spaces.items():
+            for bucket in buckets.values():
+                bucket.sort(key=lambda r: -r.priority)
+            sample = next(iter(buckets.values()))[0]
+            self.spaces.append(
+                (
+                    max(bucket[0].priority for bucket in buckets.values()),
+                    tuple(sorted(sample.exact)),
+                    tuple(
+                        (name, mask)
+                        for name, (_, mask) in sorted(sample.masked.items())
+                    ),
+                    buckets,
+                )
+            )
+        self.spaces.sort(key=lambda s: -s[0])
+        self.rules = rules
+
+    def lookup(self, packet: Packet) -> Rule:
+        """
+        Return the highest priority rule matching `packet`, or None [table miss].
+        """
+        fields = packet.fields
+        best = None
+        for max_priority, exact, masked, buckets in self.spaces:
+            if best is not None and best.priority >= max_priority:
+                break
+            try:
+                values = tuple(fields[name] for name in exact) + tuple(
+                    fields[name] & mask for name, mask in masked
+                )
+            except KeyError:
+                continue  # packet lacks a field this space matches on
+            bucket = buckets.get(values, None)
+            if bucket and (best is None or bucket[0].priority > best.priority):
+                best = bucket[0]
+        return best
+
+
+class SwitchClassifier(object):
+    """
+    All tables and groups of one switch, compiled from its operational data.
+    - all_buckets: Select groups output to all their buckets [every path some flow may take], instead of the hashed one.
+    """
+
+    def __init__(self, switch: Switch, all_buckets: bool = False) -> None:
+        self.switch = switch
+        self.all_buckets = all_buckets
+        self.source = switch.tables  # re-parsed by the switch on update
+        self.tables = {
+            table_id: TableIndex(
+                [Rule(flow, table_id) for flow in table.flows.values()]
+            )
+            for table_id, table in self.source.items()
+        }
+        self.groups = {
+            group["group-id"]: group
+            for group in switch.data.get("flow-node-inventory:group", [])
+        }
+        self.ports = {
+            str(port.port_number): port
+            for port in switch.ports.values()
+            if port.port_number is not None
+        }
+        self._cache = {}  # packet key -> result
+
+    def _group_outputs(self, group_id: int, packet: Packet) -> list[str]:
+        group = self.groups.get(group_id, None)
+        if group is None:
+            return []
+        buckets = group.get("buckets", {}).get("bucket", [])
+        if not buckets:
+            return []
+        group_type = None if self.all_buckets else group.get("group-type", None)
+        if group_type in ["group-select", "group-indirect"]:
+            # the switch hashes packet fields to choose a bucket, here a fixed hash of the headers
+            buckets = [buckets[_select_hash(packet) % len(buckets)]]
+        elif group_type == "group-ff":
+            buckets = buckets[:1]
+        outputs = []
+        for bucket in buckets:
+            for action in bucket.get("action", []):
+                if "output-action" in action:
+                    port = action["output-action"]["output-node-connector"]
+                    outputs.append(_port_number(port))
+        return outputs
+
+    def classify(
+        self, packet: Packet, table_id: int = 0
+    ) -> tuple[list[Rule], list[str]]:
+        """
+        Run `packet` through the pipeline from `table_id`. Return (matched rules in order, output ports).
+        No rules or no outputs means the packet is dropped [table miss or drop action].
+        """
+        key = (table_id, packet.key())
+        cached = self._cache.get(key, None)
+        if cached is not None:
+            return cached
+        rules, outputs = [], []
+        while table_id in self.tables:
+            rule = self.tables[table_id].lookup(packet)
+            if rule is None:
+                break
+            rules.append(rule)
+            outputs.extend(rule.outputs)
+            for group_id in rule.groups:
+                outputs.extend(self._group_outputs(group_id, packet))
+            if rule.goto is None or rule.goto <= table_id:
+                break
+            table_id = rule.goto
+        self._cache[key] = (rules, outputs)
+        return rules, outputs
+
+    def classify_batch(self, packets: list[Packet], table_id: int = 0) -> list[tuple]:
+        """
+        Classify many packets. Packets with the same headers are looked up once.
+        """
+        return [self.classify(packet, table_id) for packet in packets]
+
+
+class TraceResult(object):
+    """
+    Path of a packet: hops (switch name, in port, matched flow ids, out port) and how it ended:
+    'delivered' [at `host`], 'drop', 'miss' [no flow matched], 'controller', 'loop', 'too long'.
+    """
+
+    def __init__(self, hops: list, status: str, host: str = None) -> None:
+        self.hops = hops
+        self.status = status
+        self.host = host
+
+    def __repr__(self) -> str:
+        lines = [
+            f"   {name:<8} in [{in_port:>4}] -> out [{out_port:>10}] : {', '.join(flows) or 'None'}"
+            for name, in_port, flows, out_port in self.hops
+        ]
+        end = f"delivered to {self.host}" if self.status == "delivered" else self.status
+        return "\n".join(lines + [f"   => {end}"])
+
+
+class NetworkClassifier(object):
+    """
+    Predict forwarding of packets from the flow tables of the topology's last refresh [no switch is contacted].
+    Switches are compiled on first use, and again once a refresh changed them.
+    """
+
+    def __init__(
+        self, topology: NetworkTopology, max_hops: int = 64, all_buckets: bool = False
+    ) -> None:
+        self.topology = topology
+        self.max_hops = max_hops
+        self.all_buckets = all_buckets
+        self.switches = {}  # switch id -> SwitchClassifier
+
+    def reset(self):
+        self.switches.clear()
+
+    def get_switch(self, node_id: str) -> SwitchClassifier:
+        node = self.topology.nodes[node_id]
+        ret = self.switches.get(node_id, None)
+        if ret is None or ret.switch is not node or ret.source is not node.tables:
+            ret = self.switches[node_id] = SwitchClassifier(node, self.all_buckets)
+        return ret
+
+    def packet_between(self, src: str, dest: str, **fields) -> Packet:
+        """
+        IPv4 packet between two hosts [by name], other header fields from `fields`. Ex: ip_proto=6, l4_dst=80
+        """
+        src_host, dest_host = self.topology.get_node_from_names(src, dest)
+        if src_host is None or dest_host is None:
+            raise Exception(f"HOST NOT FOUND: {src}, {dest}")
+        return Packet(
+            eth_src=src_host.mac,
+            eth_dst=dest_host.mac,
+            eth_type=ETH_TYPE_IPV4,
+            ipv4_src=src_host.ip,
+            ipv4_dst=dest_host.ip,
+        ).with_fields(**fields)
+
+    def trace(self, src: str, packet: Packet) -> list[TraceResult]:
+        """
+        Follow `packet` sent by host `src` hop by hop. One result per branch [flooded or multicast packets].
+        """
+        host = self.topology.get_node_from_names(src)[0]
+        if host is None:
+            raise Exception(f"HOST NOT FOUND: {src}")
+        port = next(iter(host.ports.values()))
+        if port.peer is None:
+            return [TraceResult([], "miss")]
+        return self._trace(port.peer, packet, [], set())
+
+    def forward(self, node: Switch, in_port: str, packet: Packet) -> tuple[list, list]:
+        """
+        One hop: packet entering switch `node` at `in_port`. Return (matched flow ids, outputs).
+        Outputs: list of (out port, peer Port), peer is None for the controller [out port 'CONTROLLER'] or a port without link.
+        No flow ids is a table miss, flow ids without outputs a drop.
+        """
+        switch = self.get_switch(node.id)
+        rules, outputs = switch.classify(packet.with_fields(in_port=in_port))
+        if any(out in ["FLOOD", "ALL"] for out in outputs):
+            outputs = [p for p in switch.ports if p != in_port] + [
+                out for out in outputs if out not in ["FLOOD", "ALL"]
+            ]
+        ret = []
+        for out in dict.fromkeys(outputs):
+            port = switch.ports.get(in_port if out == "INPORT" else out, None)
+            ret.append((out, None if port is None else port.peer))
+        return [rule.flow_id for rule in rules], ret
+
+    def _trace(
+        self, port, packet: Packet, hops: list, visited: set
+    ) -> list[TraceResult]:
+        node = port.owner
+        if node.type == "host":
+            return [TraceResult(hops, "delivered", node.name)]
+        in_port = str(port.port_number)
+        if (node.id, in_port) in visited:
+            return [TraceResult(hops, "loop")]
+        if len(hops) >= self.max_hops:
+            return [TraceResult(hops, "too long")]
+        flow_ids, outputs = self.forward(node, in_port, packet)
+        if not flow_ids:
+            return [TraceResult(hops + [(node.name, in_port, [], "")], "miss")]
+        if not outputs:
+            return [TraceResult(hops + [(node.name, in_port, flow_ids, "")], "drop")]
+
+        visited = visited | {(node.id, in_port)}
+        results = []
+        for out, peer in outputs:
+            hop = hops + [(node.name, in_port, flow_ids, out)]
+            if out == "CONTROLLER":
+                results.append(TraceResult(hop, "controller"))
+            elif peer is None:
+                results.append(TraceResult(hop, "drop"))
+            else:
+                results.extend(self._trace(peer, packet, hop, visited))
+        return results
+
+    def trace_between(self, src: str, dest: str, **fields) -> list[TraceResult]:
+        return self.trace(src, self.packet_between(src, dest, **fields))
+
+    def trace_batch(
+        self, pairs: list[tuple], **fields
+    ) -> dict[tuple, list[TraceResult]]:
+        """
+        Trace packets between many (source, destination) host pairs. Compiled tables and lookups are shared.
+        """
+        return {
+            (src, dest): self.trace_between(src, dest, **fields) for src, dest in pairs
+        }
@@ -1,29 +1,47 @@
 import requests as rq
+from requests.adapters import HTTPAdapter
+from concurrent.futures import ThreadPoolExecutor
+from metrics import RequestMetrics
+import asyncio
+import threading
+import time
 import json
 
 
-def make_request(method, endpoint, headers, auth, data=None):
+def make_request(
+    method, endpoint, headers, auth, data=None, *, session=None, timeout=None
+):
+    # `session` keeps connections alive between calls, module-level `rq` opens a new one each time
+    requester = rq if session is None else session
     if method == "GET":
         try:
-            response = rq.get(endpoint, headers=headers, auth=auth)
+            response = requester.get(
+                endpoint, headers=headers, auth=auth, timeout=timeout
+            )
         except rq.exceptions.RequestException as e:
             raise Exception(f"Error on GET: {e}")
     elif method == "PUT":
         try:
             # print(data)
-            response = rq.put(endpoint, headers=headers, data=data, auth=auth)
+            response = requester.put(
+                endpoint, headers=headers, data=data, auth=auth, timeout=timeout
+            )
         except rq.exceptions.RequestException as e:
             raise Exception(f"Error on PUT: {e}")
     elif method == "POST":
         try:
             # print(data)
-            response = rq.post(endpoint, headers=headers, data=data, auth=auth)
+            response = requester.post(
+                endpoint, headers=headers, data=data, auth=auth, timeout=timeout
+            )
         except rq.exceptions.RequestException as e:
             raise Exception(f"Error on POST: {e}")
     elif method == "DELETE":
         try:
             # print(endpoint)
-            response = rq.delete(endpoint, headers=headers, auth=auth)
+            response = requester.delete(
+                endpoint, headers=headers, auth=auth, timeout=timeout
+            )
         except rq.exceptions.RequestException as e:
             raise Exception(f"Error on DELETE: {e}")
     else:
@@ -50,45 +68,109 @@ class Connector(object):
         server_port=8181,
         auth: tuple = None,
         content_type="application/json",
+        *,
+        pool_size: int = 10,
+        keep_alive: bool = True,
+        timeout: float | tuple = (3.05, 30),
+        verbose: bool = True,
     ) -> None:
+        """
+        - pool_size: Maximum number of persistent connections kept to the server.
+        - keep_alive: False if want to close the connection after each request.
+        - timeout: Per-request timeout in seconds, `(connect, read)` or a single value for both.
+        - verbose: Print each request. Set False for bulk operations, `metrics` still records all requests.
+        """
         if auth is None:
             auth = ("admin", "admin")
         self.server = f"http://{server_ip}:{server_port}"
         self.auth = auth
         self.headers = {"Content-type": content_type}
+        if not keep_alive:
+            self.headers["Connection"] = "close"
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.requests_count = 0
+        self.verbose = verbose
+        self.metrics = RequestMetrics()
+        self._lock = threading.Lock()
 
-    def get(self, endpoint: str):
-        print(f"... GET: {endpoint} ...")
-        response = make_request(
-            "GET", self.server + endpoint, headers=self.headers, auth=self.auth
+        self.session = rq.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _request(
+        self, method: str, endpoint: str, data: str = None, quiet: bool = False
+    ):
+        with self._lock:
+            self.requests_count += 1
+        if self.verbose and not quiet:
+            print(f"... {method}: {endpoint} ...")
+        start = time.perf_counter()
+        response, received = None, 0
+        try:
+            response = make_request(
+                method,
+                self.server + endpoint,
+                headers=self.headers,
+                auth=self.auth,
+                data=data,
+                session=self.session,
+                timeout=self.timeout,
+            )
+            received = len(response.content)
+            return response
+        finally:
+            self.metrics.record(
+                method,
+                endpoint,
+                time.perf_counter() - start,
+                0 if data is None else len(data),
+                received,
+                error=response is None,
+            )
+
+    def connection_stats(self) -> dict:
+        """
+        Return number of requests sent, TCP connections opened and requests served by a reused connection.
+        """
+        connections = 0
+        for adapter in set(self.session.adapters.values()):
+            pools = adapter.poolmanager.pools
+            for key in pools.keys():
+                pool = pools.get(key)
+                if pool is not None:
+                    connections += pool.num_connections
+        return {
+            "requests": self.requests_count,
+            "connections": connections,
+            "reused": max(self.requests_count - connections, 0),
+        }
+
+    def print_connection_stats(self):
+        stats = self.connection_stats()
+        print(
+            f":: [Requests = {stats['requests']}] [Connections = {stats['connections']}] [Reused = {stats['reused']}] [Pool Size = {self.pool_size}]"
         )
+
+    def close(self):
+        self.session.close()
+
+    def get(self, endpoint: str, *, quiet: bool = False):
+        """
+        - quiet: Do not print this request even if `verbose`. Ex: periodic polls.
+        """
+        response = self._request("GET", endpoint, quiet=quiet)
         return json.loads(response.text)
 
     def put(self, endpoint: str, data: dict):
-        print(f"... PUT: {endpoint} ...")
-        return make_request(
-            "PUT",
-            self.server + endpoint,
-            headers=self.headers,
-            auth=self.auth,
-            data=json.dumps(data),
-        )
+        return self._request("PUT", endpoint, json.dumps(data))
 
     def post(self, endpoint: str, data: dict):
-        print(f"... POST: {endpoint} ...")
-        return make_request(
-            "POST",
-            self.server + endpoint,
-            headers=self.headers,
-            auth=self.auth,
-            data=json.dumps(data),
-        )
+        return self._request("POST", endpoint, json.dumps(data))
 
     def delete(self, endpoint: str):
-        print(f"... DELETE: {endpoint} ...")
-        return make_request(
-            "DELETE", self.server + endpoint, headers=self.headers, auth=self.auth
-        )
+        return self._request("DELETE", endpoint)
 
     # def get_topology(self):
     #     endpoint = "/restconf/operational/network-topology:network-topology/"
@@ -178,3 +260,123 @@ class Connector(object):
             return "flow", self.get(endpoint)["flow-node-inventory:table"].get(
                 "flow", []
             )
+
+    def create_stream(
+        self, path: str, datastore: str = "OPERATIONAL", scope: str = "SUBTREE"
+    ) -> str:
+        """
+        Subscribe to data change notifications under `path`. Ex: "/network-topology:network-topology"
+        Return the stream location: Server-Sent Events [http://] or websocket [ws://], by the controller's `use-sse` setting.
+        """
+        endpoint = (
+            "/restconf/operations/sal-remote:create-data-change-event-subscription"
+        )
+        data = {
+            "input": {
+                "path": path,
+                "sal-remote-augment:datastore": datastore,
+                "sal-remote-augment:scope": scope,
+                "sal-remote-augment:notification-output-type": "JSON",
+            }
+        }
+        name = json.loads(self.post(endpoint, data).text)["output"]["stream-name"]
+        response = self._request("GET", f"/restconf/streams/stream/{name}")
+        location = response.headers.get("Location", None)
+        if location is None and response.text:
+            location = json.loads(response.text).get("location", None)
+        if location is None:
+            raise Exception(f"STREAM NOT FOUND: no location for stream {name}")
+        return location
+
+    def open_stream(self, location: str):
+        """
+        Open a Server-Sent Events stream, outside the session pool [it stays open]. Read it by `iter_lines()`.
+        """
+        connect = self.timeout[0] if isinstance(self.timeout, tuple) else self.timeout
+        try:
+            response = rq.get(
+                location,
+                headers={"Accept": "text/event-stream"},
+                auth=self.auth,
+                stream=True,
+                timeout=(connect, None),
+            )
+        except rq.exceptions.RequestException as e:
+            raise Exception(f"Error on stream: {e}")
+        if not response.status_code // 100 == 2:
+            response.close()
+            raise Exception(f"Unexpected Response {format(response)}")
+        return response
+
+
+class AsyncConnector(object):
+    """
+    Asyncio variant of `Connector`. Requests run on the pooled session of the wrapped `Connector`,
+    at most `max_concurrency` at the same time [Default: the connector's pool size].
+    """
+
+    def __init__(self, connector: Connector, max_concurrency: int = None) -> None:
+        if max_concurrency is None:
+            max_concurrency = connector.pool_size
+        self.connector = connector
+        self.max_concurrency = max_concurrency
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self._loop = None
+        self._semaphore = None
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        # A semaphore is bound to the event loop that first waits on it, so create one per loop
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def _call(self, func, *args, **kwargs):
+        async with self._get_semaphore():
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, lambda: func(*args, **kwargs)
+            )
+
+    async def get(self, endpoint: str):
+        return await self._call(self.connector.get, endpoint)
+
+    async def put(self, endpoint: str, data: dict):
+        return await self._call(self.connector.put, endpoint, data)
+
+    async def post(self, endpoint: str, data: dict):
+        return await self._call(self.connector.post, endpoint, data)
+
+    async def delete(self, endpoint: str):
+        return await self._call(self.connector.delete, endpoint)
+
+    async def get_object(
+        self, node_id, table_id=None, flow_id=None, *, datastore="operational"
+    ) -> tuple[str, object]:
+        return await self._call(
+            self.connector.get_object, node_id, table_id, flow_id, datastore=datastore
+        )
+
+    async def get_objects(
+        self, level: str = "topo", node_id=None, table_id=None
+    ) -> tuple[str, list]:
+        return await self._call(self.connector.get_objects, level, node_id, table_id)
+
+    async def gather(self, requests: list[tuple]) -> list:
+        """
+        Send all `requests` concurrently. Each request is a tuple `(method, *args)`. Ex: ("put", endpoint, data)
+        Return results in the same order, an Exception object for each failed request.
+        """
+        return await asyncio.gather(
+            *[getattr(self, method)(*args) for method, *args in requests],
+            return_exceptions=True,
+        )
+
+    def run_all(self, requests: list[tuple]) -> list:
+        """
+        Blocking version of `gather`, for callers outside an event loop.
+        """
+        return asyncio.run(self.gather(requests))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
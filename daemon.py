@@ -0,0 +1,333 @@
+from nettopo import NetworkTopology
+from netconfig import NetworkConfig
+from connector import Connector, AsyncConnector
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import threading
+import asyncio
+import json
+
+_REASONS = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    500: "Internal Server Error",
+}
+
+
+def _split(value: str) -> list[str]:
+    return None if not value else value.split(",")
+
+
+class PathDaemon(object):
+    """
+    Local HTTP/JSON API over one topology kept in memory:
+    - GET  /path?src=h01&dest=h10[&throughs=s01,s02][&blocks=s03][&cutoff=5][&ordered=1] -> {"length", "path"}
+    - GET  /paths[?engine=scipy] -> {"paths": [[node, ...], ...]} shortest paths between all hosts
+    - POST /path {"src", "dest" [or "path": [node, ...]], "table", "priority", "update"} -> install flows of the path
+    - POST /weights {"weights": [[node, node, weight], ...]} -> {"changed", "failures"}
+    - POST /refresh -> {"diff"}
+    - GET  /stats -> {"version", "cached", "requests", "hits", "coalesced", "computed"}
+    Requests are handled by an asyncio server. Work on the topology runs in one worker thread, in arrival order,
+    holding `topology.lock`, so the model is never read while a refresh, a weight update or another thread changes it.
+    Path answers are cached for the topology version they were computed on [`NetworkTopology.version`]: any change
+    of the graph drops them, by this API or by other threads [`TopologySubscriber`, `AdaptiveWeights`, the shell].
+    Identical queries arriving while one is computed wait for the same result instead of computing it again.
+    """
+
+    def __init__(
+        self,
+        topology: NetworkTopology,
+        config: NetworkConfig,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 8282,
+        cache_size: int = 100000,
+    ) -> None:
+        self.topology = topology
+        self.config = config
+        self.host = host
+        self.port = port
+        self.cache_size = cache_size
+        self.model = ThreadPoolExecutor(max_workers=1)  # every access to the topology
+        self.version = topology.version  # of the cached answers
+        self.cache = {}  # query -> answer, of `version`
+        self.pending = {}  # query -> future of the answer being computed
+        self.counters = {"requests": 0, "hits": 0, "coalesced": 0, "computed": 0}
+        self.routes = {
+            ("GET", "/path"): self._get_path,
+            ("GET", "/paths"): self._get_paths,
+            ("POST", "/path"): self._set_path,
+            ("POST", "/weights"): self._set_weights,
+            ("POST", "/refresh"): self._refresh,
+            ("GET", "/stats"): self._stats,
+        }
+        self._loop = None
+        self._stopped = None
+        self._connections = set()  # tasks serving open connections
+        self._ready = threading.Event()
+        self._thread = None
+
+    ############################## Model ##############################
+
+    def _check_version(self):
+        """
+        Drop cached answers if the topology changed since they were computed.
+        """
+        version = self.topology.version
+        if version != self.version:
+            self.version = version
+            self.cache.clear()
+            self.pending.clear()  # later queries must not join answers of an old version
+
+    def _locked(self, func, *args):
+        with self.topology.lock:
+            return func(*args)
+
+    def _versioned(self, func, *args) -> tuple:
+        # run in `_locked`: the version is the one the answer is computed on
+        return self.topology.version, func(*args)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.model, self._locked, func, *args
+        )
+
+    async def _query(self, key: tuple, func, *args):
+        """
+        Answer of `func(*args)` for query `key`: from the cache, from the same query in progress, or computed.
+        """
+        self._check_version()
+        if key in self.cache:
+            self.counters["hits"] += 1
+            return self.cache[key]
+        future = self.pending.get(key, None)
+        if future is None:
+            self.counters["computed"] += 1
+            future = self.pending[key] = asyncio.ensure_future(
+                self._run(self._versioned, func, *args)
+            )
+            future.add_done_callback(lambda f: self._query_done(key, f))
+        else:
+            self.counters["coalesced"] += 1
+        # a client leaving must not cancel the answer others wait for
+        _, answer = await asyncio.shield(future)
+        return answer
+
+    def _query_done(self, key: tuple, future: asyncio.Future):
+        if self.pending.get(key, None) is future:
+            del self.pending[key]
+        if future.cancelled() or future.exception() is not None:
+            return
+        version, answer = future.result()
+        self._check_version()
+        if version == self.version:
+            if len(self.cache) >= self.cache_size:
+                del self.cache[next(iter(self.cache))]  # oldest
+            self.cache[key] = answer
+
+    def _find_path(self, src, dest, throughs, blocks, cutoff, ordered) -> dict:
+        length, path = self.topology.find_shortest_path(
+            src, dest, throughs, blocks, cutoff, ordered=ordered
+        )
+        return {"length": length, "path": path}
+
+    def _install_path(self, path: list[str], table, priority, update) -> dict:
+        if not self.topology.is_valid_path(*path):
+            raise Exception("INVALID PATH")
+        nodes = self.topology.get_node_from_names(*path)
+        self.config.set_path(*nodes, table=table, priority=priority, update=update)
+        return {"path": path}
+
+    def _apply_weights(self, weights: list) -> dict:
+        changed, failures = 0, []
+        for u, v, w in weights:
+            try:
+                self.topology.set_weight(u, v, int(w))
+                changed += 1
+            except Exception as ex:
+                failures.append([u, v, str(ex)])
+        return {"changed": changed, "failures": failures}
+
+    ############################## Routes ##############################
+
+    async def _path(
+        self, src, dest, throughs=None, blocks=None, cutoff=None, ordered=False
+    ):
+        args = (src, dest, throughs, blocks, cutoff, bool(ordered))
+        key = ("path",) + tuple(tuple(a) if isinstance(a, list) else a for a in args)
+        return await self._query(key, self._find_path, *args)
+
+    async def _get_path(self, query: dict, body: dict) -> dict:
+        return await self._path(
+            query["src"],
+            query["dest"],
+            _split(query.get("throughs", None)),
+            _split(query.get("blocks", None)),
+            int(query["cutoff"]) if query.get("cutoff", None) else None,
+            query.get("ordered", "0") == "1",
+        )
+
+    async def _get_paths(self, query: dict, body: dict) -> dict:
+        engine = query.get("engine", "networkx")
+
+        def compute():
+            paths = self.topology.get_hosts_shortest_path(engine)
+            return {"paths": [paths[key] for key in sorted(paths)]}
+
+        return await self._query(("paths", engine), compute)
+
+    async def _set_path(self, query: dict, body: dict) -> dict:
+        path = body.get("path", None)
+        if path is None:
+            answer = await self._path(
+                body["src"],
+                body["dest"],
+                body.get("throughs", None),
+                body.get("blocks", None),
+                body.get("cutoff", None),
+                body.get("ordered", False),
+            )
+            path = answer["path"]
+            if path is None:
+                raise Exception("PATH NOT FOUND")
+        return await self._run(
+            self._install_path,
+            path,
+            body.get("table", 0),
+            body.get("priority", 5),
+            bool(body.get("update", False)),
+        )
+
+    async def _set_weights(self, query: dict, body: dict) -> dict:
+        return await self._run(self._apply_weights, body["weights"])
+
+    async def _refresh(self, query: dict, body: dict) -> dict:
+        return {"diff": str(await self._run(self.topology.refresh))}
+
+    async def _stats(self, query: dict, body: dict) -> dict:
+        return dict(self.counters, version=self.version, cached=len(self.cache))
+
+    ############################## HTTP ##############################
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> tuple:
+        url = urlsplit(target)
+        route = self.routes.get((method, url.path.rstrip("/")), None)
+        if route is None:
+            return 404, {"error": f"NOT FOUND: {method} {url.path}"}
+        self.counters["requests"] += 1
+        try:
+            query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            return 200, await route(query, json.loads(body) if body else {})
+        except (KeyError, ValueError, TypeError) as ex:
+            return 400, {"error": f"INVALID REQUEST: {ex}"}
+        except Exception as ex:
+            return 500, {"error": str(ex)}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:  # keep-alive
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, _ = line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in [b"\r\n", b"\n", b""]:
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                status, answer = await self._dispatch(method, target, body)
+                data = json.dumps(answer).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode()
+                    + data
+                )
+                await writer.drain()
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        except asyncio.CancelledError:
+            pass  # closed by `stop`, ending normally: some Python versions log cancelled connection tasks
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._stopped = asyncio.Event()
+        server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await self._stopped.wait()
+        for task in self._connections:  # idle keep-alive connections
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+
+    def serve_forever(self):
+        asyncio.run(self._serve())
+
+    def start(self) -> "PathDaemon":
+        """
+        Serve in a background thread. Return when listening.
+        """
+        self._ready.clear()
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._stopped.set)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description="Path computation and flow programming API"
+    )
+    parser.add_argument("--server", default="192.168.1.6")
+    parser.add_argument("--port", type=int, default=8181)
+    parser.add_argument("--user", default=None)
+    parser.add_argument("--password", default=None)
+    parser.add_argument("--listen", default="127.0.0.1")
+    parser.add_argument("--listen-port", type=int, default=8282)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    connector = Connector(
+        args.server,
+        args.port,
+        None if args.user is None else (args.user, args.password),
+        "application/json",
+        pool_size=max(args.concurrency, 1),
+        verbose=False,
+    )
+    daemon = PathDaemon(
+        NetworkTopology(connector),
+        NetworkConfig(
+            connector,
+            (
+                AsyncConnector(connector, args.concurrency)
+                if args.concurrency > 1
+                else None
+            ),
+        ),
+        host=args.listen,
+        port=args.listen_port,
+    )
+    print(f":: serving on {args.listen}:{args.listen_port}, Ctrl+C for exiting")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
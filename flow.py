@@ -21,6 +21,8 @@
 
 from instruction import InstructionBuilder, instruction2string, APPLY_ACTIONS_INS
 from match import MatchBuilder, match2string
+import hashlib
+import json
 
 
 APPLY_ACTIONS_INS = "apply-actions"
@@ -103,6 +105,28 @@ def create_basic_flow(
     )
 
 
+def create_group_flow(
+    id: str,
+    src_mac: str,
+    dest_mac: str,
+    group_id: int,
+    *,
+    name: str = None,
+    priority: int = 0,
+):
+    return (
+        FlowBuilder()
+        .set_generic_info(id, name, priority, 0, 0)
+        .create_match_builder()
+        .add_ethernet_criterion(None, src_mac, dest_mac)
+        .owner()
+        .create_instruction_builder()
+        .add_group_action(group_id)
+        .owner()
+        .build()
+    )
+
+
 def create_drop_flow(
     id: str,
     src_mac: str = None,
@@ -143,6 +167,7 @@ class Table(object):
         self.data = data
         self.id = data.get("id", None)
         self.name = data.get("name", self.id)
+        self._flows = None  # parsed on first access
 
     def __repr__(self) -> str:
         ret = f"{'TABLE':>6} [{self.id:>4}]: "
@@ -151,8 +176,9 @@ class Table(object):
         )
         if stat is not None:
             ret += f'[Active Flows = {stat.get("active-flows", None)}] [PKT Looked Up = {stat.get("packets-looked-up", None)}] [PKT Matched = {stat.get("packets-matched", None)}] '
-        if self.flows:
-            ret += f'Flows: {", ".join([str(fid) for fid in sorted(self.flows)])}'
+        flow_ids = self.flow_ids
+        if flow_ids:
+            ret += f'Flows: {", ".join([str(fid) for fid in sorted(flow_ids)])}'
         # ret = f"=====================     TABLE {str(self.name):>13}     =====================\n"
         # ret += f"ID              : {self.id}\n"
 
@@ -166,11 +192,25 @@ class Table(object):
         return ret
 
     @property
-    def flows(self):
-        flows = {}
+    def flow_ids(self) -> list[str]:
+        return [fitem["id"] for fitem in self.data.get("flow", [])]
+
+    @property
+    def flows(self) -> dict[str, "Flow"]:
+        if self._flows is None:
+            flows = {}
+            for fitem in self.data.get("flow", []):
+                flows[fitem["id"]] = Flow(fitem)
+            self._flows = flows
+        return self._flows
+
+    def get_flow(self, flow_id: str) -> "Flow":
+        if self._flows is not None:
+            return self._flows.get(flow_id, None)
         for fitem in self.data.get("flow", []):
-            flows[fitem["id"]] = Flow(fitem)
-        return flows
+            if fitem["id"] == flow_id:
+                return Flow(fitem)
+        return None
 
 
 class Flow(object):
@@ -205,3 +245,68 @@ class Flow(object):
 
     def to_dict(self):
         return self.data
+
+    def canonical_hash(self) -> str:
+        return canonical_flow_hash(self.data)
+
+
+# Keys not describing the flow itself: counters and location [the table is part of the flow's path]
+_volatile_flow_keys = ["flow-statistics", "table_id"]
+
+# Leaves the controller stores with their default value when a flow omits them [flow's top level]
+_default_flow_leaves = {
+    "idle-timeout": "0",
+    "hard-timeout": "0",
+    "priority": "32768",
+    "strict": "false",
+    "barrier": "false",
+}
+
+# Match leaves stored as prefixes, Ex: "10.0.0.1" -> "10.0.0.1/32"
+_ipv4_prefix_leaves = ["ipv4-source", "ipv4-destination"]
+
+
+def _normalize(value, key: str = ""):
+    if isinstance(value, dict):
+        ret = {}
+        for k, v in value.items():
+            k = k.split(":", 1)[-1]  # "flow-node-inventory:priority" -> "priority"
+            ret[k] = _normalize(v, k)
+        return ret
+    if isinstance(value, list):
+        # keyed lists [instructions, actions by "order"] have no order
+        items = [_normalize(v, key) for v in value]
+        return sorted(items, key=lambda v: json.dumps(v, sort_keys=True))
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    text = str(value)
+    if key in _ipv4_prefix_leaves and "/" not in text:
+        text += "/32"
+    elif key.endswith("address"):
+        text = text.lower()  # MAC addresses
+    return text
+
+
+def normalize_flow(data: dict) -> dict:
+    """
+    Flow's dict as the controller stores it, to compare a local flow with one read back from a datastore:
+    module prefixes are stripped from keys, leaves are strings, lists are sorted, and statistics, table id
+    and top level leaves equal to their default are dropped.
+    """
+    flow = _normalize(data)
+    return {
+        k: v
+        for k, v in flow.items()
+        if k not in _volatile_flow_keys and _default_flow_leaves.get(k, None) != v
+    }
+
+
+def canonical_flow_hash(data: dict) -> str:
+    """
+    Hash of a flow's dict by `normalize_flow`, independent of keys order and of how the controller writes leaves.
+    Same flows have same hash.
+    """
+    text = json.dumps(normalize_flow(data), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(text.encode()).hexdigest()
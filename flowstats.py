@@ -0,0 +1,227 @@
+from connector import Connector
+import threading
+import time
+
+try:
+    import numpy as np
+except ImportError:  # optional collector
+    np = None
+
+FLOW_FIELDS = ("packets", "bytes")
+PORT_FIELDS = ("rx_packets", "tx_packets", "rx_bytes", "tx_bytes")
+
+
+class CounterRing(object):
+    """
+    Last `capacity` samples of counters of many series [flows, ports], in one preallocated array
+    (series, capacity, fields). A sample is one column for all series, appended in O(1) over the oldest one.
+    Series missing from a sample are NaN there. Rows are added [doubled] only for new series.
+    Requires [numpy](https://numpy.org/).
+    """
+
+    def __init__(self, fields: tuple, capacity: int = 120, rows: int = 64) -> None:
+        if np is None:
+            raise Exception("CounterRing requires packages: numpy")
+        self.fields = fields
+        self.capacity = capacity
+        self.keys = []  # row -> series key
+        self.index = {}  # series key -> row
+        self.values = np.full((rows, capacity, len(fields)), np.nan)
+        self.times = np.full(capacity, np.nan)
+        self.count = 0  # samples appended since start
+
+    def _rows(self, keys: list) -> "np.ndarray":
+        for key in keys:
+            if key not in self.index:
+                self.index[key] = len(self.keys)
+                self.keys.append(key)
+        if len(self.keys) > len(self.values):
+            extra = np.full(
+                (max(len(self.keys), 2 * len(self.values)) - len(self.values),)
+                + self.values.shape[1:],
+                np.nan,
+            )
+            self.values = np.concatenate([self.values, extra])
+        return np.fromiter(
+            (self.index[k] for k in keys), dtype=np.intp, count=len(keys)
+        )
+
+    def append(self, timestamp: float, keys: list, values):
+        """
+        - values: Counters of `keys`, shape (len(keys), len(fields)).
+        """
+        rows = self._rows(keys)
+        col = self.count % self.capacity
+        self.values[:, col] = np.nan
+        if len(rows):
+            self.values[rows, col] = values
+        self.times[col] = timestamp
+        self.count += 1
+
+    def rates(self, window: int = 1) -> tuple[list, "np.ndarray"]:
+        """
+        Per-second rates of all series over the last `window` samples.
+        Return (keys, rates with shape (len(keys), len(fields))). NaN for series not in both samples,
+        0 for counters that went down [flow re-installed, counters reset].
+        """
+        window = min(window, self.count - 1, self.capacity - 1)
+        size = len(self.keys)
+        if window < 1:
+            return list(self.keys), np.full((size, len(self.fields)), np.nan)
+        last = (self.count - 1) % self.capacity
+        first = (self.count - 1 - window) % self.capacity
+        seconds = self.times[last] - self.times[first]
+        delta = self.values[:size, last] - self.values[:size, first]
+        with np.errstate(invalid="ignore"):
+            rates = np.where(delta < 0, 0.0, delta) / seconds
+        return list(self.keys), rates
+
+    def latest(self) -> tuple[list, "np.ndarray"]:
+        if self.count == 0:
+            return [], np.empty((0, len(self.fields)))
+        return (
+            list(self.keys),
+            self.values[: len(self.keys), (self.count - 1) % self.capacity],
+        )
+
+    def history(self, key) -> tuple["np.ndarray", "np.ndarray"]:
+        """
+        Return (times, counters) of one series, oldest first.
+        """
+        order = (
+            np.arange(self.count - min(self.count, self.capacity), self.count)
+            % self.capacity
+        )
+        return self.times[order], self.values[self.index[key], order]
+
+
+class StatsCollector(object):
+    """
+    Poll flow and port counters of all switches from the operational datastore [one GET] every `interval` seconds,
+    in a background thread, into `CounterRing`s:
+    - flows: key (node id, table id, flow id), fields ("packets", "bytes")
+    - ports: key port id, fields ("rx_packets", "tx_packets", "rx_bytes", "tx_bytes")
+    """
+
+    def __init__(
+        self, connector: Connector, interval: float = 5.0, capacity: int = 120
+    ) -> None:
+        self.connector = connector
+        self.interval = interval
+        self.flows = CounterRing(FLOW_FIELDS, capacity)
+        self.ports = CounterRing(PORT_FIELDS, capacity)
+        self.polls = 0
+        self.last_error = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._worker = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and self._worker.is_alive()
+
+    def add_sample(self, switches: list, timestamp: float = None):
+        """
+        Append counters from raw inventory nodes [as returned by `Connector.get_objects("node")`].
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        flow_keys, flow_values, port_keys, port_values = [], [], [], []
+        for node in switches:
+            for conn in node.get("node-connector", []):
+                stats = conn.get(
+                    "opendaylight-port-statistics:flow-capable-node-connector-statistics",
+                    None,
+                )
+                if stats is None:
+                    continue
+                port_keys.append(conn["id"])
+                port_values.append(
+                    (
+                        stats["packets"]["received"],
+                        stats["packets"]["transmitted"],
+                        stats["bytes"]["received"],
+                        stats["bytes"]["transmitted"],
+                    )
+                )
+            for table in node.get("flow-node-inventory:table", []):
+                for flow in table.get("flow", []):
+                    stats = flow.get(
+                        "opendaylight-flow-statistics:flow-statistics", None
+                    )
+                    if stats is None:
+                        continue
+                    flow_keys.append((node["id"], table["id"], flow["id"]))
+                    flow_values.append((stats["packet-count"], stats["byte-count"]))
+        with self._lock:
+            self.flows.append(
+                timestamp, flow_keys, np.array(flow_values, dtype=float).reshape(-1, 2)
+            )
+            self.ports.append(
+                timestamp, port_keys, np.array(port_values, dtype=float).reshape(-1, 4)
+            )
+            self.polls += 1
+
+    def poll(self):
+        endpoint = "/restconf/operational/opendaylight-inventory:nodes/"
+        switches = self.connector.get(endpoint, quiet=True)["nodes"].get("node", [])
+        self.add_sample(switches)
+
+    def start(self, interval: float = None):
+        if interval is not None:
+            self.interval = interval
+        if self.running:
+            return
+        self._stop.clear()
+        self._worker = threading.Thread(target=self._run, daemon=True)
+        self._worker.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            start = time.monotonic()
+            try:
+                self.poll()
+                self.last_error = None
+            except Exception as ex:
+                self.last_error = ex
+            self._stop.wait(max(self.interval - (time.monotonic() - start), 0))
+
+    def top_flows(self, n: int = 10, window: int = 1) -> list[tuple]:
+        """
+        Flows with the highest byte rate. Return list of (key, pps, bps).
+        """
+        with self._lock:
+            keys, rates = self.flows.rates(window)
+        return self._top(keys, rates[:, 0], rates[:, 1] * 8, n)
+
+    def port_rates(self, window: int = 1) -> tuple[list, "np.ndarray"]:
+        """
+        `CounterRing.rates` of ports, read while no poll appends to the ring. Safe from any thread.
+        """
+        with self._lock:
+            return self.ports.rates(window)
+
+    def top_ports(self, n: int = 10, window: int = 1) -> list[tuple]:
+        """
+        Ports with the highest byte rate [received + transmitted]. Return list of (port id, pps, bps).
+        """
+        keys, rates = self.port_rates(window)
+        return self._top(
+            keys, rates[:, 0] + rates[:, 1], (rates[:, 2] + rates[:, 3]) * 8, n
+        )
+
+    @staticmethod
+    def _top(keys: list, pps, bps, n: int) -> list[tuple]:
+        if len(keys) == 0:
+            return []
+        order = np.argsort(np.nan_to_num(-bps, nan=np.inf), kind="stable")[:n]
+        return [
+            (keys[i], float(pps[i]), float(bps[i]))
+            for i in order
+            if not np.isnan(bps[i])
+        ]
@@ -42,6 +42,19 @@ CLEAR_ACTIONS_INS = "clear-actions"
 WRITE_ACTIONS_INS = "write-actions"
 GOTO_TABLE_INS = "go-to-table"
 
+################################## GROUP ######################################
+# GROUP: a list of action buckets, referenced by flows through the Group action.
+# Group Type:
+# - All: Execute all buckets [multicast, broadcast].
+# - Select: Execute one bucket, chosen by the switch [hash of packet fields, weighted by bucket weight]. Used for ECMP.
+# - Indirect: Execute the one defined bucket [next hop shared by many flows].
+# - Fast Failover: Execute the first live bucket [by its watch port].
+
+GROUP_ALL = "group-all"
+GROUP_SELECT = "group-select"
+GROUP_INDIRECT = "group-indirect"
+GROUP_FAST_FAILOVER = "group-ff"
+
 
 class InstructionBuilder(object):
     def __init__(self, type: str = APPLY_ACTIONS_INS, owner=None) -> None:
@@ -133,6 +146,13 @@ class InstructionBuilder(object):
             self.data.append(d)
         return self
 
+    def add_group_action(self, group_id: int):
+        if self.ins_group == 1:
+            self.data.append(
+                {"order": len(self.data), "group-action": {"group-id": group_id}}
+            )
+        return self
+
     def build(self) -> dict:
         if self.ins_group == 1:
             return {self.type: {"action": self.data}}
@@ -166,6 +186,56 @@ class InstructionBuilder(object):
     #         return ret
 
 
+class GroupBuilder(object):
+    """
+    Build a group entry. Each bucket's actions are added by an `InstructionBuilder`, back to this builder by `owner()`.
+    Ex: GroupBuilder(1).create_bucket_builder().add_output_action(2).owner().build()
+    """
+
+    def __init__(
+        self, group_id: int, type: str = GROUP_SELECT, name: str = None
+    ) -> None:
+        if type not in [GROUP_ALL, GROUP_SELECT, GROUP_INDIRECT, GROUP_FAST_FAILOVER]:
+            raise Exception(
+                f"Group type {type} not found. Used predefined values only."
+            )
+        self.data = {"group-id": group_id, "group-type": type, "barrier": False}
+        if name is not None:
+            self.data["group-name"] = name
+        self.buckets = []
+        self._bucket_info = None
+
+    def create_bucket_builder(
+        self, weight: int = 1, watch_port: int | str = None
+    ) -> InstructionBuilder:
+        """
+        - weight: Share of traffic of this bucket in a Select group.
+        - watch_port: Port whose liveness decides this bucket in a Fast Failover group.
+        """
+        self._bucket_info = {"weight": weight}
+        if watch_port is not None:
+            self._bucket_info["watch_port"] = int(watch_port)
+        return InstructionBuilder(APPLY_ACTIONS_INS, owner=self)
+
+    def owner_callback(self, data: InstructionBuilder):
+        bucket = {"bucket-id": len(self.buckets), **self._bucket_info}
+        bucket["action"] = data.data
+        self.buckets.append(bucket)
+
+    def build(self) -> dict:
+        return dict(self.data, buckets={"bucket": self.buckets})
+
+
+def create_select_group(group_id: int, ports: list[int | str], name: str = None):
+    """
+    Select group sending each flow [by hash] out of one of `ports`, with equal weights.
+    """
+    builder = GroupBuilder(group_id, GROUP_SELECT, name)
+    for port in ports:
+        builder = builder.create_bucket_builder().add_output_action(port).owner()
+    return builder.build()
+
+
 _parse_names = {
     APPLY_ACTIONS_INS: "APPLY ACTIONS",
     CLEAR_ACTIONS_INS: "CLEAR ACTIONS",
@@ -177,6 +247,8 @@ _parse_names = {
     "set-next-hop-action": "SET NEXT HOP",
     "dec-nw-ttl": "DECREMENT TTL",
     "set-nw-ttl-action": "SET TTL",
+    "group-action": "GROUP",
+    "group-id": "Id",
     "output-node-connector": "To",
     "max-length": "Max Length",
     "nw-ttl": "TTL",
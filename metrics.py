@@ -0,0 +1,156 @@
+import threading
+import bisect
+import re
+
+# Upper bounds [seconds] of latency histogram buckets, the last bucket is +Inf
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+)
+
+# "node/openflow:1", "flow-node-inventory:table/0"...
+_ID_SEGMENTS = re.compile(
+    r"/((?:[\w-]+:)?(node|table|flow|node-connector|group|meter))/[^/]+"
+)
+
+
+def endpoint_template(endpoint: str) -> str:
+    """
+    Endpoint without ids, so requests on different switches/tables/flows share one label.
+    Ex: /restconf/config/.../node/openflow:1/table/0/flow/f1 -> /restconf/config/.../node/{node}/table/{table}/flow/{flow}
+    """
+    endpoint = endpoint.split("?")[0].rstrip("/")
+    return _ID_SEGMENTS.sub(
+        lambda m: f"/{m.group(1)}/{{{m.group(2).replace('-', '_')}}}", endpoint
+    )
+
+
+class RequestMetrics(object):
+    """
+    Count, errors, bytes sent/received and latency histogram of requests, by (method, endpoint template).
+    Thread-safe, requests are recorded by concurrent senders.
+    """
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.series = {}  # (method, template) -> counters
+        self._lock = threading.Lock()
+
+    def _new_series(self) -> dict:
+        return {
+            "count": 0,
+            "errors": 0,
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "latency_sum": 0.0,
+            "latency_max": 0.0,
+            "histogram": [0] * (len(self.buckets) + 1),
+        }
+
+    def record(
+        self,
+        method: str,
+        endpoint: str,
+        seconds: float,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        error: bool = False,
+    ):
+        key = (method, endpoint_template(endpoint))
+        bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self.series.get(key, None)
+            if series is None:
+                series = self.series[key] = self._new_series()
+            series["count"] += 1
+            series["errors"] += int(error)
+            series["bytes_sent"] += bytes_sent
+            series["bytes_received"] += bytes_received
+            series["latency_sum"] += seconds
+            series["latency_max"] = max(series["latency_max"], seconds)
+            series["histogram"][bucket] += 1
+
+    def reset(self):
+        with self._lock:
+            self.series.clear()
+
+    def snapshot(self) -> dict[tuple, dict]:
+        with self._lock:
+            return {
+                key: dict(series, histogram=list(series["histogram"]))
+                for key, series in self.series.items()
+            }
+
+    def quantile(self, histogram: list[int], q: float) -> float:
+        """
+        Estimate the `q` quantile [0-1] from a histogram, as the upper bound of the bucket reaching it.
+        """
+        total = sum(histogram)
+        if total == 0:
+            return 0.0
+        rank, seen = q * total, 0
+        for ind, count in enumerate(histogram):
+            seen += count
+            if seen >= rank:
+                return self.buckets[ind] if ind < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def print_stats(self):
+        rows = sorted(self.snapshot().items(), key=lambda x: -x[1]["latency_sum"])
+        print(
+            f"   {'Method':<6} | {'Count':>6} | {'Errors':>6} | {'Sent':>10} | {'Received':>10} | {'Total (s)':>9} | {'Mean (ms)':>9} | {'p50 <=':>7} | {'p99 <=':>7} | Endpoint"
+        )
+        for (method, template), s in rows:
+            mean = s["latency_sum"] / s["count"] * 1000
+            p50 = self.quantile(s["histogram"], 0.5)
+            p99 = self.quantile(s["histogram"], 0.99)
+            print(
+                f"   {method:<6} | {s['count']:>6} | {s['errors']:>6} | {s['bytes_sent']:>10} | {s['bytes_received']:>10} | {s['latency_sum']:>9.3f} | {mean:>9.2f} | {p50:>7} | {p99:>7} | {template}"
+            )
+
+    def to_prometheus(self, prefix: str = "odl_client") -> str:
+        """
+        Metrics in Prometheus text exposition format.
+        """
+        counters = [
+            ("requests_total", "count", "Requests sent."),
+            (
+                "request_errors_total",
+                "errors",
+                "Requests failed or answered with non-2xx.",
+            ),
+            ("request_sent_bytes_total", "bytes_sent", "Request body bytes."),
+            ("response_received_bytes_total", "bytes_received", "Response body bytes."),
+        ]
+        snapshot = sorted(self.snapshot().items())
+        lines = []
+        for name, field, description in counters:
+            lines.append(f"# HELP {prefix}_{name} {description}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for (method, template), s in snapshot:
+                labels = f'method="{method}",endpoint="{template}"'
+                lines.append(f"{prefix}_{name}{{{labels}}} {s[field]}")
+
+        name = f"{prefix}_request_duration_seconds"
+        lines.append(f"# HELP {name} Request latency.")
+        lines.append(f"# TYPE {name} histogram")
+        for (method, template), s in snapshot:
+            labels = f'method="{method}",endpoint="{template}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), s["histogram"]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{name}_sum{{{labels}}} {s['latency_sum']}")
+            lines.append(f"{name}_count{{{labels}}} {s['count']}")
+        return "\n".join(lines) + "\n"
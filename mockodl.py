@@ -0,0 +1,644 @@
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from connector import Connector
+from snapshot import load_snapshot
+import threading
+import random
+import queue
+import copy
+import time
+import json
+import re
+
+# Stand-in for the OpenDaylight RESTCONF endpoints used by `Connector`, `NetworkTopology` and `NetworkConfig`.
+# Serves a topology from memory, so refresh and flow programming can be measured without a controller and Mininet.
+
+_NODE_REF = re.compile(r"id='([^']+)'\]")
+
+
+def index_to_mac(index: int) -> str:
+    return ":".join(f"{b:02x}" for b in index.to_bytes(6, "big"))
+
+
+def build_odl_data(
+    switches: list[str], hosts: dict[str, str], links: list[tuple]
+) -> tuple[dict, list]:
+    """
+    Build OpenDaylight-shaped raw data, as read by `NetworkTopology`:
+    - switches: Switch names, in order of their ids [openflow:1, openflow:2...].
+    - hosts: Host name -> switch name it is attached to. MACs are 00:00:00:00:00:01, ... in order [as Mininet `--mac`].
+    - links: Pairs of switch names.
+
+    Return (topology, switches): the `network-topology` topology and the `opendaylight-inventory` nodes.
+    """
+    switch_ids = {name: f"openflow:{ind}" for ind, name in enumerate(switches, 1)}
+    ports = {name: [] for name in switches}  # switch name -> port numbers in use
+    topo_nodes, topo_links = [], []
+
+    def new_port(switch: str) -> str:
+        ports[switch].append(len(ports[switch]) + 1)
+        return f"{switch_ids[switch]}:{ports[switch][-1]}"
+
+    def add_link(src_node, src_tp, dest_node, dest_tp, link_id):
+        topo_links.append(
+            {
+                "link-id": link_id,
+                "source": {"source-node": src_node, "source-tp": src_tp},
+                "destination": {"dest-node": dest_node, "dest-tp": dest_tp},
+            }
+        )
+
+    for u, v in links:
+        u_tp, v_tp = new_port(u), new_port(v)
+        add_link(switch_ids[u], u_tp, switch_ids[v], v_tp, u_tp)
+        add_link(switch_ids[v], v_tp, switch_ids[u], u_tp, v_tp)
+
+    for ind, (name, switch) in enumerate(hosts.items(), 1):
+        mac = index_to_mac(ind)
+        host_id = f"host:{mac}"
+        sw_tp = new_port(switch)
+        topo_nodes.append(
+            {
+                "node-id": host_id,
+                "termination-point": [{"tp-id": host_id}],
+                "host-tracker-service:addresses": [
+                    {
+                        "id": ind,
+                        "mac": mac,
+                        "ip": f"10.{(ind >> 16) & 255}.{(ind >> 8) & 255}.{ind & 255}",
+                        "first-seen": 0,
+                        "last-seen": 0,
+                    }
+                ],
+                "host-tracker-service:attachment-points": [
+                    {"tp-id": sw_tp, "corresponding-tp": host_id, "active": True}
+                ],
+                "host-tracker-service:id": mac,
+            }
+        )
+        add_link(host_id, host_id, switch_ids[switch], sw_tp, f"{host_id}/{sw_tp}")
+        add_link(switch_ids[switch], sw_tp, host_id, host_id, sw_tp)
+
+    nodes = []
+    for ind, name in enumerate(switches, 1):
+        node_id = switch_ids[name]
+        connectors = []
+        for number in ports[name] + ["LOCAL"]:
+            connectors.append(
+                {
+                    "id": f"{node_id}:{number}",
+                    "flow-node-inventory:port-number": number,
+                    "flow-node-inventory:hardware-address": index_to_mac(
+                        (ind << 16) + (0 if number == "LOCAL" else number)
+                    ),
+                    "flow-node-inventory:name": (
+                        name if number == "LOCAL" else f"{name}-eth{number}"
+                    ),
+                    "flow-node-inventory:state": {
+                        "link-down": False,
+                        "blocked": False,
+                        "live": True,
+                    },
+                    "opendaylight-port-statistics:flow-capable-node-connector-statistics": {
+                        "packets": {"transmitted": 0, "received": 0},
+                        "bytes": {"transmitted": 0, "received": 0},
+                        "duration": {"second": 0, "nanosecond": 0},
+                    },
+                }
+            )
+        topo_nodes.append(
+            {
+                "node-id": node_id,
+                "termination-point": [{"tp-id": c["id"]} for c in connectors],
+            }
+        )
+        nodes.append(
+            {
+                "id": node_id,
+                "node-connector": connectors,
+                "flow-node-inventory:description": name,
+                "flow-node-inventory:ip-address": "127.0.0.1",
+                "flow-node-inventory:table": [
+                    {
+                        "id": 0,
+                        "opendaylight-flow-table-statistics:flow-table-statistics": {
+                            "active-flows": 0,
+                            "packets-looked-up": 0,
+                            "packets-matched": 0,
+                        },
+                    }
+                ],
+            }
+        )
+    return {"topology-id": "flow:1", "node": topo_nodes, "link": topo_links}, nodes
+
+
+class MockOpenDaylight(object):
+    """
+    Local RESTCONF server, in a background thread, with the endpoints used by this app:
+    - GET operational network-topology, inventory nodes/node/table/flow.
+    - GET/PUT/DELETE config node/table/flow and group. Config flows and groups are copied to the operational datastore, as pushed to switches.
+    - POST operations sal-flow:add-flow, sal-flow:remove-flow.
+    - Data change notifications: POST operations sal-remote:create-data-change-event-subscription, GET streams/stream/<name>
+    for the location of a Server-Sent Events stream. `fail_link` and `restore_link` change the topology and notify streams.
+
+    - latency: Seconds added to each request. A tuple (min, max) for random latency.
+    - error_rate: Probability of answering a request with status 500.
+    """
+
+    def __init__(
+        self,
+        topology: dict,
+        switches: list,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float | tuple = 0.0,
+        error_rate: float = 0.0,
+        seed: int = None,
+    ) -> None:
+        self.topology = copy.deepcopy(topology)
+        self.nodes = {node["id"]: copy.deepcopy(node) for node in switches}
+        self.config = {}  # node id -> {table id: {flow id: flow}}
+        self.groups = {}  # node id -> {group id: group}
+        self.latency = latency
+        self.error_rate = error_rate
+        self.random = random.Random(seed)
+        self.requests = {}  # method -> count
+        self.lock = threading.Lock()
+        self._rpc_count = 0
+        # stream name -> {"path": subscribed path, "queues": [one per open stream]}
+        self.streams = {}
+        self.down_links = {}  # (node id, node id) -> links removed by `fail_link`
+
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive
+
+            def do_GET(self):
+                mock._handle(self, "GET")
+
+            def do_PUT(self):
+                mock._handle(self, "PUT")
+
+            def do_POST(self):
+                mock._handle(self, "POST")
+
+            def do_DELETE(self):
+                mock._handle(self, "DELETE")
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @staticmethod
+    def from_snapshot(path: str | tuple[str, str], **kwargs) -> "MockOpenDaylight":
+        if isinstance(path, (tuple, list)):
+            return MockOpenDaylight(*load_snapshot(*path), **kwargs)
+        return MockOpenDaylight(*load_snapshot(path), **kwargs)
+
+    @property
+    def server_ip(self) -> str:
+        return self.server.server_address[0]
+
+    @property
+    def server_port(self) -> int:
+        return self.server.server_address[1]
+
+    def start(self) -> "MockOpenDaylight":
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        with self.lock:
+            for stream in self.streams.values():
+                for q in stream["queues"]:
+                    q.put(None)
+        self.server.shutdown()
+        self.server.server_close()
+
+    def create_connector(self, **kwargs) -> Connector:
+        return Connector(self.server_ip, self.server_port, **kwargs)
+
+    ########################### Requests ###########################
+
+    def _handle(self, handler: BaseHTTPRequestHandler, method: str):
+        length = int(handler.headers.get("Content-Length", 0))
+        body = handler.rfile.read(length) if length else b""
+        with self.lock:
+            self.requests[method] = self.requests.get(method, 0) + 1
+        if method == "GET" and handler.path.startswith("/streams/"):
+            return self._serve_stream(handler, handler.path[len("/streams/") :])
+        latency = self.latency
+        if isinstance(latency, (tuple, list)):
+            latency = self.random.uniform(*latency)
+        if latency:
+            time.sleep(latency)
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            status, data = 500, {"errors": {"error": [{"error-tag": "injected"}]}}
+        else:
+            try:
+                with self.lock:
+                    status, data = self._route(
+                        method, handler.path, json.loads(body) if body else None
+                    )
+            except Exception as ex:
+                status, data = 400, {"errors": {"error": [{"error-message": str(ex)}]}}
+
+        payload = b"" if data is None else json.dumps(data).encode()
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(payload)))
+        handler.end_headers()
+        handler.wfile.write(payload)
+
+    def _route(self, method: str, path: str, body: dict) -> tuple[int, dict]:
+        if path.startswith("/restconf/streams/stream/") and method == "GET":
+            name = path[len("/restconf/streams/stream/") :]
+            if name not in self.streams:
+                return 404, None
+            return 200, {
+                "location": f"http://{self.server_ip}:{self.server_port}/streams/{name}"
+            }
+        path = path.split("?")[0].rstrip("/").replace("flow-node-inventory:", "")
+        parts = path.split("/")[2:]  # skip "", "restconf"
+        store, resource, rest = parts[0], parts[1], parts[2:]
+
+        if store == "operations":
+            if method != "POST":
+                return 405, None
+            if resource == "sal-flow:add-flow":
+                return self._add_flow_rpc(body["input"])
+            if resource == "sal-flow:remove-flow":
+                return self._remove_flow_rpc(body["input"])
+            if resource == "sal-remote:create-data-change-event-subscription":
+                return self._create_stream(body["input"])
+            return 404, None
+
+        if store == "operational" and method == "GET":
+            if resource == "network-topology:network-topology":
+                return 200, {"network-topology": {"topology": [self.topology]}}
+            if resource == "opendaylight-inventory:nodes":
+                return self._get_operational(rest)
+        if store == "config" and resource == "opendaylight-inventory:nodes":
+            return self._config(method, rest, body)
+        return 404, None
+
+    ########################### Operational ###########################
+
+    def _get_table(self, node_id: str, table_id, create: bool = False) -> dict:
+        node = self.nodes.get(node_id, None)
+        if node is None:
+            return None
+        tables = node.setdefault("flow-node-inventory:table", [])
+        for table in tables:
+            if str(table["id"]) == str(table_id):
+                return table
+        if not create:
+            return None
+        table = {"id": int(table_id)}
+        tables.append(table)
+        return table
+
+    def _get_operational(self, rest: list) -> tuple[int, dict]:
+        if not rest:
+            return 200, {"nodes": {"node": list(self.nodes.values())}}
+        node = self.nodes.get(rest[1], None)
+        if node is None:
+            return 404, None
+        if len(rest) == 2:
+            return 200, {"node": [node]}
+        table = self._get_table(rest[1], rest[3])
+        if table is None:
+            return 404, None
+        if len(rest) == 4:
+            return 200, {"flow-node-inventory:table": [table]}
+        for flow in table.get("flow", []):
+            if flow["id"] == rest[5]:
+                return 200, {"flow-node-inventory:flow": [flow]}
+        return 404, None
+
+    def _set_operational_flow(self, node_id: str, table_id, flow: dict):
+        table = self._get_table(node_id, table_id, create=True)
+        if table is None:
+            return
+        flows = [f for f in table.get("flow", []) if f["id"] != flow["id"]]
+        flows.append(
+            dict(
+                flow,
+                **{
+                    "opendaylight-flow-statistics:flow-statistics": {
+                        "packet-count": 0,
+                        "byte-count": 0,
+                        "duration": {"second": 0, "nanosecond": 0},
+                    }
+                },
+            )
+        )
+        table["flow"] = flows
+
+    def _remove_operational_flows(self, node_id: str, table_id, match_func):
+        table = self._get_table(node_id, table_id)
+        if table is None or "flow" not in table:
+            return 0
+        flows = [f for f in table["flow"] if not match_func(f)]
+        removed = len(table["flow"]) - len(flows)
+        if flows:
+            table["flow"] = flows
+        else:
+            table.pop("flow")
+        return removed
+
+    def _add_flow_rpc(self, data: dict) -> tuple[int, dict]:
+        node_id = _NODE_REF.search(data["node"]).group(1)
+        if node_id not in self.nodes:
+            return 404, None
+        self._rpc_count += 1
+        table_id = data["table_id"]
+        flow = {k: v for k, v in data.items() if k != "node"}
+        flow["id"] = f"#UF$TABLE*{table_id}-{self._rpc_count}"
+        self._set_operational_flow(node_id, table_id, flow)
+        return 200, None
+
+    def _remove_flow_rpc(self, data: dict) -> tuple[int, dict]:
+        node_id = _NODE_REF.search(data["node"]).group(1)
+        if node_id not in self.nodes:
+            return 404, None
+        strict = data.get("strict", False)
+        match = data.get("match", None)
+        priority = data.get("priority", None)
+
+        def match_func(flow):
+            if match is not None:
+                flow_match = flow.get("match", {})
+                if strict and flow_match != match:
+                    return False
+                if not strict and any(flow_match.get(k) != v for k, v in match.items()):
+                    return False
+            if priority is not None and flow.get("priority", None) != priority:
+                return False
+            return True
+
+        self._remove_operational_flows(node_id, data["table_id"], match_func)
+        return 200, None
+
+    ########################### Notifications ###########################
+
+    def _create_stream(self, data: dict) -> tuple[int, dict]:
+        datastore = data.get("sal-remote-augment:datastore", "CONFIGURATION")
+        scope = data.get("sal-remote-augment:scope", "BASE")
+        name = f"data-change-event-subscription{data['path']}/datastore={datastore}/scope={scope}"
+        self.streams.setdefault(name, {"path": data["path"], "queues": []})
+        return 200, {"output": {"stream-name": name}}
+
+    def _serve_stream(self, handler: BaseHTTPRequestHandler, name: str):
+        with self.lock:
+            stream = self.streams.get(name, None)
+            q = queue.Queue()
+            if stream is not None:
+                stream["queues"].append(q)
+        if stream is None:
+            handler.send_response(404)
+            handler.send_header("Content-Length", "0")
+            handler.end_headers()
+            return
+        handler.close_connection = True
+        handler.send_response(200)
+        handler.send_header("Content-Type", "text/event-stream")
+        handler.send_header("Cache-Control", "no-cache")
+        handler.send_header("Connection", "close")
+        handler.end_headers()
+        try:
+            while True:
+                try:
+                    message = q.get(timeout=15)
+                except queue.Empty:
+                    message = ""  # comment line, finds closed clients
+                if message is None:
+                    break
+                line = f"data: {message}\n\n" if message else ": keep-alive\n\n"
+                handler.wfile.write(line.encode())
+                handler.wfile.flush()
+        except OSError:
+            pass
+        finally:
+            with self.lock:
+                stream["queues"].remove(q)
+
+    def _publish(self, events: list[dict]):
+        """
+        Send data change events to the streams subscribed to a path containing them.
+        """
+        for stream in self.streams.values():
+            matched = [e for e in events if e["path"].startswith(stream["path"])]
+            if not matched:
+                continue
+            message = json.dumps(
+                {
+                    "notification": {
+                        "eventTime": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                        "data-changed-notification": {"data-change-event": matched},
+                    }
+                }
+            )
+            for q in stream["queues"]:
+                q.put(message)
+
+    def _link_event(self, link: dict, operation: str) -> dict:
+        path = (
+            "/network-topology:network-topology"
+            f"/network-topology:topology[network-topology:topology-id='{self.topology['topology-id']}']"
+            f"/network-topology:link[network-topology:link-id='{link['link-id']}']"
+        )
+        if operation == "deleted":
+            return {"path": path, "operation": operation}
+        return {
+            "path": path,
+            "operation": operation,
+            "data": {"network-topology:link": [link]},
+        }
+
+    def _set_port_state(self, port_id: str, up: bool) -> dict:
+        node_id = port_id.rsplit(":", 1)[0]
+        for conn in self.nodes.get(node_id, {}).get("node-connector", []):
+            if conn["id"] == port_id:
+                conn["flow-node-inventory:state"] = {
+                    "link-down": not up,
+                    "blocked": False,
+                    "live": up,
+                }
+                return {
+                    "path": (
+                        "/opendaylight-inventory:nodes"
+                        f"/opendaylight-inventory:node[opendaylight-inventory:id='{node_id}']"
+                        f"/opendaylight-inventory:node-connector[opendaylight-inventory:id='{port_id}']"
+                    ),
+                    "operation": "updated",
+                    "data": {"opendaylight-inventory:node-connector": [conn]},
+                }
+        return None
+
+    def fail_link(self, node_a: str, node_b: str) -> int:
+        """
+        Cut the cable between two nodes [by id. Ex: "openflow:1"]: its ports go link-down, then its links are removed,
+        as the controller reports them. Return the number of links removed.
+        """
+        with self.lock:
+            ends = {node_a, node_b}
+            links = [
+                l
+                for l in self.topology.get("link", [])
+                if {l["source"]["source-node"], l["destination"]["dest-node"]} == ends
+            ]
+            if not links:
+                return 0
+            self.topology["link"] = [l for l in self.topology["link"] if l not in links]
+            self.down_links.setdefault(tuple(sorted(ends)), []).extend(links)
+            ports = {l["source"]["source-tp"] for l in links}
+            events = [self._set_port_state(p, False) for p in sorted(ports)]
+            self._publish([e for e in events if e is not None])
+            self._publish([self._link_event(l, "deleted") for l in links])
+        return len(links)
+
+    def restore_link(self, node_a: str, node_b: str) -> int:
+        """
+        Reconnect a cable cut by `fail_link`. Return the number of links restored.
+        """
+        with self.lock:
+            links = self.down_links.pop(tuple(sorted({node_a, node_b})), [])
+            if not links:
+                return 0
+            self.topology.setdefault("link", []).extend(links)
+            ports = {l["source"]["source-tp"] for l in links}
+            events = [self._set_port_state(p, True) for p in sorted(ports)]
+            self._publish([e for e in events if e is not None])
+            self._publish([self._link_event(l, "created") for l in links])
+        return len(links)
+
+    ########################### Config ###########################
+
+    def _config(self, method: str, rest: list, body: dict) -> tuple[int, dict]:
+        if len(rest) < 2:
+            return 405, None
+        node_id = rest[1]
+        if len(rest) > 2 and rest[2] == "group":
+            return self._config_group(method, node_id, rest[3:], body)
+        tables = self.config.get(node_id, None)
+        table_id = int(rest[3]) if len(rest) > 3 else None
+        flow_id = rest[5] if len(rest) > 5 else None
+
+        if method == "GET":
+            if tables is None:
+                return 404, None
+            if table_id is None:
+                return 200, {
+                    "node": [
+                        {
+                            "id": node_id,
+                            "flow-node-inventory:table": [
+                                {"id": t, "flow": list(flows.values())}
+                                for t, flows in tables.items()
+                            ],
+                        }
+                    ]
+                }
+            if table_id not in tables:
+                return 404, None
+            if flow_id is None:
+                flows = list(tables[table_id].values())
+                return 200, {
+                    "flow-node-inventory:table": [{"id": table_id, "flow": flows}]
+                }
+            if flow_id not in tables[table_id]:
+                return 404, None
+            return 200, {"flow-node-inventory:flow": [tables[table_id][flow_id]]}
+
+        if node_id not in self.nodes:
+            return 404, None
+        if method == "PUT":
+            if table_id is None:
+                return 405, None
+            table = self.config.setdefault(node_id, {}).setdefault(table_id, {})
+            if flow_id is not None:
+                flows = body["flow-node-inventory:flow"]
+            else:  # replace the whole table
+                for old_id in list(table):
+                    self._delete_config_flow(node_id, table_id, old_id)
+                flows = body["flow-node-inventory:table"][0].get("flow", [])
+            for flow in flows:
+                table[flow["id"]] = flow
+                self._set_operational_flow(node_id, table_id, flow)
+            return 200, None
+
+        if method == "DELETE":
+            if tables is None or table_id not in tables:
+                return 404, None
+            if flow_id is None:
+                for old_id in list(tables[table_id]):
+                    self._delete_config_flow(node_id, table_id, old_id)
+                return 200, None
+            if flow_id not in tables[table_id]:
+                return 404, None
+            self._delete_config_flow(node_id, table_id, flow_id)
+            return 200, None
+        return 405, None
+
+    def _config_group(
+        self, method: str, node_id: str, rest: list, body: dict
+    ) -> tuple[int, dict]:
+        groups = self.groups.get(node_id, {})
+        group_id = int(rest[0]) if rest else None
+        if method == "GET":
+            if group_id is None:
+                return 200, {"flow-node-inventory:group": list(groups.values())}
+            if group_id not in groups:
+                return 404, None
+            return 200, {"flow-node-inventory:group": [groups[group_id]]}
+        if node_id not in self.nodes or group_id is None:
+            return 404, None
+        if method == "PUT":
+            group = body["flow-node-inventory:group"][0]
+            self.groups.setdefault(node_id, {})[group_id] = group
+        elif method == "DELETE":
+            if group_id not in groups:
+                return 404, None
+            groups.pop(group_id)
+        else:
+            return 405, None
+        self.nodes[node_id]["flow-node-inventory:group"] = list(
+            self.groups[node_id].values()
+        )
+        return 200, None
+
+    def _delete_config_flow(self, node_id: str, table_id: int, flow_id: str):
+        self.config[node_id][table_id].pop(flow_id, None)
+        self._remove_operational_flows(node_id, table_id, lambda f: f["id"] == flow_id)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local OpenDaylight stand-in")
+    parser.add_argument("--topology", default="topology.json")
+    parser.add_argument("--nodes", default="nodes.json")
+    parser.add_argument("--port", type=int, default=8181)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    mock = MockOpenDaylight.from_snapshot(
+        (args.topology, args.nodes),
+        port=args.port,
+        latency=args.latency,
+        error_rate=args.error_rate,
+    )
+    print(f":: serving on {mock.server_ip}:{mock.server_port}, Ctrl+C for exiting")
+    try:
+        mock.server.serve_forever()
+    except KeyboardInterrupt:
+        mock.server.server_close()
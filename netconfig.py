@@ -4,12 +4,18 @@ from flow import (
     Flow,
     FlowBuilder,
     create_basic_flow,
+    create_group_flow,
     create_lldp_flow,
     create_drop_flow,
+    canonical_flow_hash,
 )
-from connector import Connector
+from connector import Connector, AsyncConnector
+from instruction import create_select_group
 import json
 
+# Added to flows' ids of the copy a path update installs above the old path
+UPDATE_SUFFIX = "-new"
+
 # def parse_dict(type: str, data: dict):
 #     try:
 #         if type == "host":
@@ -28,36 +34,478 @@ import json
 
 
 class NetworkConfig(object):
-    def __init__(self, connector: Connector) -> None:
+    def __init__(
+        self, connector: Connector, async_connector: AsyncConnector = None
+    ) -> None:
+        """
+        - async_connector: If set, requests on many switches/tables are sent concurrently through it.
+        """
         self.connector = connector
+        self.async_connector = async_connector
+        # (source host name, destination host name) -> {"switches", "table", "priority", "groups"} of installed paths
+        self.installed_paths = {}
+        # destination host name -> {"switches", "table", "priority"} of destination-based routes
+        self.installed_destinations = {}
+        # switch id -> {sorted output ports: group id} of select groups written by `set_ecmp_path`
+        self.group_ids = {}
+        # (switch id, group id) -> keys of installed paths using the group
+        self.group_users = {}
 
-    def set_path(self, *nodes: Node, table: int = 0, priority: int = 5):
+    def _send_requests(self, requests: list[tuple]) -> list:
+        """
+        Send a batch of independent requests, each is a tuple `(method, *args)`. Ex: ("put", endpoint, data)
+        Return results in the same order, an Exception object for each failed request.
+        """
+        if self.async_connector is not None:
+            return self.async_connector.run_all(requests)
+        results = []
+        for method, *args in requests:
+            try:
+                results.append(getattr(self.connector, method)(*args))
+            except Exception as ex:
+                results.append(ex)
+        return results
+
+    @staticmethod
+    def _raise_for_failures(requests: list[tuple], results: list, message: str):
+        failures = [
+            f"{req[1]}: {res}"
+            for req, res in zip(requests, results)
+            if isinstance(res, Exception)
+        ]
+        if failures:
+            raise Exception(
+                f"{message}: {len(failures)}/{len(requests)} REQUESTS FAILED\n"
+                + "\n".join(failures)
+            )
+
+    @staticmethod
+    def _build_path_flows(
+        nodes: list[Node], priority: int = 5, suffix: str = ""
+    ) -> list[tuple]:
+        """
+        Build flows for both directions of a path. Return list of (switch id, flow).
+        - suffix: Added to flows' ids, to keep two versions of a path at the same time [`set_path` update].
+        """
         if len(nodes) < 2 or nodes[0].type != "host" or nodes[-1].type != "host":
             raise Exception("INVALID PATH: TERMINALS MUST BE HOSTS")
         src_mac, dest_mac = nodes[0].mac, nodes[-1].mac
         src_name, dest_name = nodes[0].name, nodes[-1].name
 
+        ret = []
         for ind, node in enumerate(nodes[1:-1], 1):  # set flow for each switch
             port_prev = node.get_port_for_peer(nodes[ind - 1].id)
             port_next = node.get_port_for_peer(nodes[ind + 1].id)
             if port_next is None or port_prev is None:
                 raise Exception("INVALID PATH: PORT NOT FOUND")
             flow_forward = create_basic_flow(
-                f"{src_name}-{dest_name}-go",
+                f"{src_name}-{dest_name}-go{suffix}",
                 src_mac,
                 dest_mac,
                 port_next.port_number,
                 priority=priority,
             )
             flow_backward = create_basic_flow(
-                f"{src_name}-{dest_name}-back",
+                f"{src_name}-{dest_name}-back{suffix}",
                 dest_mac,
                 src_mac,
                 port_prev.port_number,
                 priority=priority,
             )
-            self.set_flow(node.id, table, flow_forward)
-            self.set_flow(node.id, table, flow_backward)
+            ret.append((node.id, flow_forward))
+            ret.append((node.id, flow_backward))
+        return ret
+
+    def _record_path(
+        self,
+        nodes: list[Node],
+        table: int,
+        priority: int,
+        switches: list[str] = None,
+        groups: list[tuple] = None,
+    ) -> tuple:
+        """
+        Record the path installed between the first and last of `nodes`. Groups the path used before
+        and no installed path uses any more are deleted.
+        - groups: (switch id, group id) of groups used by the path.
+        """
+        key = (nodes[0].name, nodes[-1].name)
+        old = self.installed_paths.get(key, None)
+        groups = [] if groups is None else groups
+        for group in groups:
+            self.group_users.setdefault(group, set()).add(key)
+        self.installed_paths[key] = {
+            "switches": (
+                [node.id for node in nodes[1:-1]] if switches is None else switches
+            ),
+            "table": table,
+            "priority": priority,
+            "groups": groups,
+        }
+        if old is not None:
+            self._release_groups(key, set(old["groups"]).difference(groups))
+        return key
+
+    def _group_id(self, node_id: str, ports: list[int]) -> int:
+        """
+        Group id of a select group over `ports` on a switch: the same ports get the same group, shared by all
+        paths using them, else the smallest id free on the switch.
+        """
+        ids = self.group_ids.setdefault(node_id, {})
+        key = tuple(sorted(ports))
+        if key not in ids:
+            used = set(ids.values())
+            ids[key] = next(i for i in range(1, len(used) + 2) if i not in used)
+        return ids[key]
+
+    def _release_groups(self, key: tuple, groups: set[tuple]):
+        """
+        Path `key` does not use `groups` [(switch id, group id)] any more. Delete those no other path uses.
+        """
+        unused = []
+        for node_id, group_id in groups:
+            users = self.group_users.get((node_id, group_id), set())
+            users.discard(key)
+            if users:
+                continue
+            self.group_users.pop((node_id, group_id), None)
+            ids = self.group_ids.get(node_id, {})
+            for ports in [p for p, i in ids.items() if i == group_id]:
+                del ids[ports]
+            unused.append((node_id, group_id))
+        if not unused:
+            return
+        requests = [
+            self._delete_group_request(node_id, group_id)
+            for node_id, group_id in unused
+        ]
+        results = self._send_requests(requests)
+        for req, res in zip(requests, results):
+            if isinstance(res, Exception):
+                print(f":: remove unused group {req[1]}: {res}")
+
+    def set_path(
+        self, *nodes: Node, table: int = 0, priority: int = 5, update: bool = False
+    ):
+        """
+        Install flows for a path of nodes [host, switches..., host] on each switch.
+        - update: Make-before-break update of the path installed before between the same hosts:
+        1. Make: a copy of the new path [other ids, `priority` + 1] is installed on all switches, above the old flows.
+        2. Break: the old flows are removed.
+        3. Settle: the new path is installed at `priority` with the usual ids, then the copy is removed.
+        Packets always match a complete path, and an installed path is always at `priority` in the end.
+        """
+        old = self.installed_paths.get((nodes[0].name, nodes[-1].name), None)
+        if update and old is not None:
+            return self._update_path(nodes, old, table, priority)
+
+        requests = [
+            self._set_flow_request(node_id, table, flow)
+            for node_id, flow in NetworkConfig._build_path_flows(nodes, priority)
+        ]
+        results = self._send_requests(requests)
+        self._raise_for_failures(requests, results, "SET PATH FAIL")
+        self._record_path(nodes, table, priority)
+
+    def _update_path(self, nodes: list[Node], old: dict, table: int, priority: int):
+        src_name, dest_name = nodes[0].name, nodes[-1].name
+        copies = NetworkConfig._build_path_flows(nodes, priority + 1, UPDATE_SUFFIX)
+
+        ### Make: copy of the new path on all switches at the same time, above the old flows
+        requests = [
+            self._set_flow_request(node_id, table, flow) for node_id, flow in copies
+        ]
+        results = self._send_requests(requests)
+        if any(isinstance(res, Exception) for res in results):
+            # roll back: packets matching a partial copy on some switches would leave the old path there
+            rollback = [
+                self._delete_flows_request(node_id, table, flow.id)
+                for (node_id, flow), res in zip(copies, results)
+                if not isinstance(res, Exception)
+            ]
+            self._send_requests(rollback)
+            self._raise_for_failures(requests, results, "UPDATE PATH FAIL")
+
+        ### Break: old flows on all old switches, also switches the new path does not use
+        requests = [
+            self._delete_flows_request(
+                node_id, old["table"], f"{src_name}-{dest_name}-{direction}"
+            )
+            for node_id in old["switches"]
+            for direction in ["go", "back"]
+        ]
+        results = self._send_requests(requests)
+        self._record_path(nodes, table, priority)
+        self._raise_for_failures(requests, results, "REMOVE OLD PATH FAIL")
+
+        ### Settle: new path at the base priority, under the copy, then remove the copy
+        requests = [
+            self._set_flow_request(node_id, table, flow)
+            for node_id, flow in NetworkConfig._build_path_flows(nodes, priority)
+        ]
+        results = self._send_requests(requests)
+        self._raise_for_failures(requests, results, "SETTLE PATH FAIL")
+        requests = [
+            self._delete_flows_request(node_id, table, flow.id)
+            for node_id, flow in copies
+        ]
+        results = self._send_requests(requests)
+        self._raise_for_failures(requests, results, "REMOVE PATH COPY FAIL")
+
+    def _build_ecmp_flows(
+        self,
+        src: Host,
+        dest: Host,
+        next_hops: dict[Node, list[Node]],
+        id: str,
+        priority: int = 5,
+    ) -> tuple[list, list]:
+        """
+        Flows toward `dest` on each switch of `next_hops` [switch -> equal-cost next hops].
+        A switch with one output port gets an output flow, with many ports [next hops or parallel links]
+        a select group over them and a flow to the group.
+        Return (groups, flows): list of (switch id, group dict), list of (switch id, flow).
+        """
+        groups, flows = [], []
+        for node, hops in next_hops.items():
+            if node.type != "switch":
+                continue
+            ports = sorted(
+                {p.port_number for hop in hops for p in node.get_ports_for_peer(hop.id)}
+            )
+            if not ports:
+                raise Exception("INVALID PATH: PORT NOT FOUND")
+            if len(ports) == 1:
+                flow = create_basic_flow(
+                    id, src.mac, dest.mac, ports[0], priority=priority
+                )
+            else:
+                group_id = self._group_id(node.id, ports)
+                groups.append((node.id, create_select_group(group_id, ports)))
+                flow = create_group_flow(
+                    id, src.mac, dest.mac, group_id, priority=priority
+                )
+            flows.append((node.id, flow))
+        return groups, flows
+
+    def set_ecmp_path(
+        self,
+        src: Host,
+        dest: Host,
+        forward: dict[Node, list[Node]],
+        backward: dict[Node, list[Node]],
+        table: int = 0,
+        priority: int = 5,
+    ):
+        """
+        Install all equal-cost paths between two hosts. Ex: next hops from `NetworkTopology.get_ecmp_next_hops`, as Node objects.
+        - forward: Switch -> next hops toward `dest`.
+        - backward: Switch -> next hops toward `src`.
+        Select groups are written first, then flows pointing to them. Groups are shared by paths with the same
+        output ports on a switch. Old flows on switches the path left are removed, then groups no path uses any more.
+        """
+        old = self.installed_paths.get((src.name, dest.name), None)
+        groups, flows = {}, []
+        for hops, (s, d, direction) in [
+            (forward, (src, dest, "go")),
+            (backward, (dest, src, "back")),
+        ]:
+            g, f = self._build_ecmp_flows(
+                s,
+                d,
+                hops,
+                f"{src.name}-{dest.name}-{direction}",
+                priority,
+            )
+            groups.update({(node_id, group["group-id"]): group for node_id, group in g})
+            flows.extend(f)
+
+        requests = [
+            self._set_group_request(node_id, group)
+            for (node_id, _), group in groups.items()
+        ]
+        results = self._send_requests(requests)
+        self._raise_for_failures(requests, results, "SET GROUPS FAIL")
+
+        requests = [
+            self._set_flow_request(node_id, table, flow) for node_id, flow in flows
+        ]
+        results = self._send_requests(requests)
+        self._raise_for_failures(requests, results, "SET ECMP PATH FAIL")
+        switches = list(dict.fromkeys(node_id for node_id, _ in flows))
+        if old is not None:
+            requests = [
+                self._delete_flows_request(
+                    node_id, old["table"], f"{src.name}-{dest.name}-{direction}"
+                )
+                for node_id in old["switches"]
+                if node_id not in switches or old["table"] != table
+                for direction in ["go", "back"]
+            ]
+            results = self._send_requests(requests)
+            self._raise_for_failures(requests, results, "REMOVE OLD PATH FAIL")
+        self._record_path([src, dest], table, priority, switches, list(groups))
+        print(
+            f":: set ECMP path {src.name} <-> {dest.name}: {len(switches)} switches, {len(groups)} groups"
+        )
+
+    def set_paths(
+        self,
+        paths: dict[tuple, list[Node]],
+        table: int = 0,
+        priority: int = 5,
+        replace: bool = False,
+    ) -> dict[str, str]:
+        """
+        Install many paths at once. Ex: paths from `NetworkTopology.get_hosts_shortest_path`, as Node objects.
+        Flows are grouped by switch, each switch's table is written by one request.
+        - replace: True if want to replace the whole table with these flows. False [Default] to keep other flows in the table,
+        this costs one more GET per table.
+
+        Return failures by switch id: {switch id: error message}. Invalid paths are skipped and reported by path.
+        """
+        failures = {}
+        tables = {}  # (switch id, table) -> {flow id: flow}
+        paths_by_switch = {}  # switch id -> paths through it
+        for key, nodes in paths.items():
+            try:
+                for node_id, flow in NetworkConfig._build_path_flows(nodes, priority):
+                    tables.setdefault((node_id, table), {})[flow.id] = flow.to_dict()
+                    paths_by_switch.setdefault(node_id, set()).add(key)
+            except Exception as ex:
+                failures[f"{key}"] = str(ex)
+                print(f":: skip path {key}: {ex}")
+
+        failures.update(self._push_tables(tables, replace))
+        failed_paths = set()
+        for node_id in failures:
+            failed_paths.update(paths_by_switch.get(node_id, []))
+        for key, nodes in paths.items():
+            if f"{key}" not in failures and key not in failed_paths:
+                self._record_path(nodes, table, priority)
+        return failures
+
+    def _push_tables(self, tables: dict[tuple, dict], replace: bool) -> dict:
+        """
+        Write flows of many tables, one request per table.
+        - tables: {(switch id, table id): {flow id: flow dict}}
+        - replace: False to keep other flows in the table, read by one more GET per table.
+        Return failures by switch id.
+        """
+        failures = {}
+        keys = list(tables)
+        if not replace:  # merge with flows already in config datastore
+            requests = [
+                ("get", NetworkConfig._table_endpoint(node_id, table_id))
+                for node_id, table_id in keys
+            ]
+            for key, res in zip(keys, self._send_requests(requests)):
+                if isinstance(res, Exception):
+                    if not str(res).startswith("404"):
+                        failures[key[0]] = str(res)
+                        print(
+                            f":: fail to get table {key[1]} for switch [{key[0]}]: {res}"
+                        )
+                    continue  # 404: no table in config datastore yet
+                current = res["flow-node-inventory:table"][0].get("flow", [])
+                flows = tables[key]
+                tables[key] = {f["id"]: f for f in current if f["id"] not in flows}
+                tables[key].update(flows)
+
+        keys = [key for key in keys if key[0] not in failures]
+        requests = [
+            self._set_table_request(
+                node_id, table_id, list(tables[node_id, table_id].values())
+            )
+            for node_id, table_id in keys
+        ]
+        results = self._send_requests(requests)
+        for ind, ((node_id, table_id), res) in enumerate(zip(keys, results), 1):
+            if isinstance(res, Exception):
+                failures[node_id] = str(res)
+                print(
+                    f":: [{ind}/{len(keys)}] fail to set table {table_id} for switch [{node_id}]: {res}"
+                )
+            else:
+                print(
+                    f":: [{ind}/{len(keys)}] set {len(tables[node_id, table_id])} flows in table {table_id} for switch [{node_id}]"
+                )
+        return failures
+
+    @staticmethod
+    def _build_destination_flows(
+        dest: Host, next_hops: dict[Node, Node], priority: int = 5
+    ) -> list[tuple]:
+        """
+        One flow per switch toward `dest`, matching the destination MAC only.
+        - next_hops: Switch -> its next hop toward `dest`, from one shortest-path tree [loop-free].
+        Return list of (switch id, flow).
+        """
+        ret = []
+        for node, hop in next_hops.items():
+            if node.type != "switch":
+                continue
+            port = node.get_port_for_peer(hop.id)
+            if port is None:
+                raise Exception("INVALID PATH: PORT NOT FOUND")
+            flow = create_basic_flow(
+                f"to-{dest.name}", None, dest.mac, port.port_number, priority=priority
+            )
+            ret.append((node.id, flow))
+        return ret
+
+    def set_destination_routes(
+        self,
+        trees: dict[Host, dict[Node, Node]],
+        table: int = 0,
+        priority: int = 5,
+        replace: bool = False,
+    ) -> dict[str, str]:
+        """
+        Install forwarding toward each destination host, for all sources at once: one flow per (switch, destination),
+        O(hosts) flows per switch instead of O(hosts^2) for per-pair paths.
+        Ex: trees from `NetworkTopology.get_destination_trees`, as Node objects.
+        - trees: Destination host -> {switch: next hop toward it}.
+        Flows are written in bulk like `set_paths`. Return failures by switch id or destination.
+        """
+        failures = {}
+        tables = {}  # (switch id, table) -> {flow id: flow}
+        switches_by_dest = {}
+        for dest, next_hops in trees.items():
+            try:
+                for node_id, flow in NetworkConfig._build_destination_flows(
+                    dest, next_hops, priority
+                ):
+                    tables.setdefault((node_id, table), {})[flow.id] = flow.to_dict()
+                    switches_by_dest.setdefault(dest.name, []).append(node_id)
+            except Exception as ex:
+                failures[dest.name] = str(ex)
+                print(f":: skip destination {dest.name}: {ex}")
+
+        failures.update(self._push_tables(tables, replace))
+        for dest_name, switches in switches_by_dest.items():
+            if dest_name not in failures and not failures.keys() & set(switches):
+                self.installed_destinations[dest_name] = {
+                    "switches": switches,
+                    "table": table,
+                    "priority": priority,
+                }
+        return failures
+
+    @staticmethod
+    def _table_endpoint(node_id: str, table_id: str) -> str:
+        return f"/restconf/config/opendaylight-inventory:nodes/node/{node_id}/flow-node-inventory:table/{table_id}"
+
+    def _set_table_request(
+        self, node_id: str, table_id: str, flows: list[dict]
+    ) -> tuple:
+        for flow_dict in flows:
+            flow_dict["table_id"] = table_id
+        return (
+            "put",
+            NetworkConfig._table_endpoint(node_id, table_id),
+            {"flow-node-inventory:table": [{"id": table_id, "flow": flows}]},
+        )
 
     def set_drop_flow(
         self, node_id: str, table_id: str, src_mac: str, dest_mac: str, priority: int
@@ -163,29 +611,159 @@ class NetworkConfig(object):
         if isinstance(table_id, (int, str)):
             table_id = [table_id]
 
+        requests = []
         for ni in node_id:
             for ti in table_id:
-                flow_dict["table_id"] = ti
-                flow_dict[
+                input_dict = dict(flow_dict)
+                input_dict["table_id"] = ti
+                input_dict[
                     "node"
                 ] = f"/opendaylight-inventory:nodes/opendaylight-inventory:node[opendaylight-inventory:id='{ni}']"
-                # print(json.dumps(flow_dict))
-                self.connector.post(ep, {"input": flow_dict})
+                # print(json.dumps(input_dict))
+                requests.append(("post", ep, {"input": input_dict}))
+        results = self._send_requests(requests)
+        self._raise_for_failures(requests, results, "REMOVE FLOWS FAIL")
 
-    def set_flow(self, node_id: str, table_id: str, flow: Flow):
+    def _set_flow_request(self, node_id: str, table_id: str, flow: Flow) -> tuple:
         ep = f"/restconf/config/opendaylight-inventory:nodes/node/{node_id}/flow-node-inventory:table/{table_id}/flow/{flow.id}"
         flow_dict = flow.to_dict()
         flow_dict["table_id"] = table_id
-        self.connector.put(ep, {"flow-node-inventory:flow": [flow_dict]})
+        return ("put", ep, {"flow-node-inventory:flow": [flow_dict]})
 
-    def delete_flows(self, node_id: str, table_id: str, flow_id: str = None):
+    def set_flow(self, node_id: str, table_id: str, flow: Flow):
+        _, ep, data = self._set_flow_request(node_id, table_id, flow)
+        self.connector.put(ep, data)
+
+    def _set_group_request(self, node_id: str, group: dict) -> tuple:
+        ep = f"/restconf/config/opendaylight-inventory:nodes/node/{node_id}/flow-node-inventory:group/{group['group-id']}"
+        return ("put", ep, {"flow-node-inventory:group": [group]})
+
+    def set_group(self, node_id: str, group: dict):
+        _, ep, data = self._set_group_request(node_id, group)
+        self.connector.put(ep, data)
+
+    def _delete_group_request(self, node_id: str, group_id: int) -> tuple:
+        ep = f"/restconf/config/opendaylight-inventory:nodes/node/{node_id}/flow-node-inventory:group/{group_id}"
+        return ("delete", ep)
+
+    def delete_group(self, node_id: str, group_id: int):
+        _, ep = self._delete_group_request(node_id, group_id)
+        self.connector.delete(ep)
+
+    def _delete_flows_request(
+        self, node_id: str, table_id: str, flow_id: str = None
+    ) -> tuple:
         # "/restconf/config/opendaylight-inventory:nodes/node/{id}/flow-node-inventory:table/{id}/flow/{id}""
         if flow_id is not None:
             ep = f"/restconf/config/opendaylight-inventory:nodes/node/{node_id}/table/{table_id}/flow/{flow_id}"
         else:
             ep = f"/restconf/config/opendaylight-inventory:nodes/node/{node_id}/table/{table_id}"
+        return ("delete", ep)
+
+    def delete_flows(self, node_id: str, table_id: str, flow_id: str = None):
+        _, ep = self._delete_flows_request(node_id, table_id, flow_id)
         self.connector.delete(ep)
 
+    def get_config_tables(self, node_ids: list[str]) -> dict[str, dict]:
+        """
+        Read flows in config datastore, one GET per switch.
+        Return {switch id: {table id: {flow id: flow dict}}}, or an Exception object for a switch fail to read.
+        """
+        requests = [
+            ("get", f"/restconf/config/opendaylight-inventory:nodes/node/{node_id}")
+            for node_id in node_ids
+        ]
+        ret = {}
+        for node_id, res in zip(node_ids, self._send_requests(requests)):
+            if isinstance(res, Exception):
+                # 404: nothing of this switch in config datastore yet
+                ret[node_id] = {} if str(res).startswith("404") else res
+                continue
+            tables = {}
+            for table in res["node"][0].get("flow-node-inventory:table", []):
+                tables[table["id"]] = {f["id"]: f for f in table.get("flow", [])}
+            ret[node_id] = tables
+        return ret
+
+    def reconcile(
+        self, desired: dict[tuple, list[Flow]], prune: bool = True
+    ) -> dict[str, object]:
+        """
+        Make config datastore match `desired` flows: {(switch id, table id): [Flow]}.
+        Current tables are read once per switch, then flows are compared by `Flow.canonical_hash`,
+        only added and modified flows are PUT, and flows not in `desired` are DELETEd if `prune`.
+
+        Return summary: {"added": int, "modified": int, "deleted": int, "unchanged": int, "failures": {switch id: error}}
+        """
+        summary = {"added": 0, "modified": 0, "deleted": 0, "unchanged": 0}
+        failures = {}
+        node_ids = list(dict.fromkeys(node_id for node_id, _ in desired))
+        current = self.get_config_tables(node_ids)
+
+        requests = []
+        for (node_id, table_id), flows in desired.items():
+            tables = current[node_id]
+            if isinstance(tables, Exception):
+                failures[node_id] = str(tables)
+                continue
+            existing = tables.get(table_id, tables.get(str(table_id), {}))
+            wanted = {flow.id: flow for flow in flows}
+            for flow_id, flow in wanted.items():
+                old = existing.get(flow_id, None)
+                if old is None:
+                    summary["added"] += 1
+                elif canonical_flow_hash(old) != flow.canonical_hash():
+                    summary["modified"] += 1
+                else:
+                    summary["unchanged"] += 1
+                    continue
+                requests.append(self._set_flow_request(node_id, table_id, flow))
+            if prune:
+                for flow_id in existing:
+                    if flow_id not in wanted:
+                        summary["deleted"] += 1
+                        requests.append(
+                            self._delete_flows_request(node_id, table_id, flow_id)
+                        )
+
+        for req, res in zip(requests, self._send_requests(requests)):
+            if isinstance(res, Exception):
+                node_id = req[1].split("/node/")[1].split("/")[0]
+                failures.setdefault(node_id, str(res))
+        summary["failures"] = failures
+        print(
+            f":: reconcile: [Added = {summary['added']}] [Modified = {summary['modified']}] [Deleted = {summary['deleted']}] [Unchanged = {summary['unchanged']}] [Failed Switches = {len(failures)}]"
+        )
+        return summary
+
+    def reconcile_paths(
+        self,
+        paths: dict[tuple, list[Node]],
+        table: int = 0,
+        priority: int = 5,
+        prune: bool = False,
+    ) -> dict[str, object]:
+        """
+        `reconcile` with flows of `paths`. Re-applying the same paths costs one GET per switch and no write.
+        - prune: True if want to delete other flows in the tables. [Default: False]
+        """
+        desired, skipped = {}, set()
+        for key, nodes in paths.items():
+            try:
+                for node_id, flow in NetworkConfig._build_path_flows(nodes, priority):
+                    desired.setdefault((node_id, table), []).append(flow)
+            except Exception as ex:
+                skipped.add(key)
+                print(f":: skip path {key}: {ex}")
+        summary = self.reconcile(desired, prune=prune)
+        for key, nodes in paths.items():
+            if key in skipped:
+                continue
+            switches = [node.id for node in nodes[1:-1]]
+            if not set(summary["failures"]).intersection(switches):
+                self._record_path(nodes, table, priority)
+        return summary
+
     # def print_live_object(
     #     self, node_id, table_id=None, flow_id=None, *, datastore="operational"
     # ):
@@ -1,4 +1,5 @@
 import networkx as nx
+from pathfind import PathCache
 
 
 class NetworkGraph(object):
@@ -6,10 +7,14 @@ class NetworkGraph(object):
         g = nx.Graph()
         g.add_edges_from(links, w=1)  # default weight is 1
         self.graph = g
+        self.path_cache = PathCache(g, weight="w")
 
     def set_weight(self, src: str, dest: str, weight: int = 1):
         try:
-            self.graph.edges[src, dest]["w"] = weight
+            edge = self.graph.edges[src, dest]
+            old_weight = edge["w"]
+            edge["w"] = weight
+            self.path_cache.update_edge(src, dest, old_weight, weight)
         except:
             pass
 
@@ -20,7 +25,7 @@ class NetworkGraph(object):
     def set_weights(self, edge_weights: list[tuple]):
         for ew in edge_weights:
             try:
-                self.graph.edges[ew[0], ew[1]]["w"] = int(ew[2])
+                self.set_weight(ew[0], ew[1], int(ew[2]))
             except:
                 pass
 
@@ -28,15 +33,7 @@ class NetworkGraph(object):
         if nodes is None:
             nodes = [n for n in self.graph.nodes if node_match_func(n)]
             print(nodes)
-        stp = nx.shortest_path(self.graph, weight="w", method="dijkstra")
-        ret = {}
-        for src, dest_path in stp.items():
-            if src in nodes:
-                for dest, path in dest_path.items():
-                    if dest in nodes and (dest, src) not in ret:
-                        ret[(src, dest)] = path
-                ret.pop((src, src), None)
-        return ret
+        return self.path_cache.get_paths(nodes)
 
     def get_shortest_path(self, src_id=None, dest_id=None) -> dict[tuple, list]:
         stp = nx.shortest_path(
@@ -2,41 +2,443 @@ from node import Switch, Host, Node
 from flow import Table, Flow
 from connector import Connector
 from node import parse_port_list
+from snapshot import Snapshotter, load_snapshot
+from pathfind import constrained_shortest_path, PathCache
+from sparsepath import SparsePathEngine
 import networkx as nx
 import networkx.classes.function as nxfunc
-import networkx.algorithms.simple_paths as nxpath
-import json
+import threading
+import re
+
+# Segments of a data change path, as (name, key) [key is '' for containers].
+# Ex: .../topology[topology-id='flow:1']/link[link-id='openflow:1:2'], .../node[id='openflow:1']/node-connector[id='openflow:1:2']/state
+_PATH_SEGMENTS = re.compile(
+    r"/(?:[\w-]+:)?([\w-]+)(?:\[(?:[\w-]+:)?[\w-]+='([^']*)'\])?"
+)
+
+
+class TopologyDiff(object):
+    """
+    Changes applied by one `NetworkTopology.refresh`.
+    - Nodes: node ids. Links: (source node id, source port id, destination node id, destination port id).
+    - Ports: (port id, old state, new state) for changed state, port ids for added/removed ports.
+    """
+
+    def __init__(self) -> None:
+        self.added_nodes = []
+        self.removed_nodes = []
+        self.added_links = []
+        self.removed_links = []
+        self.added_ports = []
+        self.removed_ports = []
+        self.changed_ports = []
+
+    def extend(self, other: "TopologyDiff"):
+        for name, changes in vars(other).items():
+            getattr(self, name).extend(changes)
+
+    def is_empty(self) -> bool:
+        return not (
+            self.added_nodes
+            or self.removed_nodes
+            or self.added_links
+            or self.removed_links
+            or self.added_ports
+            or self.removed_ports
+            or self.changed_ports
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"[Nodes +{len(self.added_nodes)} -{len(self.removed_nodes)}] "
+            f"[Links +{len(self.added_links)} -{len(self.removed_links)}] "
+            f"[Ports +{len(self.added_ports)} -{len(self.removed_ports)} ~{len(self.changed_ports)}]"
+        )
 
 
 class NetworkTopology(object):
-    def __init__(self, connector: Connector) -> None:
+    def __init__(
+        self,
+        connector: Connector,
+        snapshotter: Snapshotter = None,
+        *,
+        offline_snapshot: str | tuple[str, str] = None,
+    ) -> None:
+        """
+        - snapshotter: Where raw data of each refresh goes. [Default: None, keep nothing].
+        - offline_snapshot: Build the topology from a saved snapshot instead of contacting the controller.
+        A path saved by `Snapshotter`, or a pair of paths (topology.json, nodes.json).
+        """
         self.connector = connector
-        self.refresh()
+        self.snapshotter = snapshotter
+        # held by every thread reading or changing the model [and the paths installed from it]: shell commands,
+        # `TopologySubscriber`, `AdaptiveWeights`, `PathDaemon`. Changes below take it themselves.
+        self.lock = threading.RLock()
+        self.nodes = {}
+        self.links = set()
+        self.link_ids = {}  # link id -> link, to find links deleted by notifications
+        self.graph = nx.Graph()
+        self.path_cache = PathCache(self.graph, weight="w")
+        self.sparse_engine = None  # built on demand by `get_hosts_shortest_path`
+        # bumped by every change of the graph [nodes, links, weights], for caches built on it [`PathDaemon`]
+        self.version = 0
+        self.mappings_node_id_name = {}
+        if offline_snapshot is not None:
+            self.load_snapshot(offline_snapshot)
+        else:
+            self.refresh()
 
-    def refresh(self):
+    def refresh(self) -> TopologyDiff:
+        """
+        Download the topology and update the current model in place.
+        Only changed nodes, ports and links are touched, links' weights are kept.
+        """
+        if self.connector is None:
+            raise Exception("OFFLINE TOPOLOGY: no connector to refresh from")
         topology = self.connector.get_objects("topo")[1][0]
         switches = self.connector.get_objects("switch")[1]
-        with open("topology.json", "w") as file:
-            json.dump(topology, file)
-        with open("nodes.json", "w") as file:
-            json.dump(switches, file)
-        nodes = NetworkTopology._extract_nodes(topology, switches)
+        if self.snapshotter is not None:
+            self.snapshotter.update(topology, switches)
+        with self.lock:
+            diff = self._apply(topology, switches)
+            if not diff.is_empty():
+                self._graph_changed()
+        print(f":: refresh: {diff}")
+        return diff
+
+    def load_snapshot(self, path: str | tuple[str, str]) -> TopologyDiff:
+        if isinstance(path, (tuple, list)):
+            topology, switches = load_snapshot(*path)
+        else:
+            topology, switches = load_snapshot(path)
+        if self.snapshotter is not None:
+            self.snapshotter.update(topology, switches)
+        diff = self._apply(topology, switches)
+        if not diff.is_empty():
+            self._graph_changed()
+        print(f":: load snapshot: {diff}")
+        return diff
+
+    def save_snapshot(self, path: str = None) -> str:
+        if self.snapshotter is None:
+            raise Exception("NO SNAPSHOT: snapshot is not enabled")
+        return self.snapshotter.save(path)
+
+    @staticmethod
+    def _link_tuple(link: dict) -> tuple:
+        src_id, src_port = link["source"].values()
+        dest_id, dest_port = link["destination"].values()
+        return (src_id, src_port, dest_id, dest_port)
+
+    @staticmethod
+    def _extract_links(topology: dict) -> set[tuple]:
+        return {NetworkTopology._link_tuple(l) for l in topology.get("link", {})}
+
+    @staticmethod
+    def _extract_link_ids(topology: dict) -> dict[str, tuple]:
+        return {
+            l["link-id"]: NetworkTopology._link_tuple(l)
+            for l in topology.get("link", {})
+        }
+
+    def _apply(self, topology: dict, switches: list) -> TopologyDiff:
+        diff = TopologyDiff()
+        raw_nodes = {}
+        for ni in topology.get("node", {}):
+            if "host" in ni["node-id"]:
+                raw_nodes[ni["node-id"]] = ni
+        for nd in switches:
+            raw_nodes[nd["id"]] = nd
+        links = NetworkTopology._extract_links(topology)
+        self.link_ids = NetworkTopology._extract_link_ids(topology)
+        if not self.nodes:  # first load, build everything
+            return self._build(topology, switches, links, diff)
+        nodes = self.nodes
+        touched = set()  # pairs of node ids that may need their graph edge updated
+
+        ### Links: remove first, so removed nodes and ports are detached
+        for link in self.links - links:
+            src_id, src_port, dest_id, dest_port = link
+            if src_id in nodes:
+                port = nodes[src_id].ports.get(src_port, None)
+                if (
+                    port is not None
+                    and port.peer is not None
+                    and port.peer.id == dest_port
+                ):
+                    nodes[src_id].clear_peer(src_port)
+            touched.add((src_id, dest_id))
+            diff.removed_links.append(link)
+
+        ### Nodes
+        for id in [id for id in nodes if id not in raw_nodes]:
+            node = nodes.pop(id)
+            if node.name in self.graph:
+                self.graph.remove_node(node.name)
+                self.path_cache.clear()
+            self.mappings_node_id_name.pop(node.name, None)
+            diff.removed_nodes.append(id)
+        for id, data in raw_nodes.items():
+            node = nodes.get(id, None)
+            if node is None:
+                node = Host(data) if "host" in id else Switch(data)
+                nodes[id] = node
+                self.mappings_node_id_name[node.name] = id
+                diff.added_nodes.append(id)
+                continue
+            changes = node.update(data)
+            diff.added_ports.extend(changes["added"])
+            diff.removed_ports.extend(changes["removed"])
+            diff.changed_ports.extend(changes["changed"])
+
+        gone = set(diff.removed_ports)
+        if gone:  # links on removed ports are detached with the ports
+            touched.update((l[0], l[2]) for l in self.links if gone.intersection(l))
+
+        ### Links: add, and re-attach kept links whose node or port was just re-created
+        new_links = links - self.links
+        fresh = set(diff.added_nodes).union(diff.added_ports)
+        for link in new_links.union(
+            l for l in links & self.links if fresh.intersection(l)
+        ):
+            src_id, src_port, dest_id, dest_port = link
+            if src_id not in nodes or dest_id not in nodes:
+                continue
+            if src_port not in nodes[src_id].ports:
+                continue
+            if dest_port not in nodes[dest_id].ports:
+                continue
+            nodes[src_id].set_peer(src_port, nodes[dest_id], dest_port)
+            nodes[dest_id].set_peer(dest_port, nodes[src_id], src_port)
+            touched.add((src_id, dest_id))
+            if link in new_links:
+                diff.added_links.append(link)
+        self.links = links
+
+        ### Graph: only edges between touched pairs, other edges keep their weights
+        for src_id, dest_id in touched:
+            self._sync_edge(src_id, dest_id)
+        return diff
+
+    def _sync_edge(self, src_id: str, dest_id: str):
+        """
+        Add or remove the graph edge between two nodes as their ports are connected or not. A kept edge keeps its weight.
+        """
+        nodes = self.nodes
+        if src_id not in nodes or dest_id not in nodes:
+            return
+        src, dest = nodes[src_id], nodes[dest_id]
+        connected = dest_id in [peer.id for peer in src.peers.values()]
+        if connected and not self.graph.has_edge(src.name, dest.name):
+            self.graph.add_edge(src.name, dest.name, w=1)
+            self.path_cache.update_edge(src.name, dest.name, None, 1)
+        elif not connected and self.graph.has_edge(src.name, dest.name):
+            old_weight = self.graph.edges[src.name, dest.name]["w"]
+            self.graph.remove_edge(src.name, dest.name)
+            self.path_cache.update_edge(src.name, dest.name, old_weight, None)
+
+    ########################### Notifications ###########################
 
-        links = []
+    def apply_events(self, events: list[dict]) -> TopologyDiff:
+        """
+        Apply data change events [from `TopologySubscriber`] in place, without downloading the topology.
+        Each event: {"path", "operation": 'created'/'updated'/'deleted', "data"}, on network-topology links and hosts,
+        or on inventory nodes, node-connectors and their `state`. Events below other entries [tables, flows, statistics,
+        other leaves] are ignored. A port going link-down detaches its links at once, before the controller removes them.
+        """
+        diff = TopologyDiff()
+        with self.lock:
+            for event in events:
+                self._apply_event(event, diff)
+            if not diff.is_empty():
+                self._graph_changed()
+        return diff
+
+    def _graph_changed(self):
+        self.version += 1
+        self.sparse_engine = None
+
+    def _apply_event(self, event: dict, diff: TopologyDiff):
+        segments = _PATH_SEGMENTS.findall(event.get("path", ""))
+        keyed = [ind for ind, (_, key) in enumerate(segments) if key]
+        if not keyed:
+            return
+        kinds = [segments[ind][0] for ind in keyed]
+        id = segments[keyed[-1]][1]
+        child = [name for name, _ in segments[keyed[-1] + 1 :]]
+        operation = event.get("operation", "updated")
+        data = event.get("data", None)
+        if child:  # a part of the entry only
+            if kinds == ["node", "node-connector"] and child == ["state"]:
+                if operation != "deleted":
+                    self._patch_port_state(segments[keyed[0]][1], id, data, diff)
+        elif kinds == ["topology", "link"]:
+            self._patch_link(id, operation, data, diff)
+        elif kinds == ["topology", "node"] and "host" in id:
+            self._patch_node(id, operation, data, diff)
+        elif kinds == ["node"] and "host" not in id:
+            self._patch_node(id, operation, data, diff)
+        elif kinds == ["node", "node-connector"]:
+            self._patch_port(segments[keyed[0]][1], id, operation, data, diff)
+
+    @staticmethod
+    def _event_item(data: dict) -> dict:
+        # {"network-topology:link": [{...}]} -> {...}
+        item = next(iter(data.values()))
+        return item[0] if isinstance(item, list) else item
+
+    def _attach_link(self, link: tuple) -> bool:
+        src_id, src_port, dest_id, dest_port = link
+        nodes = self.nodes
+        if src_id not in nodes or dest_id not in nodes:
+            return False
+        if src_port not in nodes[src_id].ports or dest_port not in nodes[dest_id].ports:
+            return False
+        nodes[src_id].set_peer(src_port, nodes[dest_id], dest_port)
+        nodes[dest_id].set_peer(dest_port, nodes[src_id], src_port)
+        self._sync_edge(src_id, dest_id)
+        return True
+
+    def _detach_link(self, link: tuple) -> bool:
+        """
+        Return False if the link was not attached [already detached by its port going down].
+        """
+        src_id, src_port, dest_id, dest_port = link
+        attached = False
+        if src_id in self.nodes:
+            port = self.nodes[src_id].ports.get(src_port, None)
+            if port is not None and port.peer is not None and port.peer.id == dest_port:
+                self.nodes[src_id].clear_peer(src_port)
+                attached = True
+        self._sync_edge(src_id, dest_id)
+        return attached
+
+    def _reattach(self, ids: list[str]):
+        """
+        Connect known links on re-created nodes or ports [their link events may come first].
+        """
+        ids = set(ids)
+        for link in self.links:
+            if ids.intersection(link):
+                self._attach_link(link)
+
+    def _patch_link(self, link_id: str, operation: str, data: dict, diff: TopologyDiff):
+        old = self.link_ids.get(link_id, None)
+        if operation == "deleted":
+            if old is None:
+                return
+            self.link_ids.pop(link_id)
+            self.links.discard(old)
+            if self._detach_link(old):
+                diff.removed_links.append(old)
+            return
+        link = NetworkTopology._link_tuple(NetworkTopology._event_item(data))
+        if old == link:
+            return
+        if old is not None:
+            self.links.discard(old)
+            self._detach_link(old)
+            diff.removed_links.append(old)
+        self.link_ids[link_id] = link
+        self.links.add(link)
+        self._attach_link(link)
+        diff.added_links.append(link)
+
+    def _remove_node(self, id: str, diff: TopologyDiff):
+        node = self.nodes.pop(id, None)
+        if node is None:
+            return
+        for port in node.ports.values():
+            if port.peer is not None and port.peer.peer is port:
+                port.peer.owner.clear_peer(port.peer.id)
+        if node.name in self.graph:
+            self.graph.remove_node(node.name)
+            self.path_cache.clear()
+        self.mappings_node_id_name.pop(node.name, None)
+        diff.removed_nodes.append(id)
+
+    def _patch_node(self, id: str, operation: str, data: dict, diff: TopologyDiff):
+        if operation == "deleted":
+            return self._remove_node(id, diff)
+        data = NetworkTopology._event_item(data)
+        node = self.nodes.get(id, None)
+        if node is None:
+            node = Host(data) if "host" in id else Switch(data)
+            self.nodes[id] = node
+            self.mappings_node_id_name[node.name] = id
+            diff.added_nodes.append(id)
+            self._reattach([id])
+            return
+        changes = node.update(dict(node.data, **data))  # keep parts not in the event
+        diff.added_ports.extend(changes["added"])
+        diff.removed_ports.extend(changes["removed"])
+        diff.changed_ports.extend(changes["changed"])
+        down = [c[0] for c in changes["changed"] if "link-down" in c[2]]
+        for link in [l for l in self.links if set(changes["removed"] + down) & set(l)]:
+            if link[1] in down or link[3] in down:  # the cable is gone, both directions
+                if self._detach_link(link):
+                    diff.removed_links.append(link)
+            else:
+                self._sync_edge(link[0], link[2])
+        up = [
+            c[0]
+            for c in changes["changed"]
+            if "link-down" in c[1] and "link-down" not in c[2]
+        ]
+        if changes["added"] or up:
+            self._reattach(changes["added"] + up)
+
+    def _patch_port(
+        self,
+        node_id: str,
+        port_id: str,
+        operation: str,
+        data: dict,
+        diff: TopologyDiff,
+    ):
+        node = self.nodes.get(node_id, None)
+        if node is None or node.type != "switch":
+            return
+        connectors = [c for c in node.data["node-connector"] if c["id"] != port_id]
+        if operation != "deleted":
+            connectors.append(NetworkTopology._event_item(data))
+        self._patch_node(
+            node_id,
+            "updated",
+            {"node": [dict(node.data, **{"node-connector": connectors})]},
+            diff,
+        )
+
+    def _patch_port_state(
+        self, node_id: str, port_id: str, data: dict, diff: TopologyDiff
+    ):
+        node = self.nodes.get(node_id, None)
+        if node is None or node.type != "switch":
+            return
+        for conn in node.data["node-connector"]:
+            if conn["id"] == port_id:
+                state = NetworkTopology._event_item(data)
+                conn = dict(conn, **{"flow-node-inventory:state": state})
+                self._patch_port(node_id, port_id, "updated", {"": conn}, diff)
+                return
+
+    def _build(
+        self, topology: dict, switches: list, links: set[tuple], diff: TopologyDiff
+    ) -> TopologyDiff:
+        nodes = NetworkTopology._extract_nodes(topology, switches)
+        graph = nx.Graph()
         for node in nodes.values():
             for peer in node.peers.values():
-                links.append((node.name, peer.name))
-        # self.netgraph = NetworkGraph(links)
-        graph = nx.Graph()
-        graph.add_edges_from(links, w=1)
+                graph.add_edge(node.name, peer.name, w=1)
 
         self.graph = graph
+        self.path_cache = PathCache(graph, weight="w")
         self.nodes = nodes
-
-        ret = {}
-        for id, node in nodes.items():
-            ret[node.name] = id
-        self.mappings_node_id_name = ret
+        self.links = links
+        self.mappings_node_id_name = {node.name: id for id, node in nodes.items()}
+        diff.added_nodes.extend(nodes)
+        diff.added_links.extend(links)
+        return diff
 
     def get_id_from_names(self, *node_names):
         return [self.mappings_node_id_name.get(n, None) for n in node_names]
@@ -48,19 +450,24 @@ class NetworkTopology(object):
         ]
 
     def set_weight(self, src: str, dest: str, weight: int = 1):
-        self.graph.edges[src, dest]["w"] = weight
+        with self.lock:
+            edge = self.graph.edges[src, dest]
+            old_weight = edge["w"]
+            edge["w"] = weight
+            self.path_cache.update_edge(src, dest, old_weight, weight)
+            if old_weight != weight:
+                self._graph_changed()
 
-    def get_hosts_shortest_path(self) -> dict[tuple, list]:
+    def get_hosts_shortest_path(self, engine: str = "networkx") -> dict[tuple, list]:
+        """
+        - engine: 'networkx' [Default, cached Dijkstra trees] or 'scipy' [vectorized, for many hosts. Requires numpy, scipy]
+        """
         hosts = [n for n in self.graph.nodes if n.startswith(("H", "h"))]
-        stp = nx.shortest_path(self.graph, weight="w", method="dijkstra")
-        ret = {}
-        for src, dest_path in stp.items():
-            if src in hosts:
-                for dest, path in dest_path.items():
-                    if dest in hosts and (dest, src) not in ret:
-                        ret[(src, dest)] = path
-                ret.pop((src, src), None)
-        return ret
+        if engine == "scipy":
+            if self.sparse_engine is None:
+                self.sparse_engine = SparsePathEngine(self.graph, weight="w")
+            return self.sparse_engine.get_paths(hosts)
+        return self.path_cache.get_paths(hosts)
 
     def find_shortest_path(
         self,
@@ -69,18 +476,61 @@ class NetworkTopology(object):
         throughs: set = None,
         blocks: set = None,
         cutoff: int = None,
+        *,
+        ordered: bool = False,
     ):
-        throughs = set(throughs if throughs is not None else [])
-        blocks = set(blocks if blocks is not None else [])
-        for path in nxpath.shortest_simple_paths(self.graph, src, dest, weight="w"):
-            if blocks.intersection(path):
-                continue
-            if throughs.difference(path):
+        """
+        Shortest path through all `throughs` [in the given order if `ordered`], avoiding `blocks`, not longer than `cutoff`.
+        Return (length, path) or (None, None).
+        """
+        cached = src in self.graph and dest in self.graph
+        if cached and not throughs and not blocks and cutoff is None:
+            return self.path_cache.get_path(src, dest)
+        return constrained_shortest_path(
+            self.graph, src, dest, throughs, blocks, cutoff, ordered=ordered, weight="w"
+        )
+
+    def get_destination_trees(self, hosts: list[str] = None) -> dict[str, dict]:
+        """
+        Shortest-path tree toward each destination host [Default: all hosts]: each switch forwards
+        to its parent in the tree, so routes to one destination never loop.
+        Return {destination name: {switch name: next hop name}}.
+        """
+        if hosts is None:
+            hosts = [n for n in self.graph.nodes if n.startswith(("H", "h"))]
+        ret = {}
+        for dest in hosts:
+            paths = self.path_cache.get_tree_paths(dest)  # from dest, read backward
+            ret[dest] = {
+                node: path[-2]
+                for node, path in paths.items()
+                if len(path) > 1 and not node.startswith(("H", "h"))
+            }
+        return ret
+
+    def get_ecmp_next_hops(self, src: str, dest: str) -> dict[str, list[str]]:
+        """
+        All equal-cost shortest paths from `src` to `dest`, as the next hops toward `dest` of each node on them.
+        Return {node name: [next hop names]}, empty if not connected.
+        """
+        if src not in self.graph or dest not in self.graph:
+            return {}
+        from_src = self.path_cache.get_distances(src)
+        to_dest = self.path_cache.get_distances(dest)
+        if dest not in from_src:
+            return {}
+        length = from_src[dest]
+        ret = {}
+        for node, dist in from_src.items():
+            if node == dest or abs(dist + to_dest[node] - length) > 1e-9:
                 continue
-            if cutoff and nxfunc.path_weight(self.graph, path, weight="w") > cutoff:
-                break
-            return nxfunc.path_weight(self.graph, path, weight="w"), path
-        return None, None
+            ret[node] = [
+                peer
+                for peer, attrs in self.graph[node].items()
+                if peer in to_dest
+                and abs(dist + attrs["w"] + to_dest[peer] - length) <= 1e-9
+            ]
+        return ret
 
     def is_valid_path(self, *path) -> bool:
         return nxfunc.is_path(self.graph, path)
@@ -97,10 +547,9 @@ class NetworkTopology(object):
             id = nd["id"]
             ret[id] = Switch(nd)
 
-        for link in topology.get("link", {}):
-            # id = link['link-id']
-            src_id, src_port = link["source"].values()
-            dest_id, dest_port = link["destination"].values()
+        for src_id, src_port, dest_id, dest_port in NetworkTopology._extract_links(
+            topology
+        ):
             ret[src_id].set_peer(src_port, ret[dest_id], dest_port)
             ret[dest_id].set_peer(dest_port, ret[src_id], src_port)
         return ret
@@ -114,10 +563,10 @@ class NetworkTopology(object):
         table = node.tables.get(table_id, None)
         if table is None:
             return node
-        flows = table.flows
-        if flow_id is None or flow_id not in flows:
+        flow = table.get_flow(flow_id) if flow_id is not None else None
+        if flow is None:
             return table
-        return flows[flow_id]
+        return flow
 
     def get_objects(
         self,
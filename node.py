@@ -1,4 +1,5 @@
 from flow import Table
+from abc import ABC, abstractmethod
 
 
 class Port(object):
@@ -35,7 +36,7 @@ def parse_port_list(ports: dict[Port] | list[Port]) -> str:
     return ret
 
 
-class Node(object):
+class Node(ABC):
     def __init__(
         self,
         id: str,
@@ -51,17 +52,92 @@ class Node(object):
         self.ip = ip
         self.ports = ports
         self.data = data
+        self.peer_ports = {}  # peer node id -> ports connected to that peer
+
+    def _index_peer(self, port: Port):
+        if port.peer is not None:
+            self.peer_ports.setdefault(port.peer.owner.id, []).append(port)
+
+    def _unindex_peer(self, port: Port):
+        if port.peer is None:
+            return
+        peer_id = port.peer.owner.id
+        ports = self.peer_ports.get(peer_id, [])
+        if port in ports:
+            ports.remove(port)
+        if not ports:
+            self.peer_ports.pop(peer_id, None)
 
     def set_peer(self, at_port_id: str, peer_node: "Node", peer_port_id: str):
         if self.ports is not None:
-            self.ports[at_port_id].peer = peer_node.ports[peer_port_id]
+            port = self.ports[at_port_id]
+            self._unindex_peer(port)
+            port.peer = peer_node.ports[peer_port_id]
+            self._index_peer(port)
+
+    def clear_peer(self, at_port_id: str):
+        if self.ports is not None and at_port_id in self.ports:
+            port = self.ports[at_port_id]
+            self._unindex_peer(port)
+            port.peer = None
+
+    def _update_port(self, port: Port, new_port: Port) -> bool:
+        """
+        Copy live details of `new_port` into `port`, keep its peer. Return True if its state changed.
+        """
+        changed = port.state != new_port.state
+        port.name = new_port.name
+        port.port_number = new_port.port_number
+        port.mac = new_port.mac
+        port.state = new_port.state
+        port.statistics = new_port.statistics
+        return changed
+
+    def _remove_port(self, port_id: str):
+        port = self.ports.pop(port_id)
+        if port.peer is not None and port.peer.peer is port:
+            port.peer.owner.clear_peer(port.peer.id)
+        self._unindex_peer(port)
+        port.peer = None
+
+    def update(self, data: dict) -> dict[str, list]:
+        """
+        Update this node in place from its new raw `data`, keep ports' peers.
+        Return ports changes: {"added": [port_id], "removed": [port_id], "changed": [(port_id, old_state, new_state)]}
+        """
+        new_ports = self._parse_ports(data)
+        ret = {"added": [], "removed": [], "changed": []}
+        for port_id in [pid for pid in self.ports if pid not in new_ports]:
+            self._remove_port(port_id)
+            ret["removed"].append(port_id)
+        for port_id, new_port in new_ports.items():
+            port = self.ports.get(port_id, None)
+            if port is None:
+                new_port.owner = self
+                self.ports[port_id] = new_port
+                ret["added"].append(port_id)
+                continue
+            old_state = port.state
+            if self._update_port(port, new_port):
+                ret["changed"].append((port_id, old_state, port.state))
+        self.data = data
+        return ret
+
+    @abstractmethod
+    def _parse_ports(self, data: dict) -> dict[str, Port]:
+        """
+        Ports of this node in its raw `data`, by port id. Used by `update`.
+        """
 
     def get_port_for_peer(self, peer_id: str) -> Port:
-        # print("find port with peer", peer_id)
-        for port in self.ports.values():
-            if port.peer is not None and port.peer.owner.id == peer_id:
-                return port
-        return None
+        ports = self.peer_ports.get(peer_id, None)
+        return ports[0] if ports else None
+
+    def get_ports_for_peer(self, peer_id: str) -> list[Port]:
+        """
+        All ports connected to the peer node, more than one for multi-link peers.
+        """
+        return list(self.peer_ports.get(peer_id, []))
 
     @property
     def peers(self):
@@ -91,23 +167,35 @@ class Host(Node):
         if len(addrs) > 1:
             print("WARNING: Host connected many ports:", addrs)
 
-        name = f"h{id[-2:]}"
         ip = addrs[0]["ip"]
         self.mac = addrs[0]["mac"]
+        index = int(self.mac.replace(":", ""), 16)
+        # sequential MACs [Mininet `--mac`] keep their index, so more than 255 hosts get unique names
+        name = f"h{index:02x}" if index < 1 << 16 else f"h{id[-2:]}"
+        super().__init__(id, "host", name, ip, None, data)
+        self.ports = self._parse_ports(data)
+
+    def update(self, data: dict) -> dict[str, list]:
+        # addresses move with the host [DHCP, re-attached host], its name and id stay
+        addrs = data["host-tracker-service:addresses"]
+        self.ip = addrs[0]["ip"]
+        self.mac = addrs[0]["mac"]
+        return super().update(data)
+
+    def _parse_ports(self, data: dict) -> dict[str, Port]:
         port_id = data["termination-point"][0]["tp-id"]
         is_active = data["host-tracker-service:attachment-points"][0]["active"]
-        ports = {
+        return {
             port_id: Port(
                 self,
                 port_id,
-                f"{name}:unk",
+                f"{self.name}:unk",
                 0,
                 self.mac,
                 ("active" if is_active else "inactive"),
                 None,
             )
         }
-        super().__init__(id, "host", name, ip, ports, data)
 
 
 class Switch(Node):
@@ -118,11 +206,19 @@ class Switch(Node):
         name = data["flow-node-inventory:description"]
         ip = data["flow-node-inventory:ip-address"]
 
+        super().__init__(id, "switch", name, ip, None, data)
+        self.ports = self._parse_ports(data)
+        self._tables = None  # parsed on first access, until next update
+
+    def update(self, data: dict) -> dict[str, list]:
+        self._tables = None
+        return super().update(data)
+
+    def _parse_ports(self, data: dict) -> dict[str, Port]:
         ports = {}
         for conn in data["node-connector"]:
             ports[conn["id"]] = self._parse_port(conn)
-
-        super().__init__(id, "switch", name, ip, ports, data)
+        return ports
 
     def _parse_port(self, data: dict):
         id = data.get("id", None)
@@ -140,17 +236,14 @@ class Switch(Node):
 
     @property
     def active_tables(self) -> dict[str, Table]:
-        raw_table = self.data.get("flow-node-inventory:table", [])
-        ret = {}
-        for item in raw_table:
-            if "flow" in item:
-                ret[item["id"]] = Table(item)
-        return ret
+        return {id: table for id, table in self.tables.items() if "flow" in table.data}
 
     @property
     def tables(self) -> dict[str, Table]:
-        raw_table = self.data.get("flow-node-inventory:table", [])
-        ret = {}
-        for item in raw_table:
-            ret[item["id"]] = Table(item)
-        return ret
+        if self._tables is None:
+            raw_table = self.data.get("flow-node-inventory:table", [])
+            ret = {}
+            for item in raw_table:
+                ret[item["id"]] = Table(item)
+            self._tables = ret
+        return self._tables
@@ -0,0 +1,318 @@
+import itertools
+import heapq
+import networkx as nx
+
+# Unordered waypoints up to this number are solved exactly by checking visiting orders,
+# more than that use the nearest-neighbour order.
+MAX_EXACT_WAYPOINTS = 7
+# Maximum number of visiting orders tried for building a simple path.
+MAX_TRIED_ORDERS = 64
+
+INFINITY = float("inf")
+
+
+def _dijkstra(graph, src: str, dest: str, cutoff=None, weight: str = "w", avoid=None):
+    """
+    Shortest path from `src` to `dest` [bidirectional]. Nodes in `avoid` are hidden by the weight function,
+    the graph is neither copied nor filtered.
+    """
+    if avoid:
+        weight = lambda u, v, data, key=weight: None if v in avoid else data.get(key, 1)
+    try:
+        length, path = nx.bidirectional_dijkstra(graph, src, dest, weight=weight)
+    except nx.NetworkXNoPath:
+        return None, None
+    if cutoff is not None and length > cutoff:
+        return None, None
+    return length, path
+
+
+def _find_conflict(segments: list) -> tuple:
+    """
+    First node inside two segments, as (node, first segment index, second segment index), or None.
+    """
+    owners = {}
+    for ind, segment in enumerate(segments):
+        for node in segment[1:-1]:
+            if node in owners:
+                return node, owners[node], ind
+            owners[node] = ind
+    return None
+
+
+def _resolve_conflicts(
+    graph,
+    terminals: list,
+    best=None,
+    cutoff=None,
+    weight: str = "w",
+    blocks: set = frozenset(),
+    segments: dict = None,
+):
+    """
+    Shortest simple path through `terminals` in order, strictly shorter than `best` and not longer than `cutoff`.
+    Each segment is a shortest path between consecutive terminals avoiding the other terminals. While two
+    segments share a node, branch: one branch makes the first segment avoid the node, the other the second one.
+    Branches are searched by total length, which never decreases down a branch, so the first one without
+    conflict is the shortest path. Return (length, path), or (None, None) if none.
+    - blocks: Nodes no segment goes through.
+    - segments: Shortest paths (length, path) by pair of terminals, first segments are taken from them if they can.
+    """
+    known = segments or {}
+
+    def solve(ind: int, avoid: frozenset, budget):
+        src, dest = terminals[ind], terminals[ind + 1]
+        others = avoid.union(terminals[:ind], terminals[ind + 2 :])
+        if not avoid and (src, dest) in known:
+            length, path = known[(src, dest)]
+            if path is None or others.isdisjoint(path):
+                return length, path
+        return _dijkstra(graph, src, dest, budget, weight, others.union(blocks))
+
+    def over(total):
+        return (best is not None and total >= best) or (
+            cutoff is not None and total > cutoff
+        )
+
+    avoids = tuple(frozenset() for _ in range(len(terminals) - 1))
+    lengths, segments = [], []
+    for ind, avoid in enumerate(avoids):
+        length, segment = solve(ind, avoid, cutoff)
+        if segment is None:
+            return None, None
+        lengths.append(length)
+        segments.append(segment)
+    if over(sum(lengths)):
+        return None, None
+
+    heap = [(sum(lengths), 0, avoids, lengths, segments)]
+    seen, count = {avoids}, 1
+    while heap:
+        total, _, avoids, lengths, segments = heapq.heappop(heap)
+        conflict = _find_conflict(segments)
+        if conflict is None:
+            path = [terminals[0]]
+            for segment in segments:
+                path.extend(segment[1:])
+            return total, path
+        node, *inds = conflict
+        for ind in inds:
+            branch = avoids[:ind] + (avoids[ind] | {node},) + avoids[ind + 1 :]
+            if branch in seen:
+                continue
+            seen.add(branch)
+            rest = total - lengths[ind]
+            budget = None if cutoff is None else cutoff - rest
+            length, segment = solve(ind, branch[ind], budget)
+            if segment is None or over(rest + length):
+                continue
+            heapq.heappush(
+                heap,
+                (
+                    rest + length,
+                    count,
+                    branch,
+                    lengths[:ind] + [length] + lengths[ind + 1 :],
+                    segments[:ind] + [segment] + segments[ind + 1 :],
+                ),
+            )
+            count += 1
+    return None, None
+
+
+def _lower_bound(distances: dict, terminals: list):
+    """
+    Sum of unconstrained distances between consecutive `terminals`.
+    """
+    return sum(
+        distances[terminals[i - 1]].get(terminals[i], INFINITY)
+        for i in range(1, len(terminals))
+    )
+
+
+def _visiting_orders(distances: dict, src: str, dest: str, waypoints: list):
+    """
+    Visiting orders of `waypoints` with their lower-bound lengths, shortest first.
+    """
+    if len(waypoints) <= MAX_EXACT_WAYPOINTS:
+        orders = [
+            (_lower_bound(distances, [src, *order, dest]), order)
+            for order in itertools.permutations(waypoints)
+        ]
+        orders.sort(key=lambda x: x[0])
+        return orders[:MAX_TRIED_ORDERS]
+
+    # nearest neighbour
+    order, current, remains = [], src, set(waypoints)
+    while remains:
+        current = min(remains, key=lambda w: distances[current].get(w, INFINITY))
+        order.append(current)
+        remains.remove(current)
+    return [(_lower_bound(distances, [src, *order, dest]), tuple(order))]
+
+
+def constrained_shortest_path(
+    graph: nx.Graph,
+    src: str,
+    dest: str,
+    throughs=None,
+    blocks=None,
+    cutoff=None,
+    *,
+    ordered: bool = False,
+    weight: str = "w",
+) -> tuple[int, list]:
+    """
+    Find the shortest simple path from `src` to `dest`:
+    - throughs: Nodes the path must go through. In the given order if `ordered`, else in any order.
+    - blocks: Nodes the path must NOT go through. Removed from the graph before searching.
+    - cutoff: Maximum length of the path.
+
+    Blocked nodes are hidden from all searches, then shortest paths are found between each pair of waypoints.
+    For unordered waypoints, visiting orders are tried from the smallest lower bound, until no order can beat the best found.
+    Each order is solved exactly by `_resolve_conflicts`: segments are taken from the pairs, and only segments sharing
+    nodes are searched again.
+    Return (length, path), or (None, None) if not found.
+    """
+    blocks = set(blocks if blocks is not None else [])
+    waypoints = []
+    for node in throughs if throughs is not None else []:
+        if node not in waypoints and node not in [src, dest]:
+            waypoints.append(node)
+    if src in blocks or dest in blocks or blocks.intersection(waypoints):
+        return None, None
+    for node in [src, dest, *waypoints]:
+        if node not in graph:
+            raise nx.NodeNotFound(f"Node {node} not in graph.")
+
+    if not waypoints:
+        return _dijkstra(graph, src, dest, cutoff, weight, blocks)
+
+    # (node, node) -> (length, path), both ways [undirected]
+    segments = {}
+    distances = {node: {} for node in [src, *waypoints, dest]}
+    for first, second in itertools.combinations([src, *waypoints, dest], 2):
+        if (first, second) == (src, dest):
+            continue
+        length, path = _dijkstra(graph, first, second, cutoff, weight, blocks)
+        segments[(first, second)] = (length, path)
+        segments[(second, first)] = (length, None if path is None else path[::-1])
+        if path is not None:
+            distances[first][second] = distances[second][first] = length
+    if ordered:
+        terminals = [src, *waypoints, dest]
+        orders = [(_lower_bound(distances, terminals), tuple(waypoints))]
+    else:
+        orders = _visiting_orders(distances, src, dest, waypoints)
+
+    best_length, best_path = None, None
+    for bound, order in orders:
+        if bound == INFINITY or (best_length is not None and bound >= best_length):
+            break
+        if cutoff is not None and bound > cutoff:
+            break
+        length, path = _resolve_conflicts(
+            graph,
+            [src, *order, dest],
+            best_length,
+            cutoff,
+            weight,
+            blocks,
+            segments,
+        )
+        if path is not None:
+            best_length, best_path = length, path
+    return best_length, best_path
+
+
+class PathCache(object):
+    """
+    Shortest paths by (source, destination), from single-source Dijkstra trees computed on demand for asked sources only.
+    When an edge weight changes, only trees that use the edge [weight increased] or could get shorter through it
+    [weight decreased] are dropped. Edge added/removed is a decrease from/increase to infinity.
+    """
+
+    def __init__(self, graph: nx.Graph, weight: str = "w") -> None:
+        self.graph = graph
+        self.weight = weight
+        self.trees = {}  # source -> (distances, paths)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _get_tree(self, src: str) -> tuple[dict, dict]:
+        tree = self.trees.get(src, None)
+        if tree is None:
+            self.misses += 1
+            tree = nx.single_source_dijkstra(self.graph, src, weight=self.weight)
+            self.trees[src] = tree
+        else:
+            self.hits += 1
+        return tree
+
+    def get_distances(self, src: str) -> dict:
+        """
+        Shortest distances from `src` to all connected nodes.
+        """
+        return self._get_tree(src)[0]
+
+    def get_tree_paths(self, src: str) -> dict[str, list]:
+        """
+        Shortest paths from `src` to all connected nodes, all in one tree.
+        """
+        return self._get_tree(src)[1]
+
+    def get_path(self, src: str, dest: str) -> tuple[int, list]:
+        """
+        Return (length, path), or (None, None) if not connected.
+        """
+        if (
+            src not in self.trees and dest in self.trees
+        ):  # undirected, reuse the other way
+            distances, paths = self._get_tree(dest)
+            if src not in paths:
+                return None, None
+            return distances[src], paths[src][::-1]
+        distances, paths = self._get_tree(src)
+        if dest not in paths:
+            return None, None
+        return distances[dest], paths[dest]
+
+    def get_paths(self, nodes: list[str]) -> dict[tuple, list]:
+        """
+        Shortest paths between each pair of `nodes`, one direction per pair.
+        """
+        ret = {}
+        for ind, src in enumerate(nodes):
+            if ind == len(nodes) - 1:
+                break  # all pairs with the last node are already found
+            _, paths = self._get_tree(src)
+            for dest in nodes:
+                if dest != src and dest in paths and (dest, src) not in ret:
+                    ret[(src, dest)] = paths[dest]
+        return ret
+
+    def update_edge(self, u: str, v: str, old_weight=None, new_weight=None):
+        """
+        Drop trees affected by edge (u, v) changing weight from `old_weight` to `new_weight`. None means no edge.
+        """
+        inf = float("inf")
+        old_weight = inf if old_weight is None else old_weight
+        new_weight = inf if new_weight is None else new_weight
+        if old_weight == new_weight:
+            return
+        for src, (distances, paths) in list(self.trees.items()):
+            in_tree = (v in paths and paths[v][-2:] == [u, v]) or (
+                u in paths and paths[u][-2:] == [v, u]
+            )
+            if new_weight < old_weight:
+                du, dv = distances.get(u, inf), distances.get(v, inf)
+                affected = in_tree or du + new_weight < dv or dv + new_weight < du
+            else:
+                affected = in_tree
+            if affected:
+                del self.trees[src]
+                self.invalidations += 1
+
+    def clear(self):
+        self.trees.clear()
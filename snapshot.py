@@ -0,0 +1,130 @@
+import threading
+import pickle
+import gzip
+import json
+
+SNAPSHOT_OFF = "off"
+SNAPSHOT_ON_DEMAND = "demand"
+SNAPSHOT_BACKGROUND = "background"
+
+FORMAT_JSON = "json"
+FORMAT_GZIP = "gzip"
+FORMAT_PICKLE = "pickle"
+
+
+def _get_format(path: str, format: str = None) -> str:
+    if format is not None:
+        return format
+    if path.endswith(".gz"):
+        return FORMAT_GZIP
+    if path.endswith((".pkl", ".pickle")):
+        return FORMAT_PICKLE
+    return FORMAT_JSON
+
+
+def save_snapshot(path: str, topology: dict, switches: list, format: str = None):
+    """
+    Write raw topology and inventory into one file.
+    Format is from `format` or the file extension: `.gz` [gzip JSON], `.pkl`/`.pickle` [binary], other [JSON].
+    """
+    data = {"topology": topology, "nodes": switches}
+    format = _get_format(path, format)
+    if format == FORMAT_PICKLE:
+        with open(path, "wb") as file:
+            pickle.dump(data, file, protocol=pickle.HIGHEST_PROTOCOL)
+    elif format == FORMAT_GZIP:
+        with gzip.open(path, "wt", encoding="utf-8", compresslevel=1) as file:
+            json.dump(data, file, separators=(",", ":"))
+    elif format == FORMAT_JSON:
+        with open(path, "w") as file:
+            json.dump(data, file, separators=(",", ":"))
+    else:
+        raise Exception(
+            f"Snapshot format {format} not found. Used predefined values only."
+        )
+
+
+def load_snapshot(
+    path: str, nodes_path: str = None, format: str = None
+) -> tuple[dict, list]:
+    """
+    Read raw topology and inventory saved by `save_snapshot`.
+    Set `nodes_path` to read the old pair of files instead: `path` for topology [topology.json], `nodes_path` for inventory [nodes.json].
+    """
+    if nodes_path is not None:
+        with open(path, "r") as file:
+            topology = json.load(file)
+        with open(nodes_path, "r") as file:
+            switches = json.load(file)
+        return topology, switches
+
+    format = _get_format(path, format)
+    if format == FORMAT_PICKLE:
+        with open(path, "rb") as file:
+            data = pickle.load(file)
+    elif format == FORMAT_GZIP:
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            data = json.load(file)
+    else:
+        with open(path, "r") as file:
+            data = json.load(file)
+    return data["topology"], data["nodes"]
+
+
+class Snapshotter(object):
+    """
+    Keep the raw data of the last refresh and write it to `path` depending on `mode`:
+    - "off": Never write.
+    - "demand": Write only when `save` is called.
+    - "background": Write after each refresh in a background thread. Refreshes arriving while writing are merged, only the latest is written.
+    """
+
+    def __init__(
+        self,
+        mode: str = SNAPSHOT_ON_DEMAND,
+        path: str = "snapshot.json.gz",
+        format: str = None,
+    ) -> None:
+        if mode not in [SNAPSHOT_OFF, SNAPSHOT_ON_DEMAND, SNAPSHOT_BACKGROUND]:
+            raise Exception(
+                f"Snapshot mode {mode} not found. Used predefined values only."
+            )
+        self.mode = mode
+        self.path = path
+        self.format = format
+        self._latest = None
+        self._lock = threading.Lock()
+        self._pending = threading.Event()
+        self._worker = None
+        if mode == SNAPSHOT_BACKGROUND:
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+
+    def update(self, topology: dict, switches: list):
+        if self.mode == SNAPSHOT_OFF:
+            return
+        with self._lock:
+            self._latest = (topology, switches)
+        if self.mode == SNAPSHOT_BACKGROUND:
+            self._pending.set()
+
+    def save(self, path: str = None, format: str = None) -> str:
+        """
+        Write the latest data now. Return the written path.
+        """
+        with self._lock:
+            latest = self._latest
+        if latest is None:
+            raise Exception("NO SNAPSHOT: refresh topology first or enable snapshot")
+        path = self.path if path is None else path
+        save_snapshot(path, *latest, format=self.format if format is None else format)
+        return path
+
+    def _run(self):
+        while True:
+            self._pending.wait()
+            self._pending.clear()
+            try:
+                self.save()
+            except Exception as ex:
+                print(f":: fail to save snapshot to {self.path}: {ex}")
@@ -0,0 +1,99 @@
+import networkx as nx
+
+try:
+    import numpy as np
+    from scipy.sparse import csr_array
+    from scipy.sparse.csgraph import dijkstra
+except ImportError:  # optional engine
+    np = None
+
+NO_PREDECESSOR = -9999
+
+
+class SparsePathEngine(object):
+    """
+    Shortest paths on a CSR matrix of the weighted graph, computed by `scipy.sparse.csgraph`.
+    Nodes are indexed by sorted names, so the same graph always has the same mapping.
+    Distances and predecessors are computed for many sources at once and kept until the engine is dropped
+    [`NetworkTopology` drops it when the graph changes], paths are rebuilt on demand.
+    Requires [numpy](https://numpy.org/) and [scipy](https://scipy.org/).
+    """
+
+    def __init__(self, graph: nx.Graph, weight: str = "w") -> None:
+        if np is None:
+            raise Exception("SparsePathEngine requires packages: numpy, scipy")
+        self.nodes = sorted(graph.nodes)
+        self.index = {node: ind for ind, node in enumerate(self.nodes)}
+        size = len(self.nodes)
+        rows = np.empty(graph.number_of_edges() * 2, dtype=np.int32)
+        cols = np.empty_like(rows)
+        data = np.empty(len(rows), dtype=np.float64)
+        for ind, (u, v, w) in enumerate(graph.edges.data(weight, default=1)):
+            rows[2 * ind], cols[2 * ind] = self.index[u], self.index[v]
+            rows[2 * ind + 1], cols[2 * ind + 1] = self.index[v], self.index[u]
+            data[2 * ind] = data[2 * ind + 1] = w
+        self.matrix = csr_array((data, (rows, cols)), shape=(size, size))
+        self.sources = {}  # source node -> row in distances/predecessors
+        self.distances = None
+        self.predecessors = None
+
+    def compute(self, sources: list[str] = None):
+        """
+        Compute distances and predecessors from `sources` [Default: all nodes] in one call.
+        Rows already computed are kept, only missing sources are computed and appended.
+        """
+        if sources is None:
+            sources = self.nodes
+        missing = list(dict.fromkeys(n for n in sources if n not in self.sources))
+        if not missing:
+            return self
+        indices = np.array([self.index[node] for node in missing], dtype=np.int32)
+        distances, predecessors = dijkstra(
+            self.matrix, directed=False, indices=indices, return_predecessors=True
+        )
+        if self.distances is None:
+            self.distances, self.predecessors = distances, predecessors
+        else:
+            self.distances = np.vstack([self.distances, distances])
+            self.predecessors = np.vstack([self.predecessors, predecessors])
+        first = len(self.sources)
+        self.sources.update({node: first + row for row, node in enumerate(missing)})
+        return self
+
+    def get_path(self, src: str, dest: str) -> tuple[float, list]:
+        """
+        Return (length, path) from the computed predecessors, or (None, None) if not connected.
+        """
+        if src not in self.sources:
+            if dest in self.sources:  # undirected, rebuild the other way
+                length, path = self.get_path(dest, src)
+                return length, (None if path is None else path[::-1])
+            self.compute([src])
+        row = self.sources[src]
+        dest_ind = self.index[dest]
+        length = self.distances[row, dest_ind]
+        if np.isinf(length):
+            return None, None
+        predecessors = self.predecessors[row]
+        path, ind = [dest_ind], dest_ind
+        while predecessors[ind] != NO_PREDECESSOR:
+            ind = predecessors[ind]
+            path.append(ind)
+        return length, [self.nodes[i] for i in reversed(path)]
+
+    def get_paths(self, nodes: list[str]) -> dict[tuple, list]:
+        """
+        Shortest paths between each pair of `nodes`, one direction per pair. Same output as `PathCache.get_paths`.
+        """
+        ret = {}
+        if len(nodes) < 2:
+            return ret
+        self.compute(nodes[:-1])
+        for ind, src in enumerate(nodes[:-1]):
+            for dest in nodes[ind + 1 :]:
+                if dest == src:
+                    continue
+                _, path = self.get_path(src, dest)
+                if path is not None:
+                    ret[(src, dest)] = path
+        return ret
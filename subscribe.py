@@ -0,0 +1,227 @@
+from nettopo import NetworkTopology, TopologyDiff
+from netconfig import NetworkConfig
+import threading
+import socket
+import os
+import json
+import time
+
+# Subtrees the controller reports changes of: links and hosts, then switches and their ports
+STREAM_PATHS = ("/network-topology:network-topology", "/opendaylight-inventory:nodes")
+
+
+class TopologySubscriber(object):
+    """
+    Keep the topology up to date from controller data change notifications, instead of polling `refresh`:
+    - Subscribes to data change events on network-topology and inventory [operational datastore], one
+    Server-Sent Events stream each, read in background threads.
+    - Each notification is applied in place by `NetworkTopology.apply_events`, so only the changed nodes,
+    ports and graph edges are touched, and nothing is downloaded.
+    - Removed links move the installed paths and destination routes crossing them at once, if `config` is set.
+    - A broken stream is subscribed again after `retry` seconds, followed by one `refresh` to catch missed changes.
+    An event that cannot be applied is skipped, the stream goes on.
+    Notifications are applied holding `topology.lock`, shared with shell commands, `AdaptiveWeights` and `PathDaemon`.
+    """
+
+    def __init__(
+        self,
+        topology: NetworkTopology,
+        config: NetworkConfig = None,
+        *,
+        retry: float = 1.0,
+        paths: tuple[str] = STREAM_PATHS,
+    ) -> None:
+        self.topology = topology
+        self.config = config
+        self.retry = retry
+        self.paths = paths
+        self.counters = {"notifications": 0, "events": 0, "skipped": 0, "rerouted": 0}
+        self.last_error = None
+        self._stop = threading.Event()
+        self._streams = {}  # path -> open stream response
+        self._workers = []
+
+    def subscribe(self, path: str) -> str:
+        """
+        Create the stream of `path` on the controller. Return its location.
+        """
+        location = self.topology.connector.create_stream(path)
+        if location.startswith(("ws://", "wss://")):
+            raise Exception(
+                f"WEBSOCKET STREAM: {location}, enable Server-Sent Events on the controller [use-sse]"
+            )
+        return location
+
+    ############################## Events ##############################
+
+    def handle(self, notification: dict) -> TopologyDiff:
+        """
+        Apply one notification: {"notification": {"eventTime", "data-changed-notification": {"data-change-event": [...]}}}.
+        Return the topology changes.
+        """
+        body = notification.get("notification", notification)
+        events = []
+        for key, value in body.items():
+            if key.endswith("data-changed-notification"):
+                events = value.get("data-change-event", [])
+                break
+        if isinstance(events, dict):
+            events = [events]
+        diff = TopologyDiff()
+        with self.topology.lock:
+            start = time.perf_counter()
+            for event in events:
+                try:
+                    diff.extend(self.topology.apply_events([event]))
+                except Exception as ex:
+                    self.last_error = ex
+                    self.counters["skipped"] += 1
+                    print(f":: subscribe: skip event {event.get('path', None)}: {ex}")
+            self.counters["notifications"] += 1
+            self.counters["events"] += len(events)
+            if diff.is_empty():
+                return diff
+            moved = self.reroute(diff.removed_links) if diff.removed_links else []
+            self.counters["rerouted"] += len(moved)
+            print(
+                f":: subscribe: {diff}, {len(moved)} routes moved in {time.perf_counter() - start:.3f}s"
+            )
+        return diff
+
+    def reroute(self, links: list[tuple]) -> list:
+        """
+        Move installed paths and destination routes crossing removed `links` [(src id, src port, dest id, dest port)]
+        to their new shortest paths. Return moved paths (source, destination) and destinations.
+        """
+        if self.config is None:
+            return []
+        topology = self.topology
+        down = {frozenset([link[0], link[2]]) for link in links}
+        moved = []
+        for (src, dest), info in list(self.config.installed_paths.items()):
+            ids = [topology.mappings_node_id_name.get(src, None), *info["switches"]]
+            ids.append(topology.mappings_node_id_name.get(dest, None))
+            if not {frozenset(hop) for hop in zip(ids, ids[1:])} & down:
+                continue
+            _, path = topology.find_shortest_path(src, dest)
+            if path is None:
+                print(f":: subscribe: no path left for {src} -> {dest}")
+                continue
+            try:
+                self.config.set_path(
+                    *topology.get_node_from_names(*path),
+                    table=info["table"],
+                    priority=info["priority"],
+                    update=True,
+                )
+                moved.append((src, dest))
+            except Exception as ex:
+                print(f":: subscribe: {src} -> {dest}: {ex}")
+
+        ends = set().union(*down)
+        # (table, priority) -> destinations with a switch on a removed link
+        by_table = {}
+        for dest, info in self.config.installed_destinations.items():
+            if ends & set(info["switches"]):
+                by_table.setdefault((info["table"], info["priority"]), []).append(dest)
+        for (table, priority), dests in by_table.items():
+            try:
+                trees = {
+                    topology.get_node_from_names(dest)[0]: dict(
+                        zip(
+                            topology.get_node_from_names(*next_hops.keys()),
+                            topology.get_node_from_names(*next_hops.values()),
+                        )
+                    )
+                    for dest, next_hops in topology.get_destination_trees(dests).items()
+                }
+                failures = self.config.set_destination_routes(
+                    trees, table=table, priority=priority
+                )
+                moved.extend(d for d in dests if d not in failures)
+            except Exception as ex:
+                print(f":: subscribe: routes in table {table}: {ex}")
+        return moved
+
+    ############################## Streams ##############################
+
+    @property
+    def running(self) -> bool:
+        return any(worker.is_alive() for worker in self._workers)
+
+    def start(self):
+        """
+        Subscribe to all paths and read their streams in background. Return when the streams are open,
+        no change is missed from then. Subscription errors are raised here.
+        """
+        if self.running:
+            return
+        self._stop.clear()
+        responses = {path: self._open(path) for path in self.paths}
+        self._workers = [
+            threading.Thread(target=self._run, args=(path, response), daemon=True)
+            for path, response in responses.items()
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def stop(self):
+        self._stop.set()
+        for response in list(self._streams.values()):
+            # closing the response does not wake a blocked read, shutting its socket down does
+            try:
+                with socket.socket(fileno=os.dup(response.raw.fileno())) as sock:
+                    sock.shutdown(socket.SHUT_RDWR)
+            except (OSError, ValueError):
+                pass  # already closed
+        for worker in self._workers:
+            worker.join()
+        self._workers = []
+
+    def _open(self, path: str):
+        response = self.topology.connector.open_stream(self.subscribe(path))
+        self._streams[path] = response
+        return response
+
+    def _run(self, path: str, response):
+        while not self._stop.is_set():
+            try:
+                if response is None:
+                    response = self._open(path)
+                    self.topology.refresh()  # changes missed while disconnected
+                    self.last_error = None
+                self._read(path, response)
+                if not self._stop.is_set():
+                    raise Exception(f"STREAM CLOSED: {path}")
+            except Exception as ex:
+                if self._stop.is_set():
+                    break
+                self.last_error = ex
+                print(f":: subscribe: {ex}")
+                response = None
+                self._stop.wait(self.retry)
+
+    def _read(self, path: str, response):
+        try:
+            data, pending = [], b""
+            while not self._stop.is_set():
+                chunk = response.raw.read1()  # as it arrives, not a full buffer
+                if not chunk:
+                    return
+                *lines, pending = (pending + chunk).split(b"\n")
+                for line in lines:
+                    line = line.decode().rstrip("\r")
+                    if line.startswith("data:"):
+                        data.append(line[5:].strip())
+                    elif not line and data:  # blank line ends an event
+                        try:
+                            notification = json.loads("\n".join(data))
+                        except ValueError as ex:
+                            notification = None
+                            print(f":: subscribe: skip notification: {ex}")
+                        if notification is not None:
+                            self.handle(notification)
+                        data = []
+        finally:
+            self._streams.pop(path, None)
+            response.close()
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mockodl import MockOpenDaylight
+from topogen import fat_tree
+from nettopo import NetworkTopology
+from netconfig import NetworkConfig
+from connector import AsyncConnector
+import pytest
+
+
+@pytest.fixture
+def mock():
+    m = MockOpenDaylight(*fat_tree(4).to_odl()).start()
+    yield m
+    m.stop()
+
+
+@pytest.fixture
+def connector(mock):
+    return mock.create_connector(
+        auth=("admin", "admin"), content_type="application/json", verbose=False
+    )
+
+
+@pytest.fixture
+def topology(connector):
+    return NetworkTopology(connector)
+
+
+@pytest.fixture
+def config(connector):
+    return NetworkConfig(connector, AsyncConnector(connector))
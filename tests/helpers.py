@@ -0,0 +1,30 @@
+def writes(mock) -> int:
+    return sum(mock.requests.get(m, 0) for m in ["PUT", "POST", "DELETE"])
+
+
+def hosts(topology) -> list[str]:
+    return sorted(n.name for n in topology.nodes.values() if n.type == "host")
+
+
+def install_all_paths(topology, config):
+    config.set_paths(
+        {
+            key: topology.get_node_from_names(*path)
+            for key, path in topology.get_hosts_shortest_path().items()
+        }
+    )
+    topology.refresh()  # flow tables are read from the operational datastore
+
+
+def install_all_routes(topology, config):
+    trees = {
+        topology.get_node_from_names(dest)[0]: dict(
+            zip(
+                topology.get_node_from_names(*next_hops.keys()),
+                topology.get_node_from_names(*next_hops.values()),
+            )
+        )
+        for dest, next_hops in topology.get_destination_trees().items()
+    }
+    config.set_destination_routes(trees, replace=True)
+    topology.refresh()
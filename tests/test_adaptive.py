@@ -0,0 +1,47 @@
+from adaptive import AdaptiveWeights
+from flowstats import StatsCollector
+import threading
+
+
+def held_elsewhere(lock) -> bool:
+    """
+    True if another thread cannot take `lock` now.
+    """
+    ret = []
+
+    def take():
+        ret.append(lock.acquire(blocking=False))
+        if ret[0]:
+            lock.release()
+
+    thread = threading.Thread(target=take)
+    thread.start()
+    thread.join()
+    return not ret[0]
+
+
+def test_reroute_pushes_without_lock_and_skips_failures(
+    monkeypatch, connector, topology, config
+):
+    pairs = [("h01", "h10"), ("h02", "h0f")]
+    changed = {}
+    for src, dest in pairs:
+        _, path = topology.find_shortest_path(src, dest)
+        config.set_path(*topology.get_node_from_names(*path))
+        changed[(path[2], path[3])] = (topology.graph.edges[path[2], path[3]]["w"], 100)
+        topology.set_weight(path[2], path[3], 100)
+    adaptive = AdaptiveWeights(topology, config, StatsCollector(connector))
+
+    calls = []
+    set_path = config.set_path
+
+    def spy(*nodes, **kwargs):
+        calls.append(held_elsewhere(topology.lock))
+        if len(calls) == 1:
+            raise Exception("SET PATH FAIL: test")
+        return set_path(*nodes, **kwargs)
+
+    monkeypatch.setattr(config, "set_path", spy)
+    moved = adaptive.reroute(changed)
+    assert calls == [False, False]
+    assert len(moved) == 1 and moved[0] in pairs
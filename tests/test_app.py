@@ -0,0 +1,43 @@
+from app import App
+import pytest
+
+
+@pytest.fixture
+def run(mock, tmp_path):
+    def run(*lines: str) -> list[tuple]:
+        script = tmp_path / "script.txt"
+        script.write_text("\n".join(lines))
+        app = App(
+            mock.server_ip,
+            mock.server_port,
+            ("admin", "admin"),
+            snapshot_mode="off",
+            script=str(script),
+        )
+        app.connector.close()
+        return app.script_summary["failures"]
+
+    return run
+
+
+def test_unset_path_is_a_failure(run):
+    failures = run("path source=h01 destination=h10 cutoff=1 update=1 set")
+    assert failures == [(1, "PATH NOT FOUND")]
+
+
+def test_route_failures_are_reported(monkeypatch, mock, run):
+    broken = next(iter(mock.nodes))
+    config = mock._config
+
+    def fail_writes(method, rest, body):
+        if method != "GET" and len(rest) > 1 and rest[1] == broken:
+            return 500, None
+        return config(method, rest, body)
+
+    monkeypatch.setattr(mock, "_config", fail_writes)
+    failures = run("routes set", "routes set aggregate=1", "routes sync")
+    assert [number for number, _ in failures] == [1, 2, 3]
+    assert failures[0][1].startswith("SET ROUTES FAIL")
+    assert failures[1][1].startswith("SET ROUTES FAIL")
+    assert failures[2][1].startswith("SYNC ROUTES FAIL")
+    assert all(broken in message for _, message in failures)
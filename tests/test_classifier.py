@@ -0,0 +1,33 @@
+from classifier import NetworkClassifier
+from helpers import hosts, install_all_paths, install_all_routes
+import pytest
+
+
+def delivered(results, dest: str) -> bool:
+    return any(r.status == "delivered" and r.host == dest for r in results)
+
+
+def test_empty_tables_miss(topology):
+    results = NetworkClassifier(topology).trace_between("h01", "h10")
+    assert [r.status for r in results] == ["miss"]
+
+
+@pytest.mark.parametrize("install", [install_all_paths, install_all_routes])
+def test_all_pairs_delivered(topology, config, install):
+    install(topology, config)
+    classifier = NetworkClassifier(topology)
+    pairs = [(s, d) for s in hosts(topology) for d in hosts(topology) if s != d]
+    results = classifier.trace_batch(pairs)
+    assert all(delivered(results[pair], pair[1]) for pair in pairs)
+
+    # hops follow the installed path
+    _, path = topology.find_shortest_path("h01", "h10")
+    (result,) = classifier.trace_between("h01", "h10", ip_proto=6, l4_dst=80)
+    assert [hop[0] for hop in result.hops] == path[1:-1]
+
+
+def test_recompiled_after_refresh(topology, config):
+    classifier = NetworkClassifier(topology)
+    assert not delivered(classifier.trace_between("h01", "h10"), "h10")
+    install_all_paths(topology, config)
+    assert delivered(classifier.trace_between("h01", "h10"), "h10")
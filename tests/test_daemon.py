@@ -0,0 +1,66 @@
+from daemon import PathDaemon
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import requests
+import time
+import pytest
+
+
+@pytest.fixture
+def daemon(topology, config):
+    daemon = PathDaemon(topology, config, port=0).start()
+    yield daemon
+    daemon.stop()
+
+
+def url(daemon, path: str) -> str:
+    return f"http://{daemon.host}:{daemon.port}{path}"
+
+
+def test_identical_queries_coalesced(daemon):
+    release = threading.Event()
+    daemon.model.submit(release.wait)  # the worker is busy, queries wait for it
+    with ThreadPoolExecutor(8) as pool:
+        futures = [
+            pool.submit(requests.get, url(daemon, "/path?src=h01&dest=h10"))
+            for _ in range(8)
+        ]
+        deadline = time.monotonic() + 5
+        while daemon.counters["coalesced"] < 7 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        answers = [f.result().json() for f in futures]
+    assert all(a == answers[0] for a in answers) and answers[0]["path"][0] == "h01"
+    assert daemon.counters["computed"] == 1 and daemon.counters["coalesced"] == 7
+
+    assert requests.get(url(daemon, "/path?src=h01&dest=h10")).json() == answers[0]
+    assert daemon.counters["hits"] == 1
+
+
+def test_weights_invalidate_cache(daemon, topology):
+    _, path = topology.find_shortest_path("h01", "h10")
+    assert requests.get(url(daemon, "/path?src=h01&dest=h10")).json()["path"] == path
+    answer = requests.post(
+        url(daemon, "/weights"), json={"weights": [[path[2], path[3], 100]]}
+    ).json()
+    assert answer == {"changed": 1, "failures": []}
+    moved = requests.get(url(daemon, "/path?src=h01&dest=h10")).json()["path"]
+    assert moved != path and daemon.counters["computed"] == 2
+
+
+def test_changes_by_other_threads_invalidate_cache(daemon, topology):
+    _, path = topology.find_shortest_path("h01", "h10")
+    assert requests.get(url(daemon, "/path?src=h01&dest=h10")).json()["path"] == path
+    thread = threading.Thread(target=topology.set_weight, args=(path[2], path[3], 100))
+    thread.start()  # as `AdaptiveWeights` or `TopologySubscriber` would
+    thread.join()
+    moved = requests.get(url(daemon, "/path?src=h01&dest=h10")).json()["path"]
+    assert moved != path and daemon.counters["computed"] == 2
+    assert requests.get(url(daemon, "/stats")).json()["version"] == topology.version
+
+
+def test_errors(daemon):
+    assert requests.get(url(daemon, "/path?src=h01")).status_code == 400
+    assert requests.get(url(daemon, "/nope")).status_code == 404
+    answer = requests.post(url(daemon, "/path"), json={"path": ["h01", "s99"]})
+    assert answer.status_code == 500 and answer.json()["error"] == "INVALID PATH"
@@ -0,0 +1,101 @@
+import pytest
+
+
+def installed(mock, prefix: str) -> dict:
+    """
+    {(switch id, flow id): priority} of config flows whose id starts with `prefix`.
+    """
+    return {
+        (node_id, flow_id): int(flow["priority"])
+        for node_id, tables in mock.config.items()
+        for flows in tables.values()
+        for flow_id, flow in flows.items()
+        if flow_id.startswith(prefix)
+    }
+
+
+def other_path(topology, src: str, dest: str) -> list[str]:
+    _, path = topology.find_shortest_path(src, dest)
+    topology.set_weight(path[2], path[3], 100)
+    _, new = topology.find_shortest_path(src, dest)
+    assert new != path
+    return new
+
+
+def test_update_installs_above_live_flows(monkeypatch, mock, topology, config):
+    _, path = topology.find_shortest_path("h01", "h10")
+    config.set_path(*topology.get_node_from_names(*path), priority=5)
+    snapshots = []  # flows after each batch of requests
+    send = config._send_requests
+
+    def spy(requests):
+        results = send(requests)
+        snapshots.append(installed(mock, "h01-h10-"))
+        return results
+
+    monkeypatch.setattr(config, "_send_requests", spy)
+    for _ in range(3):
+        live = installed(mock, "h01-h10-")
+        snapshots.clear()
+        path = other_path(topology, "h01", "h10")
+        config.set_path(*topology.get_node_from_names(*path), priority=5, update=True)
+        made = {key: p for key, p in snapshots[0].items() if key not in live}
+        assert len(made) == 2 * (len(path) - 2)
+        assert min(made.values()) > max(live.values())
+        assert set(installed(mock, "h01-h10-").values()) == {5}
+        assert not any(flow_id.endswith("-new") for _, flow_id in installed(mock, ""))
+        assert config.installed_paths[("h01", "h10")]["priority"] == 5
+
+
+def test_update_rolls_back_partial_path(mock, topology, config):
+    _, path = topology.find_shortest_path("h01", "h10")
+    config.set_path(*topology.get_node_from_names(*path))
+    before = installed(mock, "h01-h10-")
+    record = dict(config.installed_paths[("h01", "h10")])
+
+    new = other_path(topology, "h01", "h10")
+    broken = next(n for n in new[1:-1] if n not in path)
+    node = mock.nodes.pop(topology.get_id_from_names(broken)[0])  # its writes fail
+    try:
+        with pytest.raises(Exception, match="UPDATE PATH FAIL"):
+            config.set_path(*topology.get_node_from_names(*new), update=True)
+    finally:
+        mock.nodes[node["id"]] = node
+    assert (
+        installed(mock, "h01-h10-") == before
+    )  # old path only, nothing of the new one
+    assert config.installed_paths[("h01", "h10")] == record
+
+
+def set_ecmp(topology, config, src: str, dest: str):
+    def to_nodes(next_hops: dict) -> dict:
+        return {
+            topology.get_node_from_names(node)[0]: topology.get_node_from_names(*hops)
+            for node, hops in next_hops.items()
+        }
+
+    config.set_ecmp_path(
+        *topology.get_node_from_names(src, dest),
+        to_nodes(topology.get_ecmp_next_hops(src, dest)),
+        to_nodes(topology.get_ecmp_next_hops(dest, src)),
+    )
+
+
+def test_ecmp_groups_are_shared_and_removed_when_unused(mock, topology, config):
+    set_ecmp(topology, config, "h01", "h10")
+    set_ecmp(topology, config, "h02", "h0f")  # same edge switches, same uplinks
+    _, first = topology.find_shortest_path("h01", "h10")
+    _, second = topology.find_shortest_path("h02", "h0f")
+    assert first[1] == second[1]
+    edge = topology.get_id_from_names(first[1])[0]
+    assert len(mock.groups[edge]) == 1
+    assert all(0 < i <= len(g) for g in mock.groups.values() for i in g)
+
+    shared = set(config.installed_paths[("h02", "h0f")]["groups"])
+    for src, dest in [("h01", "h10"), ("h02", "h0f")]:
+        _, path = topology.find_shortest_path(src, dest)
+        config.set_path(*topology.get_node_from_names(*path), update=True)
+        left = {(n, i) for n, groups in mock.groups.items() for i in groups}
+        assert left == (shared if src == "h01" else set())
+    assert not config.group_users
+    assert not any(config.group_ids.values())
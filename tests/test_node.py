@@ -0,0 +1,19 @@
+from node import Node
+import copy
+import pytest
+
+
+def test_node_requires_ports_parser():
+    with pytest.raises(TypeError):
+        Node("openflow:1")
+
+
+def test_host_update_reads_addresses(topology):
+    host = topology.get_node_from_names("h01")[0]
+    data = copy.deepcopy(host.data)
+    data["host-tracker-service:addresses"][0]["ip"] = "10.0.9.9"
+    data["host-tracker-service:addresses"][0]["mac"] = "00:00:00:00:09:09"
+    changes = host.update(data)
+    assert host.ip == "10.0.9.9" and host.mac == "00:00:00:00:09:09"
+    assert next(iter(host.ports.values())).mac == "00:00:00:00:09:09"
+    assert changes == {"added": [], "removed": [], "changed": []}
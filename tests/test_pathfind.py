@@ -0,0 +1,56 @@
+from pathfind import constrained_shortest_path
+from bench import generate_graph
+import networkx as nx
+import random
+import time
+
+
+def brute_force(graph, src, dest, throughs, blocks, ordered):
+    view = nx.restricted_view(graph, blocks, [])
+    best = (None, None)
+    for path in nx.all_simple_paths(view, src, dest):
+        if not set(throughs).issubset(path):
+            continue
+        if ordered and [path.index(n) for n in throughs] != sorted(
+            path.index(n) for n in throughs
+        ):
+            continue
+        length = nx.path_weight(view, path, "w")
+        if best[0] is None or length < best[0]:
+            best = (length, path)
+    return best
+
+
+def test_constrained_matches_brute_force():
+    rand = random.Random(1)
+    for seed in range(40):
+        graph = nx.gnm_random_graph(11, 18, seed=seed)
+        for u, v in graph.edges:
+            graph.edges[u, v]["w"] = rand.randint(1, 9)
+        src, dest, *throughs = rand.sample(list(graph.nodes), 5)
+        throughs, blocks = throughs[:2], throughs[2:]
+        for ordered in [False, True]:
+            expected, _ = brute_force(graph, src, dest, throughs, blocks, ordered)
+            length, path = constrained_shortest_path(
+                graph, src, dest, throughs, blocks, ordered=ordered
+            )
+            assert length == expected, (seed, ordered)
+            if path is not None:
+                assert len(set(path)) == len(path)
+                assert set(throughs) <= set(path) and not set(blocks) & set(path)
+                assert nx.path_weight(graph, path, "w") == length
+
+
+def test_constrained_is_fast_on_large_graph():
+    graph = generate_graph(1000, 100)
+    rand = random.Random(0)
+    switches = sorted(n for n in graph.nodes if n.startswith("s"))
+    hosts = sorted(n for n in graph.nodes if n.startswith("h"))
+    times = []
+    for _ in range(20):
+        src, dest = rand.sample(hosts, 2)
+        throughs, blocks = rand.sample(switches, 2), rand.sample(switches, 1)
+        start = time.perf_counter()
+        constrained_shortest_path(graph, src, dest, throughs, blocks)
+        times.append(time.perf_counter() - start)
+    assert sorted(times)[len(times) // 2] < 0.05
@@ -0,0 +1,53 @@
+from flow import create_basic_flow, canonical_flow_hash
+from helpers import writes
+
+
+def as_stored(value, key=""):
+    """
+    Flow the way a controller stores it: prefixed keys [not list keys], string numbers, reversed lists.
+    """
+    if isinstance(value, dict):
+        return {
+            k if k == "id" else f"flow-node-inventory:{k}": as_stored(v, k)
+            for k, v in value.items()
+        }
+    if isinstance(value, list):
+        return [as_stored(v, key) for v in reversed(value)]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return str(value)
+    if key == "ipv4-destination":
+        return f"{value}/32"
+    return value
+
+
+def test_hash_ignores_controller_normalization():
+    flow = create_basic_flow(
+        "f1", "00:00:00:00:00:01", "00:00:00:00:00:02", 3
+    ).to_dict()
+    stored = dict(
+        as_stored(flow),
+        **{"idle-timeout": 0, "hard-timeout": 0, "barrier": False, "table_id": 0},
+    )
+    assert canonical_flow_hash(stored) == canonical_flow_hash(flow)
+    changed = create_basic_flow("f1", "00:00:00:00:00:01", "00:00:00:00:00:02", 4)
+    assert canonical_flow_hash(stored) != changed.canonical_hash()
+
+
+def test_reconcile_again_writes_nothing(mock, topology, config):
+    paths = {
+        (src, dest): topology.get_node_from_names(
+            *topology.find_shortest_path(src, dest)[1]
+        )
+        for src, dest in [("h01", "h10"), ("h02", "h0f")]
+    }
+    summary = config.reconcile_paths(paths)
+    assert summary["added"] > 0 and not summary["failures"]
+
+    for tables in mock.config.values():  # the controller keeps its own form
+        for flows in tables.values():
+            for flow_id, flow in flows.items():
+                flows[flow_id] = dict(as_stored(flow), **{"strict": False})
+    before = writes(mock)
+    summary = config.reconcile_paths(paths)
+    assert writes(mock) == before
+    assert summary["added"] == summary["modified"] == summary["deleted"] == 0
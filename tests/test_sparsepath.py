@@ -0,0 +1,42 @@
+from sparsepath import SparsePathEngine
+from pathfind import PathCache
+from bench import generate_graph
+import networkx as nx
+import sparsepath
+
+
+def test_compute_keeps_earlier_rows(monkeypatch):
+    graph = generate_graph(50, 10)
+    engine = SparsePathEngine(graph)
+    calls = []
+    dijkstra = sparsepath.dijkstra
+    monkeypatch.setattr(
+        sparsepath,
+        "dijkstra",
+        lambda *args, **kwargs: calls.append(kwargs["indices"])
+        or dijkstra(*args, **kwargs),
+    )
+    engine.compute(["h0001", "h0002"])
+    engine.compute(["h0003"])
+    assert set(engine.sources) == {"h0001", "h0002", "h0003"}
+    engine.compute(["h0001", "h0003", "h0004"])
+    assert [len(indices) for indices in calls] == [2, 1, 1]
+    for src in engine.sources:
+        expected = nx.single_source_dijkstra_path_length(graph, src, weight="w")
+        assert engine.get_path(src, "h0010")[0] == expected["h0010"]
+
+
+def test_get_paths_computes_once(monkeypatch):
+    graph = generate_graph(50, 10)
+    hosts = sorted(n for n in graph.nodes if n.startswith("h"))
+    engine = SparsePathEngine(graph)
+    first = engine.get_paths(hosts)
+    calls = []
+    monkeypatch.setattr(sparsepath, "dijkstra", lambda *args, **kwargs: calls.append(1))
+    assert engine.get_paths(hosts) == first
+    assert not calls
+    cache = PathCache(graph)
+    for (src, dest), path in cache.get_paths(hosts).items():
+        assert nx.path_weight(graph, path, "w") == nx.path_weight(
+            graph, first[(src, dest)], "w"
+        )
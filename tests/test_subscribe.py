@@ -0,0 +1,100 @@
+from subscribe import TopologySubscriber
+import time
+import pytest
+
+NODES = "/opendaylight-inventory:nodes/opendaylight-inventory:node[opendaylight-inventory:id='{}']"
+CONNECTOR = "/opendaylight-inventory:node-connector[opendaylight-inventory:id='{}']"
+
+
+def wait_for(condition, timeout: float = 1.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def switch_link(topology, path: list[str]) -> tuple:
+    """
+    (switch id, switch id, port id) of the first switch-to-switch link of `path`.
+    """
+    a, b = topology.get_id_from_names(path[1], path[2])
+    port = topology.nodes[a].get_port_for_peer(b)
+    return a, b, port.id
+
+
+@pytest.fixture
+def subscriber(topology, config):
+    subscriber = TopologySubscriber(topology, config)
+    yield subscriber
+    subscriber.stop()
+
+
+def test_failed_link_moves_path_without_download(mock, topology, config, subscriber):
+    _, path = topology.find_shortest_path("h01", "h10")
+    config.set_path(*topology.get_node_from_names(*path))
+    subscriber.start()
+    a, b, _ = switch_link(topology, path)
+    gets = mock.requests.get("GET", 0)
+    old = config.installed_paths[("h01", "h10")]["switches"]
+
+    start = time.monotonic()
+    assert mock.fail_link(a, b) == 2
+    assert wait_for(lambda: not topology.graph.has_edge(path[1], path[2]))
+    assert wait_for(lambda: config.installed_paths[("h01", "h10")]["switches"] != old)
+    assert time.monotonic() - start < 1.0
+    switches = config.installed_paths[("h01", "h10")]["switches"]
+    assert not {a, b} <= set(switches[switches.index(a) : switches.index(a) + 2])
+    assert mock.requests.get("GET", 0) == gets
+
+    assert mock.restore_link(a, b) == 2
+    assert wait_for(lambda: topology.graph.has_edge(path[1], path[2]))
+    assert topology.refresh().is_empty()  # same as the controller's topology
+
+
+def test_child_events_patch_or_ignore(topology, subscriber):
+    _, path = topology.find_shortest_path("h01", "h10")
+    a, _, port_id = switch_link(topology, path)
+    node = NODES.format(a)
+    events = [
+        {
+            "path": node + CONNECTOR.format(port_id) + "/flow-node-inventory:state",
+            "operation": "updated",
+            "data": {
+                "flow-node-inventory:state": {
+                    "link-down": True,
+                    "blocked": False,
+                    "live": False,
+                }
+            },
+        },
+        {
+            "path": node + "/flow-node-inventory:ip-address",
+            "operation": "updated",
+            "data": {"flow-node-inventory:ip-address": "10.0.0.9"},
+        },
+        {
+            "path": node
+            + CONNECTOR.format(port_id)
+            + "/opendaylight-port-statistics:flow-capable-node-connector-statistics",
+            "operation": "updated",
+            "data": {"packets": {"received": 1}},
+        },
+    ]
+    diff = subscriber.handle(
+        {"notification": {"data-changed-notification": {"data-change-event": events}}}
+    )
+    assert len(diff.changed_ports) == 1 and len(diff.removed_links) == 2
+    assert not topology.graph.has_edge(path[1], path[2])
+    assert subscriber.counters["skipped"] == 0
+
+
+def test_bad_event_is_skipped(topology, subscriber):
+    events = [
+        {"path": NODES.format("openflow:1"), "operation": "updated", "data": {}},
+        {"path": NODES.format("openflow:1") + CONNECTOR.format("openflow:1:1")},
+    ]
+    subscriber.handle({"data-changed-notification": {"data-change-event": events}})
+    assert subscriber.counters["events"] == 2
+    assert subscriber.counters["skipped"] == 2
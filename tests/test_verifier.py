@@ -0,0 +1,42 @@
+from verifier import Verifier
+from flow import create_basic_flow, create_drop_flow
+from helpers import hosts, install_all_paths, install_all_routes
+
+
+def test_empty_tables_unreachable(topology):
+    report = Verifier(topology).verify()
+    count = len(hosts(topology))
+    assert report.pairs == count * (count - 1)
+    assert len(report.unreachable) == report.pairs
+    assert report.black_holes and not report.loops
+
+
+def test_installed_paths_verified(topology, config):
+    install_all_paths(topology, config)
+    report = Verifier(topology, ip_proto=6, l4_dst=80).verify()
+    assert report.ok and report.pairs == 16 * 15
+
+
+def test_loop_and_drop_found(topology, config):
+    install_all_routes(topology, config)
+    assert Verifier(topology).verify().ok
+    s01, s17, s07, h01, h02, h10 = topology.get_node_from_names(
+        "s01", "s17", "s07", "h01", "h02", "h10"
+    )
+    to_s17 = s01.get_port_for_peer(s17.id).port_number
+    to_s01 = s17.get_port_for_peer(s01.id).port_number
+    config.set_flow(
+        s01.id, 0, create_basic_flow("loop1", None, h10.mac, to_s17, priority=50)
+    )
+    config.set_flow(
+        s17.id, 0, create_basic_flow("loop2", None, h10.mac, to_s01, priority=50)
+    )
+    config.set_flow(s07.id, 0, create_drop_flow("drop", h01.mac, h02.mac, priority=50))
+    topology.refresh()
+
+    report = Verifier(topology).verify()
+    assert {dest for dest, _ in report.loops} == {"h10"}
+    assert ("h02", "s07", "drop") in report.black_holes
+    assert report.black_holes[("h02", "s07", "drop")] == ["h01"]
+    assert ("h01", "h02") in report.unreachable
+    assert ("h03", "h02") not in report.unreachable
@@ -0,0 +1,199 @@
+import argparse
+import random
+import networkx as nx
+from mockodl import build_odl_data, index_to_mac
+from snapshot import save_snapshot
+
+# Parametric topologies for scaling tests: fat-tree, torus, leaf-spine, Waxman.
+# Switches are named s01, s02... [ids openflow:1, openflow:2...], hosts h01, h02... by their sequential MACs,
+# so names in the Mininet topology and in the generated OpenDaylight data are the same.
+
+
+class GeneratedTopo(object):
+    """
+    Switches, hosts and links of a generated topology:
+    - switches: Switch names, switch `i` [from 1] has id openflow:i.
+    - hosts: Host name -> switch name it is attached to.
+    - links: Pairs of switch names.
+    """
+
+    def __init__(self, name: str, switches: list[str], hosts: dict, links: list):
+        self.name = name
+        self.switches = switches
+        self.hosts = hosts
+        self.links = links
+
+    def __repr__(self) -> str:
+        return f"{self.name}: {len(self.switches)} switches, {len(self.hosts)} hosts, {len(self.links)} links"
+
+    def to_odl(self) -> tuple[dict, list]:
+        """
+        Return (topology, switches) as served by OpenDaylight, for `NetworkTopology` [offline] or `MockOpenDaylight`.
+        """
+        return build_odl_data(self.switches, self.hosts, self.links)
+
+    def to_graph(self) -> nx.Graph:
+        """
+        Undirected graph with weight 1 on every link, like `NetworkTopology.graph`.
+        """
+        graph = nx.Graph()
+        graph.add_edges_from(self.links, w=1)
+        graph.add_edges_from(self.hosts.items(), w=1)
+        return graph
+
+    def to_mininet(self):
+        """
+        Return a Mininet `Topo`. Links are added in the same order as `to_odl`, so port numbers match.
+        """
+        from mininet.topo import Topo  # only available on the Mininet machine
+
+        topo = Topo()
+        for name in self.switches:
+            topo.addSwitch(name)
+        for u, v in self.links:
+            topo.addLink(u, v)
+        for ind, (name, switch) in enumerate(self.hosts.items(), 1):
+            topo.addHost(
+                name,
+                mac=index_to_mac(ind),
+                ip=f"10.{(ind >> 16) & 255}.{(ind >> 8) & 255}.{ind & 255}/8",
+            )
+            topo.addLink(name, switch)
+        return topo
+
+    def save(self, path: str, format: str = None):
+        save_snapshot(path, *self.to_odl(), format=format)
+
+
+def _switch_names(count: int) -> list[str]:
+    width = max(2, len(str(count)))
+    return [f"s{i:0{width}}" for i in range(1, count + 1)]
+
+
+def _attach_hosts(switches: list[str], per_switch: int) -> dict[str, str]:
+    hosts = {}
+    for switch in switches:
+        for _ in range(per_switch):
+            hosts[f"h{len(hosts) + 1:02x}"] = switch
+    return hosts
+
+
+def fat_tree(k: int = 4, hosts_per_edge: int = None) -> GeneratedTopo:
+    """
+    K-ary fat-tree: (k/2)^2 core switches, k pods of k/2 aggregation and k/2 edge switches.
+    Each edge switch has `hosts_per_edge` hosts [Default: k/2].
+    """
+    if k < 2 or k % 2:
+        raise Exception(f"INVALID K: {k}. Fat-tree needs an even k >= 2")
+    half = k // 2
+    names = _switch_names(half * half + k * k)
+    core, rest = names[: half * half], names[half * half :]
+    links, edges = [], []
+    for pod in range(k):
+        aggs = rest[pod * k : pod * k + half]
+        pod_edges = rest[pod * k + half : (pod + 1) * k]
+        for ind, agg in enumerate(aggs):
+            for j in range(half):
+                links.append((core[ind * half + j], agg))
+            for edge in pod_edges:
+                links.append((agg, edge))
+        edges.extend(pod_edges)
+    hosts = _attach_hosts(edges, half if hosts_per_edge is None else hosts_per_edge)
+    return GeneratedTopo(f"fat-tree({k})", names, hosts, links)
+
+
+def torus(m: int, n: int, hosts_per_switch: int = 1) -> GeneratedTopo:
+    """
+    2D torus of m x n switches, each linked to its 4 neighbours with wrap-around.
+    """
+    if m < 1 or n < 1:
+        raise Exception(f"INVALID SIZE: {m}x{n}")
+    names = _switch_names(m * n)
+    links = set()
+    for i in range(m):
+        for j in range(n):
+            here = i * n + j
+            for other in [((i + 1) % m) * n + j, i * n + (j + 1) % n]:
+                if other != here:
+                    links.add((min(here, other), max(here, other)))
+    links = [(names[u], names[v]) for u, v in sorted(links)]
+    return GeneratedTopo(
+        f"torus({m},{n})", names, _attach_hosts(names, hosts_per_switch), links
+    )
+
+
+def leaf_spine(spines: int, leaves: int, hosts_per_leaf: int = 2) -> GeneratedTopo:
+    """
+    Every leaf switch is linked to every spine switch, hosts are on leaves.
+    """
+    names = _switch_names(spines + leaves)
+    links = [(spine, leaf) for leaf in names[spines:] for spine in names[:spines]]
+    hosts = _attach_hosts(names[spines:], hosts_per_leaf)
+    return GeneratedTopo(f"leaf-spine({spines},{leaves})", names, hosts, links)
+
+
+def waxman(
+    n: int,
+    host_count: int = None,
+    alpha: float = 0.4,
+    beta: float = 0.1,
+    seed: int = 0,
+) -> GeneratedTopo:
+    """
+    Random Waxman graph of `n` switches [see `networkx.waxman_graph`], connected by linking each other
+    component to its nearest switch. `host_count` hosts [Default: n] are attached to random switches.
+    """
+    rand = random.Random(seed)
+    graph = nx.waxman_graph(n, beta=beta, alpha=alpha, seed=seed)
+    names = _switch_names(n)
+    links = [(names[min(u, v)], names[max(u, v)]) for u, v in graph.edges]
+
+    components = sorted(nx.connected_components(graph), key=len, reverse=True)
+    main = set(components[0])
+    for component in components[1:]:
+        u, v = min(
+            ((u, v) for u in component for v in main),
+            key=lambda e: sum(
+                (a - b) ** 2
+                for a, b in zip(graph.nodes[e[0]]["pos"], graph.nodes[e[1]]["pos"])
+            ),
+        )
+        links.append((names[min(u, v)], names[max(u, v)]))
+        main.update(component)
+
+    hosts = {}
+    for ind in range(1, (n if host_count is None else host_count) + 1):
+        hosts[f"h{ind:02x}"] = rand.choice(names)
+    return GeneratedTopo(f"waxman({n})", names, hosts, links)
+
+
+generators = {
+    "fattree": fat_tree,
+    "torus": torus,
+    "leafspine": leaf_spine,
+    "waxman": waxman,
+}
+
+# Mininet: sudo mn --custom topogen.py --topo fattree,4 --controller=remote
+topos = {
+    "fattree": lambda k=4: fat_tree(k).to_mininet(),
+    "torus": lambda m=4, n=4: torus(m, n).to_mininet(),
+    "leafspine": lambda spines=2, leaves=4: leaf_spine(spines, leaves).to_mininet(),
+    "waxman": lambda n=20, seed=0: waxman(n, seed=seed).to_mininet(),
+}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate OpenDaylight data of a topology"
+    )
+    parser.add_argument("type", choices=list(generators))
+    parser.add_argument(
+        "params", nargs="*", type=int, help="Ex: fattree 8, torus 10 20"
+    )
+    parser.add_argument("--out", default="snapshot.json.gz")
+    args = parser.parse_args()
+
+    topo = generators[args.type](*args.params)
+    topo.save(args.out)
+    print(f":: {topo} -> {args.out}")
@@ -0,0 +1,243 @@
+from nettopo import NetworkTopology
+from node import Host
+from classifier import NetworkClassifier, Packet, Rule, ETH_TYPE_IPV4
+
+# Header fields set by the sender, flows matching them make forwarding depend on the source host
+SOURCE_FIELDS = ("eth_src", "ipv4_src", "ipv6_src")
+
+
+def _cycle2string(cycle: tuple) -> str:
+    return " -> ".join(f"{name}[{port}]" for name, port in cycle)
+
+
+class VerifyReport(object):
+    """
+    Problems found by `Verifier.verify`:
+    - unreachable: {(source, destination): outcomes} of pairs whose packets never reach the destination.
+    - loops: {(destination, cycle of (switch name, in port)): sources whose packets enter the cycle}.
+    - black_holes: {(destination, switch name, status): sources}. Status: 'miss', 'drop', 'controller', 'no link', 'too long'.
+    """
+
+    def __init__(self) -> None:
+        self.pairs = 0
+        self.destinations = 0
+        self.classes = 0  # forwarding graphs built, one per destination and group of equivalent sources
+        self.unreachable = {}
+        self.loops = {}
+        self.black_holes = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.unreachable and not self.loops and not self.black_holes
+
+    def print_report(self, limit: int = 20):
+        print(
+            f":: {self.pairs} pairs, {self.destinations} destinations, {self.classes} forwarding graphs"
+        )
+        print(
+            f":: {len(self.unreachable)} unreachable pairs, {len(self.loops)} loops, {len(self.black_holes)} black holes"
+        )
+        for (dest, cycle), sources in list(self.loops.items())[:limit]:
+            print(
+                f"   LOOP toward {dest}: {_cycle2string(cycle)} [{len(sources)} sources]"
+            )
+        for (dest, switch, status), sources in list(self.black_holes.items())[:limit]:
+            print(
+                f"   BLACK HOLE toward {dest}: {status} at {switch} [{len(sources)} sources]"
+            )
+        for (src, dest), outcomes in list(self.unreachable.items())[:limit]:
+            ends = ", ".join(
+                f"{status} {_cycle2string(at) if status == 'loop' else at}"
+                for status, at in outcomes
+            )
+            print(f"   UNREACHABLE {src} -> {dest}: {ends}")
+
+
+class Verifier(object):
+    """
+    Check reachability of every pair of hosts, and find forwarding loops and black holes, from the flow tables
+    of the topology's last refresh. Select groups are followed on all their buckets.
+
+    Work is shared across sources: for each destination, sources are grouped by the source-specific flows
+    [matching eth_src/ipv4_src] they hit. Each group gets one forwarding graph, (switch, in port) -> next hops,
+    walked once with memoized outcomes for all its sources. With flows matching only the destination [`routes set aggregate=1`],
+    one graph per destination covers all sources. Source-specific flows are indexed once for all destinations.
+    """
+
+    def __init__(self, topology: NetworkTopology, **fields) -> None:
+        """
+        - fields: Header fields of the verified packets other than addresses. Ex: ip_proto=6, l4_dst=80
+        """
+        self.topology = topology
+        self.fields = fields
+        self.classifier = NetworkClassifier(topology, all_buckets=True)
+
+    def _hosts(self) -> list[Host]:
+        return sorted(
+            (n for n in self.topology.nodes.values() if n.type == "host"),
+            key=lambda n: n.name,
+        )
+
+    def _source_rules(self) -> dict[int, list[tuple[str, Rule]]]:
+        """
+        All flows matching source fields, as (switch id, rule), by their exact eth_dst [None: any or masked].
+        """
+        ret = {}
+        for node in self.topology.nodes.values():
+            if node.type != "switch":
+                continue
+            switch = self.classifier.get_switch(node.id)
+            for index in switch.tables.values():
+                for rule in index.rules:
+                    if any(
+                        name in rule.exact or name in rule.masked
+                        for name in SOURCE_FIELDS
+                    ):
+                        key = rule.exact.get("eth_dst", None)
+                        ret.setdefault(key, []).append((node.id, rule))
+        return ret
+
+    @staticmethod
+    def _matches(rule: Rule, packet: Packet, names) -> bool:
+        fields = packet.fields
+        for name in names:
+            if name in rule.exact and fields.get(name, None) != rule.exact[name]:
+                return False
+            if name in rule.masked:
+                value, mask = rule.masked[name]
+                if name not in fields or fields[name] & mask != value:
+                    return False
+        return True
+
+    def _source_packet(self, host: Host) -> Packet:
+        return Packet(eth_src=host.mac, ipv4_src=host.ip)
+
+    def _walk(self, state, get_packet, memo: dict, stack: list) -> frozenset:
+        """
+        Outcomes of a packet arriving on Port `state`. Memoized in `memo` by (switch id, in port).
+        - stack: States of the current walk, reaching one of them again is a loop.
+        """
+        node = state.owner
+        if node.type == "host":
+            return frozenset([("delivered", node.name)])
+        key = (node.id, str(state.port_number))
+        if key in memo:
+            outcomes = memo[key]
+            if outcomes is None:  # on the stack: a loop
+                cycle = tuple(
+                    (self.topology.nodes[i].name, p)
+                    for i, p in stack[stack.index(key) :]
+                )
+                return frozenset([("loop", cycle)])
+            return outcomes
+        if len(stack) >= self.classifier.max_hops:
+            return frozenset([("too long", node.name)])
+
+        memo[key] = None
+        stack.append(key)
+        flow_ids, outputs = self.classifier.forward(node, key[1], get_packet(node.id))
+        if not flow_ids:
+            outcomes = frozenset([("miss", node.name)])
+        elif not outputs:
+            outcomes = frozenset([("drop", node.name)])
+        else:
+            outcomes = frozenset()
+            for out, peer in outputs:
+                if out == "CONTROLLER":
+                    outcomes |= {("controller", node.name)}
+                elif peer is None:
+                    outcomes |= {("no link", node.name)}
+                else:
+                    outcomes |= self._walk(peer, get_packet, memo, stack)
+        stack.pop()
+        memo[key] = outcomes
+        return outcomes
+
+    def verify(self, hosts: list[str] = None) -> VerifyReport:
+        """
+        Verify all pairs of `hosts` [names, Default: all hosts].
+        """
+        all_hosts = self._hosts()
+        if hosts is not None:
+            all_hosts = [h for h in all_hosts if h.name in set(hosts)]
+        report = VerifyReport()
+        source_packets = {h.name: self._source_packet(h) for h in all_hosts}
+        source_rules = self._source_rules()
+        by_mac = {}  # eth_src -> hosts, most source flows match one MAC exactly
+        for h in all_hosts:
+            by_mac.setdefault(source_packets[h.name].fields["eth_src"], []).append(h)
+        rule_sources = {}  # id(rule) -> host names it matches as sender
+
+        def sources_of(rule: Rule) -> list[str]:
+            ret = rule_sources.get(id(rule), None)
+            if ret is None:
+                candidates = (
+                    by_mac.get(rule.exact["eth_src"], [])
+                    if "eth_src" in rule.exact
+                    else all_hosts
+                )
+                ret = rule_sources[id(rule)] = [
+                    h.name
+                    for h in candidates
+                    if self._matches(rule, source_packets[h.name], SOURCE_FIELDS)
+                ]
+            return ret
+
+        for dest in all_hosts:
+            base = Packet(
+                eth_dst=dest.mac,
+                eth_type=ETH_TYPE_IPV4,
+                ipv4_dst=dest.ip,
+                **self.fields,
+            )
+            # source host -> (switch id, rule) of source flows it hits toward `dest`
+            specific = {}
+            candidates = source_rules.get(base.fields["eth_dst"], [])
+            for switch_id, rule in candidates + source_rules.get(None, []):
+                names = [
+                    name
+                    for name in list(rule.exact) + list(rule.masked)
+                    if name not in SOURCE_FIELDS and name != "in_port"
+                ]
+                if not self._matches(rule, base, names):
+                    continue  # never hit by packets toward `dest`
+                for name in sources_of(rule):
+                    specific.setdefault(name, set()).add((switch_id, id(rule)))
+            classes = {}  # frozenset of hit source flows -> source hosts
+            for src in all_hosts:
+                if src is not dest:
+                    key = frozenset(specific.get(src.name, ()))
+                    classes.setdefault(key, []).append(src)
+
+            report.destinations += 1
+            for key, sources in classes.items():
+                report.classes += 1
+                report.pairs += len(sources)
+                switches = {switch_id for switch_id, _ in key}
+                packet = base.with_fields(**source_packets[sources[0].name].fields)
+
+                def get_packet(switch_id, packet=packet, switches=switches):
+                    # packet headers without source fields hit the same flows on other switches, and share their lookups
+                    return packet if switch_id in switches else base
+
+                memo = {}
+                for src in sources:
+                    ingress = next(iter(src.ports.values())).peer
+                    if ingress is None:
+                        outcomes = frozenset([("no link", src.name)])
+                    else:
+                        outcomes = self._walk(ingress, get_packet, memo, [])
+                    self._record(report, src.name, dest.name, outcomes)
+        return report
+
+    @staticmethod
+    def _record(report: VerifyReport, src: str, dest: str, outcomes: frozenset):
+        if ("delivered", dest) not in outcomes:
+            report.unreachable[(src, dest)] = sorted(outcomes, key=str)
+        for outcome in outcomes:
+            if outcome[0] == "loop":
+                report.loops.setdefault((dest, outcome[1]), []).append(src)
+            elif outcome[0] in ["miss", "drop", "controller", "no link", "too long"]:
+                report.black_holes.setdefault(
+                    (dest, outcome[1], outcome[0]), []
+                ).append(src)